@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from config import BATCH_WINDOW_MS, BATCH_MAX_SIZE, USE_COMPILED_SVC
+from model_registry import registry
+from metrics import stage_timer
+
+# ====================================================================
+# MICRO-BATCHING INFERENSI SVC (WAJAH & SUARA)
+# ====================================================================
+# Request yang datang bersamaan digabung menjadi satu scaler.transform +
+# satu predict_proba (atau satu pass CompiledSVC). Batching adaptif: request
+# yang datang sendirian langsung diproses tanpa menunggu; request yang
+# menumpuk selama batch sebelumnya berjalan diambil sekaligus, dan hanya
+# saat itu (ada beban bersamaan) jendela BATCH_WINDOW_MS dipakai untuk
+# menunggu request berikutnya. Label diambil dari argmax proba, jadi kernel
+# SVC cukup dievaluasi sekali per batch.
+
+
+class MicroBatcher:
+    def __init__(self, model_name, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX_SIZE):
+        self.model_name = model_name
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=f"batcher-{self.model_name}", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, features):
+        """Kirim satu vektor fitur (belum di-scale). Hasil: Future berisi (label, proba)."""
+        self._ensure_started()
+        future = Future()
+        row = np.asarray(features, dtype=np.float64).reshape(-1)
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, features):
+        """Versi blocking dari submit()."""
+        return self.submit(features).result()
+
+    def predict_many(self, rows):
+        """Kirim beberapa baris sekaligus (masuk ke batch yang sama). Output: list (label, proba)."""
+        futures = [self.submit(row) for row in rows]
+        return [f.result() for f in futures]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # Ambil semua yang sudah menunggu (menumpuk selama batch sebelumnya berjalan)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1:
+            # Tidak ada request lain yang menunggu: langsung diproses, tanpa jendela
+            return batch
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            active = [(r, f) for r, f in batch if f.set_running_or_notify_cancel()]
+            if not active:
+                continue
+            rows = [r for r, _ in active]
+            futures = [f for _, f in active]
+            try:
+                # Satu versi model untuk seluruh batch (aman saat hot reload)
+                model = registry.get(self.model_name)
+                compiled = model.compiled if USE_COMPILED_SVC else None
+                if compiled is not None:
+                    X = np.vstack(rows)
+                    if model.projection is not None:
+                        # Model PCA: scaler + proyeksi = satu matmul float32 ke ruang tereduksi
+                        with stage_timer("project", model=self.model_name, engine="compiled"):
+                            X = model.projection.transform(X)
+                    # Scaler sudah terlipat ke kernel (svc_engine)
+                    with stage_timer("predict_proba", model=self.model_name, engine="compiled"):
+                        labels, proba = compiled.predict_with_proba(X)
+                else:
+                    with stage_timer("scale", model=self.model_name, engine="sklearn"):
+                        features_scaled = model.scaler.transform(np.vstack(rows))
+                    with stage_timer("predict_proba", model=self.model_name, engine="sklearn"):
+                        proba = model.svc.predict_proba(features_scaled)
+                    labels = model.svc.classes_[np.argmax(proba, axis=1)]
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(futures)
+            for f, label, p in zip(futures, labels, proba):
+                f.set_result((label, p))
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_name):
+    """Satu MicroBatcher per model per proses."""
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_name)
+            if batcher is None:
+                batcher = MicroBatcher(model_name)
+                _batchers[model_name] = batcher
+    return batcher
@@ -0,0 +1,337 @@
+"""
+Benchmark jalur inferensi wajah & suara (tanpa jaringan dan tanpa broker MQTT).
+
+Contoh:
+    python benchmark.py --iterations 50 --output bench_results.json
+    python benchmark.py --batch-sizes 1,8,32 --concurrency 1,4,16
+    python benchmark.py --compare bench_lama.json
+"""
+import argparse
+import io
+import json
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+from PIL import Image
+
+from model_registry import registry, FACE_SCALER_PATH
+from mfcc import get_extractor, load_audio
+from vad import detect_speech
+
+SAMPLE_RATE = 16000
+IMG_SIZE = 96
+CAMERA_SIZE = (640, 480)  # resolusi VGA ESP32-CAM
+
+
+# ====================================================================
+# DATA & MODEL SINTETIS
+# ====================================================================
+
+def make_jpeg(rng, size=CAMERA_SIZE, quality=85):
+    w, h = size
+    gradient = np.linspace(0, 255, w, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 25, (h, w, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+def make_wav(rng, seconds=1.5, sample_rate=SAMPLE_RATE):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.normal(size=t.shape)
+    buf = io.BytesIO()
+    sf.write(buf, voice.astype(np.float32), sample_rate, format='WAV', subtype='PCM_16')
+    return buf.getvalue()
+
+
+def make_standin_face_model(rng, n_classes=5, per_class=8, scaler_path=FACE_SCALER_PATH):
+    """SVC kecil di ruang fitur image_scaler.pkl (pengganti image_model.pkl untuk benchmark/load test)."""
+    from sklearn.svm import SVC
+
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    n_features = scaler.n_features_in_
+    X = rng.normal(size=(n_classes * per_class, n_features))
+    y = np.repeat(np.arange(n_classes), per_class)
+    return SVC(probability=True, random_state=0).fit(X, y)
+
+
+def install_standin_face_model(workdir, rng, n_classes=5, per_class=8):
+    """Latih SVC pengganti lalu daftarkan sebagai model 'face' di registry proses ini."""
+    svc = make_standin_face_model(rng, n_classes, per_class)
+    model_path = os.path.join(workdir, 'image_model.pkl')
+    with open(model_path, 'wb') as f:
+        pickle.dump(svc, f)
+    registry.register('face', [model_path], FACE_SCALER_PATH)
+
+
+# ====================================================================
+# PENGUKURAN
+# ====================================================================
+
+def peak_rss_mb():
+    # ru_maxrss dalam KB di Linux; high-water mark seluruh proses (hanya bisa naik)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def current_rss_mb():
+    # RSS saat ini dari /proc (Linux); di OS lain kembali ke high-water mark
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024.0 * 1024.0)
+    except OSError:
+        return peak_rss_mb()
+
+
+@contextmanager
+def track_rss():
+    """
+    Memori di sekitar satu tahap: rss_delta_mb = RSS sesudah - sebelum (memori yang
+    tetap dipegang), peak_growth_mb = kenaikan high-water mark proses selama tahap
+    (0 jika puncak tahap sebelumnya tidak terlampaui, jadi batas bawah, bukan puncak tahap).
+    """
+    mem = {}
+    rss0, peak0 = current_rss_mb(), peak_rss_mb()
+    try:
+        yield mem
+    finally:
+        mem["rss_delta_mb"] = current_rss_mb() - rss0
+        mem["peak_growth_mb"] = peak_rss_mb() - peak0
+
+
+def summarize(durations, wall_time=None, items_per_call=1):
+    d = np.asarray(durations) * 1000.0
+    total = wall_time if wall_time is not None else d.sum() / 1000.0
+    return {
+        "n": int(d.size),
+        "mean_ms": float(d.mean()),
+        "p50_ms": float(np.percentile(d, 50)),
+        "p95_ms": float(np.percentile(d, 95)),
+        "p99_ms": float(np.percentile(d, 99)),
+        "throughput_per_s": float(d.size * items_per_call / total) if total > 0 else 0.0,
+    }
+
+
+def time_stage(fn, iterations, warmup=2):
+    for _ in range(warmup):
+        result = fn()
+    durations = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - t0)
+    return durations, result
+
+
+def bench_stages(jpeg, wav, iterations):
+    import cv2
+    try:
+        import librosa  # hanya untuk pembanding MFCC; tidak lagi dipakai pipeline
+    except ImportError:
+        librosa = None
+    import predict_picture
+    import predict_voice
+    import dashboard_ml
+
+    face = registry.get('face')
+    voice = registry.get('voice')
+    n_mfcc = voice.n_features or predict_voice.N_MFCC
+    stages = {}
+
+    def record(name, fn):
+        with track_rss() as mem:
+            durations, result = time_stage(fn, iterations)
+        stats = summarize(durations)
+        stats.update(mem)
+        if isinstance(result, tuple) and result and isinstance(result[0], str):
+            stats["last_result"] = result[0]
+        stages[name] = stats
+        return result
+
+    # --- Wajah ---
+    image = record("image.decode", lambda: Image.open(io.BytesIO(jpeg)).convert('RGB'))
+    img_np = np.array(image)
+    resized = record("image.resize", lambda: cv2.resize(img_np, (IMG_SIZE, IMG_SIZE)) / 255.0)
+    row = resized.reshape(1, -1)
+    scaled = record("image.scale", lambda: face.scaler.transform(row))
+    record("image.predict", lambda: face.svc.predict_proba(scaled))
+    record("image.pipeline_scaled", lambda: predict_picture.preprocess_image(io.BytesIO(jpeg), scaler=face.scaler))
+    burst = [jpeg] * 8
+    record("image.pipeline_batch8", lambda: predict_picture.images_to_features([io.BytesIO(b) for b in burst]))
+    record("image.predict_image", lambda: predict_picture.predict_image(Image.open(io.BytesIO(jpeg))))
+    record("image.dashboard", lambda: dashboard_ml.process_and_predict_image(io.BytesIO(jpeg)))
+
+    # --- Suara ---
+    voice_data = record("audio.decode", lambda: load_audio(io.BytesIO(wav), SAMPLE_RATE))
+    record("audio.vad", lambda: detect_speech(voice_data, SAMPLE_RATE))
+    mfcc = record("audio.mfcc", lambda: get_extractor(SAMPLE_RATE, n_mfcc).features(voice_data))
+    if librosa is not None:
+        record("audio.mfcc_librosa", lambda: np.mean(librosa.feature.mfcc(y=voice_data, sr=SAMPLE_RATE, n_mfcc=n_mfcc).T, axis=0))
+    else:
+        stages["audio.mfcc_librosa"] = {"skipped": "librosa tidak terpasang"}
+    record("audio.extract_features", lambda: predict_voice.extract_features(io.BytesIO(wav), n_mfcc=n_mfcc))
+    scaled = record("audio.scale", lambda: voice.scaler.transform([mfcc]))
+    record("audio.predict", lambda: voice.svc.predict_proba(scaled))
+    record("audio.predict_audio", lambda: predict_voice.predict_audio(io.BytesIO(wav)))
+    record("audio.dashboard", lambda: dashboard_ml.process_and_predict_audio(io.BytesIO(wav)))
+
+    return stages
+
+
+def bench_batch_sweep(batch_sizes, iterations, rng):
+    """Biaya scale + predict_proba per item untuk berbagai ukuran batch."""
+    results = []
+    for name in ('face', 'voice'):
+        model = registry.get(name)
+        n_features = model.n_features
+        for bs in batch_sizes:
+            X = rng.normal(size=(bs, n_features)) * model.scaler.scale_ + model.scaler.mean_
+            with track_rss() as mem:
+                durations, _ = time_stage(lambda: model.svc.predict_proba(model.scaler.transform(X)), iterations)
+            stats = summarize(durations, items_per_call=bs)
+            stats.update(mem)
+            stats.update({"model": name, "batch_size": bs,
+                          "per_item_ms": stats["mean_ms"] / bs})
+            results.append(stats)
+    return results
+
+
+def bench_concurrency_sweep(jpeg, wav, levels, iterations):
+    """predict_image / predict_audio end-to-end dengan beberapa thread sekaligus."""
+    import predict_picture
+    import predict_voice
+
+    jobs = {
+        "image.predict_image": lambda: predict_picture.predict_image(Image.open(io.BytesIO(jpeg))),
+        "audio.predict_audio": lambda: predict_voice.predict_audio(io.BytesIO(wav)),
+    }
+    results = []
+    for name, fn in jobs.items():
+        for level in levels:
+            def timed(_):
+                t0 = time.perf_counter()
+                fn()
+                return time.perf_counter() - t0
+
+            n_calls = max(iterations, level)
+            with track_rss() as mem, ThreadPoolExecutor(max_workers=level) as ex:
+                list(ex.map(timed, range(level)))  # warmup
+                t0 = time.perf_counter()
+                durations = list(ex.map(timed, range(n_calls)))
+                wall = time.perf_counter() - t0
+            stats = summarize(durations, wall_time=wall)
+            stats.update(mem)
+            stats.update({"stage": name, "concurrency": level})
+            results.append(stats)
+    return results
+
+
+# ====================================================================
+# OUTPUT
+# ====================================================================
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def print_stages(stages, baseline=None):
+    print(f"{'stage':28s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'ops/s':>9s} {'dRSS MB':>8s} {'dPeak MB':>8s}")
+    for name, s in stages.items():
+        if 'skipped' in s:
+            print(f"{name:28s} dilewati: {s['skipped']}")
+            continue
+        line = (f"{name:28s} {s['p50_ms']:8.2f}m {s['p95_ms']:8.2f}m {s['p99_ms']:8.2f}m "
+                f"{s['throughput_per_s']:9.1f} {s['rss_delta_mb']:8.1f} {s['peak_growth_mb']:8.1f}")
+        if baseline and baseline.get(name, {}).get('p50_ms'):
+            ratio = s['p50_ms'] / baseline[name]['p50_ms']
+            line += f"  x{ratio:.2f} vs baseline"
+        if 'last_result' in s:
+            line += f"  [{s['last_result'][:40]}]"
+        print(line)
+
+
+def parse_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inferensi wajah & suara")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--batch-sizes', type=parse_list, default=[1, 4, 16, 32])
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 4, 16])
+    parser.add_argument('--audio-seconds', type=float, default=1.5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='file JSON hasil benchmark sebelumnya')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    jpeg = make_jpeg(rng)
+    wav = make_wav(rng, seconds=args.audio_seconds)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        install_standin_face_model(workdir, rng)
+        t0 = time.perf_counter()
+        registry.get('face')
+        registry.get('voice')
+        load_s = time.perf_counter() - t0
+
+        stages = bench_stages(jpeg, wav, args.iterations)
+        batch_sweep = bench_batch_sweep(args.batch_sizes, args.iterations, rng)
+        concurrency_sweep = bench_concurrency_sweep(jpeg, wav, args.concurrency, args.iterations)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "iterations": args.iterations,
+            "jpeg_bytes": len(jpeg),
+            "wav_bytes": len(wav),
+            "model_load_s": load_s,
+            "process_peak_rss_mb": peak_rss_mb(),
+        },
+        "stages": stages,
+        "batch_sweep": batch_sweep,
+        "concurrency_sweep": concurrency_sweep,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get("stages")
+
+    print_stages(stages, baseline)
+    print("\nbatch sweep (scale + predict_proba):")
+    for r in batch_sweep:
+        print(f"  {r['model']:5s} bs={r['batch_size']:<4d} per-item {r['per_item_ms']:.3f} ms  "
+              f"{r['throughput_per_s']:.1f} item/s")
+    print("\nconcurrency sweep:")
+    for r in concurrency_sweep:
+        print(f"  {r['stage']:22s} c={r['concurrency']:<4d} p50 {r['p50_ms']:.2f} ms  "
+              f"p99 {r['p99_ms']:.2f} ms  {r['throughput_per_s']:.1f} req/s")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nHasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import os
+
+# ====================================================================
+# KONFIGURASI BERSAMA (bisa di-override lewat environment variable)
+# ====================================================================
+
+# Batas ukuran file media dari ESP32 (byte). Download yang melebihi batas ini dibatalkan.
+MAX_MEDIA_BYTES = int(os.environ.get("BRANKAS_MAX_MEDIA_BYTES", 5 * 1024 * 1024))
+
+# Timeout HTTP ke ESP32 (detik): (connect, read)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("BRANKAS_HTTP_CONNECT_TIMEOUT", 3.0))
+HTTP_READ_TIMEOUT = float(os.environ.get("BRANKAS_HTTP_READ_TIMEOUT", 10.0))
+
+# Pool koneksi keep-alive: jumlah host ESP32 yang di-cache & koneksi per host
+HTTP_POOL_HOSTS = int(os.environ.get("BRANKAS_HTTP_POOL_HOSTS", 32))
+HTTP_POOL_MAXSIZE = int(os.environ.get("BRANKAS_HTTP_POOL_MAXSIZE", 4))
+
+# Jumlah worker untuk download media dan untuk inferensi ML (CPU-bound)
+FETCH_WORKERS = int(os.environ.get("BRANKAS_FETCH_WORKERS", 16))
+INFERENCE_WORKERS = int(os.environ.get("BRANKAS_INFERENCE_WORKERS", os.cpu_count() or 2))
+
+# Micro-batching inferensi (adaptif): request tunggal langsung diproses; saat beberapa request
+# menumpuk, tunggu maksimal BATCH_WINDOW_MS lagi atau sampai BATCH_MAX_SIZE item
+BATCH_WINDOW_MS = float(os.environ.get("BRANKAS_BATCH_WINDOW_MS", 5.0))
+BATCH_MAX_SIZE = int(os.environ.get("BRANKAS_BATCH_MAX_SIZE", 32))
+
+# Pakai CompiledSVC (svc_engine) di jalur inferensi; set 0 untuk kembali ke sklearn
+USE_COMPILED_SVC = os.environ.get("BRANKAS_USE_COMPILED_SVC", "1") == "1"
+
+# Event store dashboard: jumlah baris di memori per log
+EVENT_BUFFER_CAPACITY = int(os.environ.get("BRANKAS_EVENT_BUFFER_CAPACITY", 5000))
+
+# Log telemetri persisten (SQLite WAL): lokasi file, ID brankas default, dan
+# jumlah baris terakhir yang dimuat ke memori dashboard saat sesi dimulai
+TELEMETRY_DB_PATH = os.environ.get("BRANKAS_TELEMETRY_DB", "telemetry.db")
+DEFAULT_VAULT_ID = os.environ.get("BRANKAS_VAULT_ID", "brankas-1")
+TELEMETRY_PRELOAD_ROWS = int(os.environ.get("BRANKAS_TELEMETRY_PRELOAD_ROWS", 500))
+
+# Ingesti MQTT bersama: jumlah event terakhir yang disimpan bus untuk sesi dashboard,
+# dan worker untuk download + inferensi media yang dipicu dari MQTT
+INGEST_BUS_CAPACITY = int(os.environ.get("BRANKAS_INGEST_BUS_CAPACITY", 1000))
+INGEST_MEDIA_WORKERS = int(os.environ.get("BRANKAS_INGEST_MEDIA_WORKERS", 2))
+# Antrean event MQTT & job media dashboard (lihat JobQueue di ingest.py); penuh -> job tertua prioritas terendah dibuang
+INGEST_QUEUE_CAPACITY = int(os.environ.get("BRANKAS_INGEST_QUEUE_CAPACITY", 2000))
+INGEST_MEDIA_QUEUE_CAPACITY = int(os.environ.get("BRANKAS_INGEST_MEDIA_QUEUE_CAPACITY", 32))
+
+# Interval (detik) fragment dashboard memeriksa versi data; panel hanya dibangun ulang jika berubah
+DASHBOARD_REFRESH_S = float(os.environ.get("BRANKAS_DASHBOARD_REFRESH_S", 1.0))
+
+# Cache prediksi (key = hash isi media + versi model): jumlah entri, umur maksimal (detik),
+# dan jumlah URL yang validator ETag/Last-Modified-nya disimpan
+PREDICTION_CACHE_SIZE = int(os.environ.get("BRANKAS_PREDICTION_CACHE_SIZE", 256))
+PREDICTION_CACHE_TTL = float(os.environ.get("BRANKAS_PREDICTION_CACHE_TTL", 600.0))
+URL_CACHE_SIZE = int(os.environ.get("BRANKAS_URL_CACHE_SIZE", 512))
+
+# Verifikasi suara streaming: MFCC dihitung selagi WAV diunduh. Keputusan awal diambil jika
+# confidence MY_YES/NOISE >= VOICE_EARLY_THRESHOLD (dicek tiap VOICE_EARLY_CHECK_SECONDS audio,
+# minimal setelah VOICE_EARLY_MIN_SECONDS). VOICE_STREAMING=1 mengaktifkan mode ini di /process
+# (melewati cache prediksi karena isi file belum tentu diunduh utuh).
+VOICE_STREAMING = os.environ.get("BRANKAS_VOICE_STREAMING", "0") == "1"
+VOICE_EARLY_THRESHOLD = float(os.environ.get("BRANKAS_VOICE_EARLY_THRESHOLD", 0.9))
+VOICE_EARLY_MIN_SECONDS = float(os.environ.get("BRANKAS_VOICE_EARLY_MIN_SECONDS", 0.5))
+VOICE_EARLY_CHECK_SECONDS = float(os.environ.get("BRANKAS_VOICE_EARLY_CHECK_SECONDS", 0.25))
+
+# VAD sebelum MFCC: frame aktif jika energi > VAD_FLOOR_DB (dBFS) dan tidak lebih dari VAD_TOP_DB
+# di bawah frame terkeras; median ZCR frame aktif > VAD_NOISE_ZCR dianggap noise.
+# VAD_PAD_MS = margin yang disisakan di sekitar ucapan.
+VAD_ENABLED = os.environ.get("BRANKAS_VAD_ENABLED", "1") == "1"
+VAD_FLOOR_DB = float(os.environ.get("BRANKAS_VAD_FLOOR_DB", -50.0))
+VAD_TOP_DB = float(os.environ.get("BRANKAS_VAD_TOP_DB", 40.0))
+VAD_NOISE_ZCR = float(os.environ.get("BRANKAS_VAD_NOISE_ZCR", 0.4))
+VAD_PAD_MS = float(os.environ.get("BRANKAS_VAD_PAD_MS", 100.0))
+
+# Deteksi wajah sebelum klasifikasi (opsional, model bawaan dilatih dengan frame penuh):
+# crop wajah terbesar, kotak dipakai ulang per kamera selama FACE_CROP_TTL detik dan selama
+# selisih rata-rata thumbnail 32x32 (0-255) < FACE_MOTION_THRESHOLD
+FACE_DETECT_ENABLED = os.environ.get("BRANKAS_FACE_DETECT", "0") == "1"
+FACE_DETECT_DECODE_SIZE = int(os.environ.get("BRANKAS_FACE_DETECT_DECODE_SIZE", 320))
+FACE_DETECT_MIN_SIZE = int(os.environ.get("BRANKAS_FACE_DETECT_MIN_SIZE", 40))
+FACE_CROP_TTL = float(os.environ.get("BRANKAS_FACE_CROP_TTL", 10.0))
+FACE_MOTION_THRESHOLD = float(os.environ.get("BRANKAS_FACE_MOTION_THRESHOLD", 8.0))
+FACE_CROP_MARGIN = float(os.environ.get("BRANKAS_FACE_CROP_MARGIN", 0.15))
+FACE_CAMERA_CACHE = int(os.environ.get("BRANKAS_FACE_CAMERA_CACHE", 64))
+
+# Profiler sampling untuk request /process yang lambat: aktif jika PROFILE_SLOW_MS > 0,
+# stack (format collapsed untuk flame graph) ditulis ke PROFILE_DIR
+PROFILE_SLOW_MS = float(os.environ.get("BRANKAS_PROFILE_SLOW_MS", 0))
+PROFILE_DIR = os.environ.get("BRANKAS_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.environ.get("BRANKAS_PROFILE_INTERVAL_MS", 5.0))
+
+# Multi-brankas: VAULT_TOPICS=1 -> topik per brankas "vault/<id>/<topik lama>" (topik lama tetap
+# diterima sebagai DEFAULT_VAULT_ID). Worker MQTT memakai shared subscription grup WORKER_GROUP.
+VAULT_TOPICS = os.environ.get("BRANKAS_VAULT_TOPICS", "0") == "1"
+WORKER_GROUP = os.environ.get("BRANKAS_WORKER_GROUP", "brankas-workers")
+
+# Proses inferensi (pre-fork, model .svc di-mmap bersama). 0 = thread pool di proses yang sama.
+INFERENCE_PROCESSES = int(os.environ.get("BRANKAS_INFERENCE_PROCESSES", 0))
+
+# Dashboard ikut mengunduh & menginferensi media dari MQTT; set 0 jika mqtt_worker.py sudah berjalan
+DASHBOARD_INFERENCE = os.environ.get("BRANKAS_DASHBOARD_INFERENCE", "1") == "1"
+
+# Mesin keputusan akses: hasil wajah/suara/sensor dikorelasikan per sesi (dikirim ESP32 di
+# status, URL media dan /process). Label diterima hanya jika confidence
+# wajah/suara >= batas minimum (hasil tanpa confidence, mis. dari MQTT lama, dianggap lolos).
+DECISION_FACE_MIN_CONF = float(os.environ.get("BRANKAS_DECISION_FACE_MIN_CONF", 0.5))
+DECISION_VOICE_MIN_CONF = float(os.environ.get("BRANKAS_DECISION_VOICE_MIN_CONF", 0.5))
+DECISION_MAX_ATTEMPTS = int(os.environ.get("BRANKAS_DECISION_MAX_ATTEMPTS", 5000))
+
+# Warmup web_server (opsional): satu gambar + satu WAV sintetis dijalankan lewat pipeline penuh
+# saat startup; /health baru melaporkan "ready" setelah selesai. Jeda reconnect MQTT (detik).
+WARMUP_ENABLED = os.environ.get("BRANKAS_WARMUP", "0") == "1"
+MQTT_RECONNECT_MIN_S = int(os.environ.get("BRANKAS_MQTT_RECONNECT_MIN_S", 1))
+MQTT_RECONNECT_MAX_S = int(os.environ.get("BRANKAS_MQTT_RECONNECT_MAX_S", 30))
+
+# Model wajah terkompresi PCA (lihat face_pca.py): pakai image_pca_model.pkl +
+# image_pca_projection.pkl sebagai model "face" menggantikan model full-resolution
+FACE_PCA_ENABLED = os.environ.get("BRANKAS_FACE_PCA", "0") == "1"
+
+# Broker MQTT (kosong = default masing-masing komponen: web_server broker.hivemq.com,
+# dashboard & mqtt_worker test.mosquitto.org). Dipakai juga oleh loadtest.py / local_broker.py.
+MQTT_BROKER = os.environ.get("BRANKAS_MQTT_BROKER", "")
+MQTT_PORT = int(os.environ.get("BRANKAS_MQTT_PORT", 1883))
@@ -1,449 +1,538 @@
-import streamlit as st
-import paho.mqtt.client as mqtt
-import pandas as pd
-import time
-from datetime import datetime
-import os
-import plotly.graph_objects as go
-import numpy as np
-import requests
-import pickle
-from PIL import Image
-import queue
-import librosa
-from io import BytesIO
-import json 
-import gdown
-
-# ====================================================================
-# KONFIGURASI HALAMAN & LAYOUT
-# ====================================================================
-st.set_page_config(layout="wide", page_title="🛡️ Sistem Keamanan Brankas Terpadu")
-
-# ====================================================================
-# KONFIGURASI KONSTANTA & TOPIK MQTT
-# ====================================================================
-MQTT_BROKER = "test.mosquitto.org" 
-MQTT_PORT = 1883
-
-TOPIC_BRANKAS = "data/status/kontrol"
-TOPIC_FACE_RESULT = "ai/face/result"
-TOPIC_VOICE_RESULT = "ai/voice/result"
-TOPIC_CAM_URL = "iot/camera/photo" 
-TOPIC_AUDIO_LINK = "data/audio/link" 
-# TOPIC_DIST dan TOPIC_PIR telah dihapus
-TOPIC_ALARM = "data/Allert/kontrol"
-TOPIC_CAM_TRIGGER = "data/cam/capture" 
-TOPIC_REC_TRIGGER = "data/mic/trigger" 
-
-# Konfigurasi ML
-IMG_SIZE = 96
-CLASS_NAMES_FACE = ['ANGGI_FACES', 'DEVI_FACES', 'FARIDA_FACES', 'ILHAM_FACES', 'OTHER_FACES']
-CLASS_NAMES_VOICE = ['MY_YES','ANOTHER_YES','NOT_YS','NOISE']
-SAMPLE_RATE = 16000
-N_MFCC = 40
-GD_MODEL_IMAGE_ID = "1OsMc-fey6Z2vwuZ815QwI7JVtinynOIJ"
-
-# ====================================================================
-# BAGIAN 1: INISIALISASI SESSION STATE
-# ====================================================================
-def download_models_from_gdrive():
-    if not os.path.exists('image_scaler.pkl'):
-        try:
-            print("Mengunduh image_scaler.pkl...")
-            gdown.download(id=GD_MODEL_IMAGE_ID, output='image_scaler.pkl', quiet=False)
-        except Exception as e:
-            print(f"Gagal mengunduh image_scaler.pkl: {e}")
-
-download_models_from_gdrive()
-
-if 'mqtt_internal_queue' not in st.session_state: 
-    st.session_state.mqtt_internal_queue = queue.Queue()
-
-if 'data_brankas' not in st.session_state:
-    st.session_state.data_brankas = pd.DataFrame(columns=["Timestamp", "Status Brankas", "Jarak (cm)", "PIR", "Prediksi Wajah", "Prediksi Suara", "Label Prediksi"])
-    
-if 'data_face' not in st.session_state:
-    st.session_state.data_face = pd.DataFrame(columns=["Timestamp", "Hasil Prediksi", "Status", "Keterangan"])
-    
-if 'data_voice' not in st.session_state:
-    st.session_state.data_voice = pd.DataFrame(columns=["Timestamp", "Hasil Prediksi", "Status", "Keterangan"])
-    
-if 'photo_url' not in st.session_state: st.session_state.photo_url = "https://via.placeholder.com/640x480?text=Menunggu+Foto"
-if 'audio_url' not in st.session_state: st.session_state.audio_url = None
-if 'last_refresh' not in st.session_state: st.session_state.last_refresh = time.time()
-
-# ====================================================================
-# BAGIAN 2: FUNGSI MACHINE LEARNING
-# ====================================================================
-
-@st.cache_resource
-def load_ml_models():
-    models = {}
-    load_status = {"face": False, "voice": False} 
-    
-    # --- LOAD MODEL WAJAH (Dari Lokal) ---
-    try:
-        with open('image_model.pkl', 'rb') as f:
-            models['face_svc'] = pickle.load(f)
-        with open('image_scaler.pkl', 'rb') as f:
-            models['face_scaler'] = pickle.load(f)
-        load_status["face"] = True
-    except Exception as e:
-        models['face_svc'] = None
-        models['face_scaler'] = None
-
-    # --- LOAD MODEL SUARA (Dari Lokal) ---
-    try:
-        with open('audio_model.pkl', 'rb') as f:
-            models['voice_svc'] = pickle.load(f)
-        with open('audio_scaler.pkl', 'rb') as f:
-            models['voice_scaler'] = pickle.load(f)
-        load_status["voice"] = True
-    except Exception as e:
-        models['voice_svc'] = None
-        models['voice_scaler'] = None
-
-    return models, load_status
-
-ml_models, ml_status = load_ml_models() 
-
-# Notifikasi status model (opsional)
-if ml_status["face"]:
-    st.toast("✅ Model Wajah Dimuat dari Lokal", icon="🖼️")
-else:
-    st.toast("⚠️ Gagal Memuat Model Wajah! Pastikan image_model.pkl & image_scaler.pkl ada.", icon="❌")
-    
-if ml_status["voice"]:
-    st.toast("✅ Model Suara Dimuat dari Lokal", icon="🎤")
-else:
-    st.toast("⚠️ Gagal Memuat Model Suara! Pastikan audio_model.pkl & audio_scaler.pkl ada.", icon="❌")
-
-# --- Fungsi Prediksi Tetap Sama ---
-
-def process_and_predict_image(image_bytes):
-    if not ml_models['face_svc']: return "Model Error", 0.0
-    try:
-        image = Image.open(BytesIO(image_bytes)).convert('L') 
-        image = image.resize((IMG_SIZE, IMG_SIZE))
-        img_array = np.array(image).flatten().reshape(1, -1)
-        
-        features_scaled = ml_models['face_scaler'].transform(img_array)
-        pred_idx = ml_models['face_svc'].predict(features_scaled)[0]
-        
-        try:
-            pred_label = CLASS_NAMES_FACE[ml_models['face_svc'].classes_.tolist().index(pred_idx)]
-        except:
-             pred_label = str(pred_idx)
-        
-        proba = ml_models['face_svc'].predict_proba(features_scaled)[0]
-        confidence = np.max(proba)
-        
-        return pred_label, confidence
-    except Exception as e:
-        return f"Error: {e}", 0.0
-
-def process_and_predict_audio(audio_path_or_file):
-    if not ml_models['voice_svc']: return "Model Error", 0.0
-    
-    try:
-        voice, sr = librosa.load(audio_path_or_file, sr=SAMPLE_RATE, res_type='kaiser_fast')
-        if len(voice) == 0: return "No Audio Data", 0.0
-            
-        mfccs = librosa.feature.mfcc(y=voice, sr=sr, n_mfcc=N_MFCC)
-        mfccs_processed = np.mean(mfccs.T, axis=0)
-        
-        features_scaled = ml_models['voice_scaler'].transform([mfccs_processed])
-        pred_idx = ml_models['voice_svc'].predict(features_scaled)[0]
-        
-        try:
-             pred_label = CLASS_NAMES_VOICE[ml_models['voice_svc'].classes_.tolist().index(pred_idx)]
-        except:
-             pred_label = str(pred_idx)
-        
-        proba = ml_models['voice_svc'].predict_proba(features_scaled)[0]
-        confidence = np.max(proba)
-        
-        return pred_label, confidence
-    except Exception as e:
-        return f"Error: {e}", 0.0
-
-def download_and_process_media(url, media_type, mqtt_client):
-    if not url.startswith("http"): return
-    
-    try:
-        st.toast(f'📥 Mengunduh {media_type} dari {url}...', icon='⬇️')
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            if media_type == "picture":
-                result, conf = process_and_predict_image(response.content)
-                mqtt_client.publish(TOPIC_FACE_RESULT, result)
-                st.toast(f'🤖 Hasil Wajah: {result} ({conf*100:.1f}%)', icon='✅')
-            elif media_type == "voice":
-                temp_filename = f"temp_voice_{int(time.time())}.wav"
-                with open(temp_filename, "wb") as f:
-                    f.write(response.content)
-                
-                result, conf = process_and_predict_audio(temp_filename)
-                mqtt_client.publish(TOPIC_VOICE_RESULT, result)
-                os.remove(temp_filename) 
-                st.toast(f"🤖 Hasil Suara: {result} ({conf*100:.1f}%)", icon='✅')
-        else:
-            st.toast(f"Gagal unduh: Status {response.status_code}", icon='⚠️')
-    except requests.exceptions.Timeout:
-        st.toast("Timeout saat mengunduh media.", icon='❌')
-    except Exception as e:
-        print(f"Error processing media: {e}")
-        st.toast(f"Error pemrosesan media: {e}", icon='❌')
-
-# ====================================================================
-# BAGIAN 3: LOGIKA MQTT & CACHING
-# ====================================================================
-
-def on_connect(client, userdata, flags, rc, properties=None):
-    if rc == 0:
-        # HANYA SUBSCRIBE TOPIK YANG AKTIF DAN RELEVAN
-        client.subscribe([
-            (TOPIC_BRANKAS, 0), 
-            (TOPIC_FACE_RESULT, 0), 
-            (TOPIC_VOICE_RESULT, 0), 
-            (TOPIC_CAM_URL, 0), 
-            (TOPIC_AUDIO_LINK, 0)
-        ])
-        print('✅ MQTT Connected')
-
-def on_message(client, userdata, msg):
-    internal_queue = userdata 
-    try:
-        payload = msg.payload.decode("utf-8").strip()
-        internal_queue.put({
-            "topic": msg.topic, 
-            "payload": payload, 
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S") 
-        })
-    except: 
-        pass
-
-@st.cache_resource
-def get_mqtt_client_cached():
-    client_id = f"StreamlitApp-{os.getpid()}-{int(time.time())}"
-    try:
-        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=True)
-        client.on_connect = on_connect
-        client.on_message = on_message
-        client.user_data_set(st.session_state.mqtt_internal_queue) 
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        client.loop_start()
-        return client
-    except Exception as e:
-        st.error(f"Gagal Connect MQTT: {e}")
-        return None
-
-# ====================================================================
-# BAGIAN 4: PROSES ANTRIAN DATA (FUNGSI UTAMA)
-# ====================================================================
-def process_queue_and_logic():
-    internal_queue = st.session_state.mqtt_internal_queue
-    messages = []
-    data_updated = False
-
-    while not internal_queue.empty():
-        try:
-             messages.append(internal_queue.get_nowait()) 
-             data_updated = True 
-        except queue.Empty:
-             break
-
-    if not messages: return False 
-
-    client = get_mqtt_client_cached()
-
-    for msg in messages:
-        topic = msg['topic']
-        payload = msg['payload']
-        timestamp = msg['time']
-        
-        # --- LOGIKA UTAMA: PARSING JSON DARI TOPIC_BRANKAS ---
-        if topic == TOPIC_BRANKAS: 
-            try:
-                data_json = json.loads(payload)
-                
-                # MENGGUNAKAN KUNCI DUMMY: status_val, jarak_val, pir_val (Fix JSON Key)
-                status_val = data_json.get("status_val", "Unknown") 
-                jarak_val = float(data_json.get("jarak_val", np.nan)) 
-                pir_val = int(data_json.get("pir_val", np.nan)) 
-
-                new_row = {
-                    "Timestamp": timestamp, 
-                    "Status Brankas": status_val, 
-                    "Jarak (cm)": jarak_val, 
-                    "PIR": pir_val, 
-                    "Prediksi Wajah": "PENDING",
-                    "Prediksi Suara": "PENDING",
-                    "Label Prediksi": "Belum Diproses"
-                }
-                
-                st.session_state.data_brankas = pd.concat(
-                    [st.session_state.data_brankas, pd.DataFrame([new_row])], 
-                    ignore_index=True
-                )
-                data_updated = True
-                
-            except json.JSONDecodeError:
-                # Fallback untuk non-JSON
-                new_row = {
-                    "Timestamp": timestamp, 
-                    "Status Brankas": payload,
-                    "Jarak (cm)": np.nan, 
-                    "PIR": np.nan, 
-                    "Prediksi Wajah": "PENDING", 
-                    "Prediksi Suara": "PENDING",
-                    "Label Prediksi": "Format Salah"
-                }
-                st.session_state.data_brankas = pd.concat([st.session_state.data_brankas, pd.DataFrame([new_row])], ignore_index=True)
-                data_updated = True
-
-        # --- LOGIKA MEDIA & HASIL ML (UPDATE BARIS TERAKHIR) ---
-        elif not st.session_state.data_brankas.empty:
-            last_idx = st.session_state.data_brankas.index[-1]
-            
-            if topic == TOPIC_FACE_RESULT:
-                st.session_state.data_brankas.loc[last_idx, 'Prediksi Wajah'] = payload
-                st.session_state.data_face = pd.concat([st.session_state.data_face, pd.DataFrame([{"Timestamp": timestamp, "Hasil Prediksi": payload, "Status": "Success", "Keterangan": "MQTT"}])], ignore_index=True)
-                data_updated = True
-                
-            elif topic == TOPIC_VOICE_RESULT:
-                st.session_state.data_brankas.loc[last_idx, 'Prediksi Suara'] = payload
-                st.session_state.data_voice = pd.concat([st.session_state.data_voice, pd.DataFrame([{"Timestamp": timestamp, "Hasil Prediksi": payload, "Status": "Success", "Keterangan": "MQTT"}])], ignore_index=True)
-                data_updated = True
-
-            elif topic == TOPIC_CAM_URL:
-                st.session_state.photo_url = f"{payload}?t={int(time.time())}"
-                data_updated = True
-                download_and_process_media(payload, "picture", client) 
-
-            elif topic == TOPIC_AUDIO_LINK:
-                st.session_state.audio_url = f"{payload}?t={int(time.time())}"
-                data_updated = True
-                download_and_process_media(payload, "voice", client) 
-
-    # --- LOGIKA LABEL PREDIKSI AKHIR ---
-    if not st.session_state.data_brankas.empty:
-        # Terapkan logika prediksi akhir
-        def final_pred(row):
-            w = row.get("Prediksi Wajah", "PENDING")
-            s = row.get("Prediksi Suara", "PENDING")
-            
-            stt = row.get("Status Brankas", "")
-            if "Dibuka Paksa" in stt: return "🚨 DIBOBOL!"
-            
-            p = row.get("PIR", np.nan)
-            j = row.get("Jarak (cm)", np.nan)
-            
-            # 1. Cek apakah ada data yang masih PENDING (ML atau Sensor)
-            if pd.isna(j) or pd.isna(p) or w == "PENDING" or s == "PENDING":
-                 if stt in ["AMAN", "STANDBY", "TERKUNCI", "Brangkas Aman"]: 
-                    return "🔄 PENDING DATA" 
-                 else:
-                    return stt 
-            
-            # 2. Cek Gerakan Sensor
-            if pd.notna(p) and p == 1: 
-                return "👀 MOTION DETECTED"
-            if pd.notna(j) and j < 5: 
-                return "⚠️ OBJECT NEAR"
-                
-            # 3. Cek Prediksi ML
-            if w in ["Error", "Model Error"] or s in ["Error", "Model Error"]:
-                return "❌ ML ERROR"
-                
-            if w in ["Unknown", "OTHER_FACES"] or s in ["ANOTHER_YES", "NOT_YS", "NOISE"]: 
-                return "⚠️ REJECTED/SUSPICIOUS"
-            
-            # 4. ACCEPTED
-            if w in CLASS_NAMES_FACE[:4] and s == "MY_YES":
-                return "✅ ACCEPTED"
-            
-            # 5. Default
-            return "✅ STANDBY"
-            
-        st.session_state.data_brankas["Label Prediksi"] = st.session_state.data_brankas.apply(final_pred, axis=1)
-
-    return data_updated 
-
-# ====================================================================
-# BAGIAN 5: UI DASHBOARD (STREAMLIT)
-# ====================================================================
-
-mqtt_client = get_mqtt_client_cached()
-if not mqtt_client: st.stop() 
-
-st.title("🛡️ Dashboard Keamanan Brankas (All-in-One)")
-
-has_update = process_queue_and_logic()
-
-col1, col2 = st.columns([2, 1])
-
-with col1:
-    st.subheader("📡 Live Sensor Data & Log Brankas")
-    df = st.session_state.data_brankas.tail(50)
-    
-    if not df.empty and 'Jarak (cm)' in df and 'PIR' in df:
-        df_plot = df.set_index("Timestamp").copy()
-        df_clean = df_plot.dropna(subset=['Jarak (cm)', 'PIR'])
-        
-        # Grafik Sensor Jarak dan PIR 
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_clean.index, y=df_clean["Jarak (cm)"], name="Jarak (cm)", line=dict(color='blue')))
-        fig.add_trace(go.Scatter(x=df_clean.index, y=df_clean["PIR"], name="PIR (1/0)", yaxis="y2", line=dict(color='orange', dash='dot')))
-        
-        fig.update_layout(
-            height=400, 
-            yaxis=dict(title="Jarak (cm)", range=[0, 100]), 
-            yaxis2=dict(title="PIR (1=Gerak)", overlaying="y", side="right", range=[-0.1, 1.1], tickvals=[0, 1]),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        # FIX: use_container_width=True diganti menjadi width='stretch'
-        st.plotly_chart(fig, width='stretch') 
-    else:
-        st.info("Menunggu data sensor untuk membuat grafik...")
-
-with col2:
-    st.subheader("📸 Media & Kontrol")
-    # FIX: use_container_width=True diganti menjadi width='stretch'
-    st.image(st.session_state.photo_url, caption="Foto dari Kamera Terakhir", width='stretch')
-    
-    c1, c2, c3 = st.columns(3)
-    # FIX: use_container_width=True diganti menjadi width='stretch'
-    if c1.button("📷 FOTO", help="Memicu ESP32 untuk mengambil foto", width='stretch'): mqtt_client.publish(TOPIC_CAM_TRIGGER, "capture")
-    if c2.button("🎤 VOICE", help="Memicu ESP32 untuk merekam/kirim audio", width='stretch'): mqtt_client.publish(TOPIC_REC_TRIGGER, "trigger")
-    if c3.button("🔇 OFF ALARM", help="Mematikan Alarm/Buzzer", width='stretch'): mqtt_client.publish(TOPIC_ALARM, "OFF")
-
-    col_reset, col_kontroll = st.columns(2)
-    if col_reset.button("🔄 RESET", help="Reset/Clear Status di ESP32", width='stretch'): mqtt_client.publish(TOPIC_BRANKAS, "RESET")
-    if col_kontroll.button("OPEN", help="Memicu Open", width='stretch'): mqtt_client.publish(TOPIC_BRANKAS, "OPEN")
-    
-    st.markdown("---")
-    st.write("🔊 Audio Terakhir:")
-    if st.session_state.audio_url:
-        st.audio(st.session_state.audio_url, format='audio/wav')
-    else:
-        st.info("Menunggu link audio dari ESP32...")
-
-t1, t2 = st.tabs(["Data Log Brankas (Raw)", "ML Logs (Wajah & Suara)"])
-
-with t1: 
-    st.dataframe(st.session_state.data_brankas.iloc[::-1], width='stretch')
-
-with t2:
-    c_a, c_b = st.columns(2)
-    c_a.write("Log Prediksi Wajah"); 
-    c_a.dataframe(st.session_state.data_face.tail(10).iloc[::-1], width='stretch')
-    c_b.write("Log Prediksi Suara"); 
-    c_b.dataframe(st.session_state.data_voice.tail(10).iloc[::-1], width='stretch')
-
-if has_update or (time.time() - st.session_state.last_refresh > 3):
-    st.session_state.last_refresh = time.time()
-    st.rerun()
-
+import streamlit as st
+import pandas as pd
+import time
+from datetime import datetime
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+import plotly.graph_objects as go
+import numpy as np
+import requests
+import gdown
+from model_registry import registry
+from dashboard_ml import process_and_predict_image, process_and_predict_audio
+from media_io import MediaTooLargeError
+from prediction_cache import get_prediction_cache, MODEL_FOR_MEDIA
+from event_store import EventStore, FLOAT, OBJECT
+from telemetry_store import TelemetryStore
+from ingest import IngestService, JobQueue, start_workers, PRIORITY_ALARM, PRIORITY_EVENT, PRIORITY_MEDIA
+from topics import topic, subscriptions, parse_topic, RESULT_KINDS
+from decision import DecisionEngine, FORCED_STATUS, sensor_reading, media_reading, result_reading, result_payload
+import metrics
+from config import (
+    EVENT_BUFFER_CAPACITY, DEFAULT_VAULT_ID, TELEMETRY_PRELOAD_ROWS, INGEST_MEDIA_WORKERS,
+    INGEST_QUEUE_CAPACITY, INGEST_MEDIA_QUEUE_CAPACITY,
+    DASHBOARD_REFRESH_S, DASHBOARD_INFERENCE, MQTT_BROKER as MQTT_BROKER_OVERRIDE, MQTT_PORT,
+)
+
+# ====================================================================
+# KONFIGURASI HALAMAN & LAYOUT
+# ====================================================================
+st.set_page_config(layout="wide", page_title="🛡️ Sistem Keamanan Brankas Terpadu")
+
+# ====================================================================
+# KONFIGURASI KONSTANTA & TOPIK MQTT
+# ====================================================================
+MQTT_BROKER = MQTT_BROKER_OVERRIDE or "test.mosquitto.org" 
+
+# Nama topik (lama & per brankas "vault/<id>/...") ada di topics.py
+# TOPIC_DIST dan TOPIC_PIR telah dihapus
+INGEST_KINDS = ["status", "face_result", "voice_result", "cam_url", "audio_link", "cam_view", "audio_view"]
+
+# Konfigurasi ML (IMG_SIZE, CLASS_NAMES_*, SAMPLE_RATE, N_MFCC ada di dashboard_ml.py)
+GD_MODEL_IMAGE_ID = "1OsMc-fey6Z2vwuZ815QwI7JVtinynOIJ"
+
+# ====================================================================
+# BAGIAN 1: INISIALISASI SESSION STATE
+# ====================================================================
+def download_models_from_gdrive():
+    if not os.path.exists('image_scaler.pkl'):
+        try:
+            print("Mengunduh image_scaler.pkl...")
+            gdown.download(id=GD_MODEL_IMAGE_ID, output='image_scaler.pkl', quiet=False)
+        except Exception as e:
+            print(f"Gagal mengunduh image_scaler.pkl: {e}")
+
+download_models_from_gdrive()
+
+BRANKAS_COLUMNS = {"Timestamp": OBJECT, "Status Brankas": OBJECT, "Jarak (cm)": FLOAT, "PIR": FLOAT, "Prediksi Wajah": OBJECT, "Prediksi Suara": OBJECT, "Label Prediksi": OBJECT}
+ML_LOG_COLUMNS = {"Timestamp": OBJECT, "Hasil Prediksi": OBJECT, "Status": OBJECT, "Keterangan": OBJECT}
+
+@st.cache_resource
+def get_telemetry_store():
+    # Satu file SQLite (WAL) per proses, dipakai bersama semua sesi browser
+    return TelemetryStore()
+
+telemetry = get_telemetry_store()
+
+class VaultState:
+    """State dashboard satu brankas, dipakai bersama semua sesi (diisi oleh ingesti MQTT)."""
+
+    def __init__(self, telemetry, vault_id):
+        self.vault_id = vault_id
+        # Ring buffer kolom (append O(1)) dengan write-through ke log telemetri.
+        # Hanya TELEMETRY_PRELOAD_ROWS baris terakhir yang dimuat saat brankas pertama dipakai;
+        # riwayat lengkap tetap di disk.
+        self.data_brankas = EventStore(BRANKAS_COLUMNS, EVENT_BUFFER_CAPACITY, sink=telemetry.sensor_sink(vault_id))
+        self.data_brankas.load(telemetry.sensor_window(vault_id, limit=TELEMETRY_PRELOAD_ROWS))
+        self.data_face = EventStore(ML_LOG_COLUMNS, EVENT_BUFFER_CAPACITY, sink=telemetry.ml_sink("face", vault_id))
+        self.data_face.load(telemetry.ml_window("face", vault_id, limit=TELEMETRY_PRELOAD_ROWS))
+        self.data_voice = EventStore(ML_LOG_COLUMNS, EVENT_BUFFER_CAPACITY, sink=telemetry.ml_sink("voice", vault_id))
+        self.data_voice.load(telemetry.ml_window("voice", vault_id, limit=TELEMETRY_PRELOAD_ROWS))
+        self.photo_url = "https://via.placeholder.com/640x480?text=Menunggu+Foto"
+        self.audio_url = None
+        # Attempt DecisionEngine -> seq baris data_brankas yang menampilkannya
+        self.rows = OrderedDict()
+
+    def link(self, attempt_id, seq):
+        self.rows[attempt_id] = seq
+        while len(self.rows) > EVENT_BUFFER_CAPACITY:
+            self.rows.popitem(last=False)
+
+class VaultHub:
+    """Semua brankas yang dikenal dashboard (dibuat saat pesan pertamanya datang)."""
+
+    def __init__(self, telemetry):
+        self.telemetry = telemetry
+        self._vaults = {}
+        self._lock = threading.Lock()
+        # Event MQTT diterapkan oleh satu thread dispatcher (alarm lebih dulu), media oleh INGEST_MEDIA_WORKERS thread;
+        # keduanya antrean terbatas, jadi burst trigger tidak menumpuk di memori
+        self.events = JobQueue(INGEST_QUEUE_CAPACITY, name="ingest")
+        self.media_jobs = JobQueue(INGEST_MEDIA_QUEUE_CAPACITY, name="media")
+        # Verdict akses semua brankas (pengganti final_pred per baris, lihat decision.py)
+        self.engine = DecisionEngine()
+
+    def get(self, vault_id):
+        state = self._vaults.get(vault_id)
+        if state is None:
+            with self._lock:
+                state = self._vaults.get(vault_id)
+                if state is None:
+                    state = VaultState(self.telemetry, vault_id)
+                    self._vaults[vault_id] = state
+        return state
+
+    def ids(self):
+        return sorted(set(self._vaults) | set(self.telemetry.vaults()) | {DEFAULT_VAULT_ID})
+
+    def version(self):
+        return tuple((vid, v.data_brankas.version) for vid, v in sorted(self._vaults.items()))
+
+@st.cache_resource
+def get_vault_hub():
+    return VaultHub(telemetry)
+
+hub = get_vault_hub()
+
+# ====================================================================
+# BAGIAN 2: FUNGSI MACHINE LEARNING
+# ====================================================================
+
+def load_ml_models():
+    # Model disimpan di model_registry (satu salinan per proses, reload otomatis saat .pkl berubah)
+    load_status = {"face": False, "voice": False} 
+    
+    for name in load_status:
+        try:
+            registry.get(name)
+            load_status[name] = True
+        except Exception:
+            load_status[name] = False
+
+    return registry, load_status
+
+ml_models, ml_status = load_ml_models() 
+
+# Notifikasi status model (opsional)
+if ml_status["face"]:
+    st.toast("✅ Model Wajah Dimuat dari Lokal", icon="🖼️")
+else:
+    st.toast("⚠️ Gagal Memuat Model Wajah! Pastikan image_model.pkl & image_scaler.pkl ada.", icon="❌")
+    
+if ml_status["voice"]:
+    st.toast("✅ Model Suara Dimuat dari Lokal", icon="🎤")
+else:
+    st.toast("⚠️ Gagal Memuat Model Suara! Pastikan audio_model.pkl & audio_scaler.pkl ada.", icon="❌")
+
+# --- Fungsi Prediksi ada di dashboard_ml.py ---
+
+# Event internal (bukan topik MQTT) untuk notifikasi toast ke semua sesi
+TOPIC_NOTICE = "_dashboard/notice"
+
+def notify(bus, message, icon):
+    bus.publish({"topic": TOPIC_NOTICE, "payload": message, "icon": icon, "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "data": None})
+
+# Hasil gagal tidak disimpan di cache prediksi
+UNCACHED_RESULTS = ("Error", "Model Error", "No Audio Data")
+
+def download_and_process_media(url, media_type, session, service, vault):
+    # Dijalankan sekali per URL di worker ingesti; hasil dikirim lewat MQTT & notifikasi bus
+    if not url.startswith("http"): return
+    bus = service.bus
+    vault_id = vault.vault_id
+    
+    try:
+        notify(bus, f'📥 Mengunduh {media_type} dari {url}...', '⬇️')
+        # URL yang sudah dikenal dicek dengan ETag/Last-Modified; isi yang sama -> hasil dari cache
+        cache = get_prediction_cache()
+        lookup = cache.fetch(url, MODEL_FOR_MEDIA[media_type])
+        if lookup.hit:
+            result, conf = lookup.result
+        else:
+            # Media dibaca langsung ke buffer memori, tanpa file sementara
+            if media_type == "picture":
+                result, conf = process_and_predict_image(lookup.buffer, urlparse(url).netloc)
+            else:
+                result, conf = process_and_predict_audio(lookup.buffer)
+            if not result.startswith(UNCACHED_RESULTS):
+                cache.store(lookup.key, (result, conf))
+
+        # Sesi dari pesan URL ikut dikirim, supaya hasil masuk ke attempt yang benar
+        service.publish(topic(RESULT_KINDS[media_type], vault_id), result_payload(result, conf, session))
+        if media_type == "picture":
+            notify(bus, f'🤖 [{vault_id}] Hasil Wajah: {result} ({conf*100:.1f}%)', '✅')
+        elif media_type == "voice":
+            notify(bus, f"🤖 [{vault_id}] Hasil Suara: {result} ({conf*100:.1f}%)", '✅')
+    except requests.exceptions.HTTPError as e:
+        notify(bus, f"Gagal unduh: Status {e.response.status_code}", '⚠️')
+    except MediaTooLargeError as e:
+        notify(bus, f"Media terlalu besar: {e}", '❌')
+    except requests.exceptions.Timeout:
+        notify(bus, "Timeout saat mengunduh media.", '❌')
+    except Exception as e:
+        print(f"Error processing media: {e}")
+        notify(bus, f"Error pemrosesan media: {e}", '❌')
+
+# ====================================================================
+# BAGIAN 3: INGESTI MQTT BERSAMA (SATU SUBSCRIBER PER SERVER)
+# ====================================================================
+
+def brankas_row(event):
+    # MENGGUNAKAN KUNCI DUMMY: status_val, jarak_val, pir_val (Fix JSON Key)
+    data_json = event["data"]
+    if isinstance(data_json, dict):
+        return {
+            "Timestamp": event["time"], 
+            "Status Brankas": data_json.get("status_val", "Unknown"), 
+            "Jarak (cm)": float(data_json.get("jarak_val", np.nan)), 
+            "PIR": int(data_json.get("pir_val", np.nan)), 
+            "Prediksi Wajah": "PENDING",
+            "Prediksi Suara": "PENDING",
+            "Label Prediksi": "Belum Diproses"
+        }
+    # Fallback untuk non-JSON
+    return {
+        "Timestamp": event["time"], 
+        "Status Brankas": event["payload"],
+        "Jarak (cm)": np.nan, 
+        "PIR": np.nan, 
+        "Prediksi Wajah": "PENDING", 
+        "Prediksi Suara": "PENDING",
+        "Label Prediksi": "Format Salah"
+    }
+
+def record_result(engine, vault, modality, event):
+    """Pasangkan hasil ML ke attempt sesinya; hasil tanpa sesi hanya masuk log ML. Output: label."""
+    label, conf, session = result_reading(event)
+    attempt_id = engine.add_result(vault.vault_id, modality, label, conf, session)
+    if attempt_id is None:
+        return label
+    seq = vault.rows.get(attempt_id)
+    if seq is None:
+        # Hasil sesi yang bacaan sensornya belum/tidak ada: tampilkan sebagai baris sendiri
+        seq = vault.data_brankas.append({"Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Prediksi Wajah": "PENDING", "Prediksi Suara": "PENDING", "Label Prediksi": "Belum Diproses"})
+        vault.link(attempt_id, seq)
+    column = 'Prediksi Wajah' if modality == "face" else 'Prediksi Suara'
+    try:
+        vault.data_brankas.update(seq, column, label)
+    except KeyError:
+        pass  # baris sudah keluar dari buffer memori
+    return label
+
+def enqueue_event(hub, event):
+    """Dipanggil di thread MQTT: hanya klasifikasi prioritas lalu masuk antrean (tanpa I/O)."""
+    _, kind = parse_topic(event["topic"])
+    if kind is None:
+        return
+    priority = PRIORITY_EVENT
+    if kind == "status" and sensor_reading(event)[0] == FORCED_STATUS:
+        priority = PRIORITY_ALARM
+    hub.events.put(event, priority)
+
+def enqueue_media(hub, url, media_type, session, vault):
+    # Satu job per (brankas, tipe media): URL baru menimpa URL lama yang belum sempat diproses
+    hub.media_jobs.put((url, media_type, session, vault), PRIORITY_MEDIA, key=(vault.vault_id, media_type))
+
+def apply_event(hub, service, event):
+    """Terapkan satu event MQTT ke state brankasnya (dipanggil sekali per pesan, di thread dispatcher)."""
+    vault_id, kind = parse_topic(event["topic"])
+    if kind is None:
+        return
+    vault = hub.get(vault_id)
+    timestamp = event["time"]
+
+    # --- LOGIKA UTAMA: PARSING JSON DARI TOPIC_BRANKAS ---
+    if kind == "status": 
+        row = brankas_row(event)
+        seq = vault.data_brankas.append(row)
+        _, _, _, session = sensor_reading(event)
+        vault.link(hub.engine.add_sensor(vault_id, row["Status Brankas"], row["Jarak (cm)"], row["PIR"], session), seq)
+
+    # --- LOGIKA MEDIA & HASIL ML (DIPASANGKAN KE ATTEMPT) ---
+    elif kind == "face_result":
+        label = record_result(hub.engine, vault, "face", event)
+        vault.data_face.append({"Timestamp": timestamp, "Hasil Prediksi": label, "Status": "Success", "Keterangan": "MQTT"})
+        
+    elif kind == "voice_result":
+        label = record_result(hub.engine, vault, "voice", event)
+        vault.data_voice.append({"Timestamp": timestamp, "Hasil Prediksi": label, "Status": "Success", "Keterangan": "MQTT"})
+
+    elif kind == "cam_url":
+        url, session = media_reading(event)
+        vault.photo_url = f"{url}?t={int(time.time())}"
+        if DASHBOARD_INFERENCE:
+            enqueue_media(hub, url, "picture", session, vault)
+
+    elif kind == "audio_link":
+        url, session = media_reading(event)
+        vault.audio_url = f"{url}?t={int(time.time())}"
+        if DASHBOARD_INFERENCE:
+            enqueue_media(hub, url, "voice", session, vault)
+
+    # --- MEDIA YANG SUDAH DIINFERENSI SERVER: HANYA DITAMPILKAN ---
+    elif kind == "cam_view":
+        vault.photo_url = f"{media_reading(event)[0]}?t={int(time.time())}"
+
+    elif kind == "audio_view":
+        vault.audio_url = f"{media_reading(event)[0]}?t={int(time.time())}"
+
+    # --- LOGIKA LABEL PREDIKSI AKHIR ---
+    # Verdict dihitung sekaligus (vektor) hanya untuk attempt yang baru/berubah
+    for attempt in hub.engine.evaluate():
+        state = hub.get(attempt.vault_id)
+        seq = state.rows.get(attempt.id)
+        if seq is not None:
+            try:
+                state.data_brankas.update(seq, "Label Prediksi", attempt.verdict)
+            except KeyError:
+                pass
+
+@st.cache_resource
+def get_ingest_service():
+    service = IngestService(MQTT_BROKER, MQTT_PORT, subscriptions(INGEST_KINDS), client_prefix=f"StreamlitApp-{os.getpid()}")
+    hub = get_vault_hub()
+    service.add_handler(lambda event: enqueue_event(hub, event))
+    start_workers(hub.events, lambda event: apply_event(hub, service, event), 1)
+    start_workers(hub.media_jobs, lambda job: download_and_process_media(*job, service), INGEST_MEDIA_WORKERS)
+    metrics.register_collector("ingest_queue", hub.events.stats)
+    metrics.register_collector("media_queue", hub.media_jobs.stats)
+    try:
+        return service.start()
+    except Exception as e:
+        st.error(f"Gagal Connect MQTT: {e}")
+        return None
+
+# ====================================================================
+# BAGIAN 4: PROSES EVENT UNTUK SESI INI
+# ====================================================================
+def process_queue_and_logic():
+    # State sudah diperbarui oleh ingesti; sesi hanya membaca event baru dari cursor-nya
+    events = st.session_state.subscription.poll()
+    for event in events:
+        if event["topic"] == TOPIC_NOTICE:
+            st.toast(event["payload"], icon=event["icon"])
+    return bool(events)
+
+# ====================================================================
+# BAGIAN 5: UI DASHBOARD (STREAMLIT)
+# ====================================================================
+
+ingest_service = get_ingest_service()
+if not ingest_service: st.stop() 
+mqtt_client = ingest_service.client
+
+# Cursor per sesi: mulai dari event terbaru, state lama sudah ada di vault
+if 'subscription' not in st.session_state:
+    st.session_state.subscription = ingest_service.bus.subscribe()
+
+st.title("🛡️ Dashboard Keamanan Brankas (All-in-One)")
+
+# Filter per brankas; ringkasan semua brankas ada di tab "Semua Brankas"
+vault_ids = hub.ids()
+vault_id = st.sidebar.selectbox("🏦 Brankas", vault_ids, index=vault_ids.index(DEFAULT_VAULT_ID))
+vault = hub.get(vault_id)
+
+# Refresh berbasis event per panel: setiap panel digambar di placeholder
+# (st.empty) sendiri dan dikunci ke versi datanya. Dua fragment kecil dicek
+# tiap DASHBOARD_REFRESH_S detik dan hanya membandingkan counter versi:
+# vault_watcher untuk panel brankas terpilih, summary_watcher untuk tab
+# "Semua Brankas". Hanya panel yang versinya berubah yang digambar ulang,
+# jadi pesan dari brankas lain tidak menyentuh tampilan brankas terpilih
+# dan saat idle tidak ada elemen yang dikirim ulang.
+
+@st.cache_resource(max_entries=16)
+def sensor_figure(vault_id, version):
+    df = hub.get(vault_id).data_brankas.tail(50)
+    if df.empty or 'Jarak (cm)' not in df or 'PIR' not in df:
+        return None
+    df_plot = df.set_index("Timestamp").copy()
+    df_clean = df_plot.dropna(subset=['Jarak (cm)', 'PIR'])
+    
+    # Grafik Sensor Jarak dan PIR 
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df_clean.index, y=df_clean["Jarak (cm)"], name="Jarak (cm)", line=dict(color='blue')))
+    fig.add_trace(go.Scatter(x=df_clean.index, y=df_clean["PIR"], name="PIR (1/0)", yaxis="y2", line=dict(color='orange', dash='dot')))
+    
+    fig.update_layout(
+        height=400, 
+        yaxis=dict(title="Jarak (cm)", range=[0, 100]), 
+        yaxis2=dict(title="PIR (1=Gerak)", overlaying="y", side="right", range=[-0.1, 1.1], tickvals=[0, 1]),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+@st.cache_resource(max_entries=16)
+def raw_log_frame(vault_id, version):
+    # Hanya jendela yang ditampilkan yang dibaca dari disk (indeks vault_id, ts)
+    return telemetry.sensor_window(vault_id, limit=TELEMETRY_PRELOAD_ROWS).iloc[::-1]
+
+@st.cache_resource(max_entries=32)
+def ml_log_frame(vault_id, kind, version):
+    state = hub.get(vault_id)
+    store = state.data_face if kind == "face" else state.data_voice
+    return store.tail(10).iloc[::-1]
+
+@st.cache_resource(max_entries=2)
+def vault_summary(version):
+    rows = []
+    for vid, _ in version:
+        state = hub.get(vid)
+        last = state.data_brankas.tail(1)
+        rows.append({
+            "Brankas": vid,
+            "Event di Memori": len(state.data_brankas),
+            "Status Terakhir": last["Status Brankas"].iloc[0] if not last.empty else None,
+            "Label Terakhir": last["Label Prediksi"].iloc[0] if not last.empty else None,
+            "Update Terakhir": last["Timestamp"].iloc[0] if not last.empty else None,
+            "Prediksi Wajah": len(state.data_face),
+            "Prediksi Suara": len(state.data_voice),
+        })
+    return pd.DataFrame(rows)
+
+def sensor_panel():
+    fig = sensor_figure(vault_id, vault.data_brankas.version)
+    if fig is not None:
+        # FIX: use_container_width=True diganti menjadi width='stretch'
+        st.plotly_chart(fig, width='stretch') 
+    else:
+        st.info("Menunggu data sensor untuk membuat grafik...")
+
+def photo_panel():
+    # FIX: use_container_width=True diganti menjadi width='stretch'
+    st.image(vault.photo_url, caption="Foto dari Kamera Terakhir", width='stretch')
+
+def audio_panel():
+    st.write("🔊 Audio Terakhir:")
+    if vault.audio_url:
+        st.audio(vault.audio_url, format='audio/wav')
+    else:
+        st.info("Menunggu link audio dari ESP32...")
+
+def raw_log_panel():
+    st.dataframe(raw_log_frame(vault_id, vault.data_brankas.version), width='stretch')
+
+def ml_log_panel():
+    c_a, c_b = st.columns(2)
+    c_a.write("Log Prediksi Wajah"); 
+    c_a.dataframe(ml_log_frame(vault_id, "face", vault.data_face.version), width='stretch')
+    c_b.write("Log Prediksi Suara"); 
+    c_b.dataframe(ml_log_frame(vault_id, "voice", vault.data_voice.version), width='stretch')
+
+def summary_panel():
+    st.dataframe(vault_summary(hub.version()), width='stretch', hide_index=True)
+    # Kedalaman antrean & job yang dibuang (load shedding) saat banjir pesan
+    events, media = hub.events.stats(), hub.media_jobs.stats()
+    q1, q2, q3, q4 = st.columns(4)
+    q1.metric("Antrean Event", f"{events['depth']}/{events['capacity']}", help=f"Maks {events['max_depth']}")
+    q2.metric("Event Dibuang", events['dropped_event'] + events['dropped_alarm'], help=f"Alarm dibuang: {events['dropped_alarm']}, tunggu alarm maks {events['wait_max_ms_alarm']:.0f} ms")
+    q3.metric("Antrean Media", f"{media['depth']}/{media['capacity']}", help=f"Digabung (URL lama ditimpa): {media['coalesced']}")
+    q4.metric("Media Dibuang", media['dropped_media'])
+
+def vault_panels():
+    """Panel brankas terpilih: nama -> (versi data yang ditampilkan, fungsi gambar)."""
+    return {
+        "sensor": (vault.data_brankas.version, sensor_panel),
+        "photo": (vault.photo_url, photo_panel),
+        "audio": (vault.audio_url, audio_panel),
+        "raw_log": (vault.data_brankas.version, raw_log_panel),
+        "ml_log": ((vault.data_face.version, vault.data_voice.version), ml_log_panel),
+    }
+
+def summary_version():
+    events, media = hub.events.stats(), hub.media_jobs.stats()
+    return (hub.version(), events['depth'], events['dropped_event'], events['dropped_alarm'],
+            media['depth'], media['coalesced'], media['dropped_media'])
+
+def render_changed(panels):
+    """Gambar ulang (di placeholder-nya) hanya panel yang versinya berubah sejak render terakhir sesi ini."""
+    rendered = st.session_state.panel_versions
+    for name, (version, draw) in panels.items():
+        if rendered.get(name) == version:
+            continue
+        # Versi dicatat sebelum menggambar: perubahan selama render tertangkap di tick berikutnya
+        rendered[name] = version
+        with slots[name].container():
+            draw()
+
+@st.fragment(run_every=DASHBOARD_REFRESH_S)
+def vault_watcher():
+    process_queue_and_logic()
+    render_changed(vault_panels())
+
+@st.fragment(run_every=DASHBOARD_REFRESH_S)
+def summary_watcher():
+    render_changed({"summary": (summary_version(), summary_panel)})
+
+# Placeholder panel (diisi oleh watcher, bukan langsung di layout)
+slots = {}
+
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.subheader("📡 Live Sensor Data & Log Brankas")
+    slots["sensor"] = st.empty()
+
+with col2:
+    st.subheader("📸 Media & Kontrol")
+    slots["photo"] = st.empty()
+    
+    c1, c2, c3 = st.columns(3)
+    # FIX: use_container_width=True diganti menjadi width='stretch'
+    if c1.button("📷 FOTO", help="Memicu ESP32 untuk mengambil foto", width='stretch'): mqtt_client.publish(topic("cam_trigger", vault_id), "capture")
+    if c2.button("🎤 VOICE", help="Memicu ESP32 untuk merekam/kirim audio", width='stretch'): mqtt_client.publish(topic("rec_trigger", vault_id), "trigger")
+    if c3.button("🔇 OFF ALARM", help="Mematikan Alarm/Buzzer", width='stretch'): mqtt_client.publish(topic("alarm", vault_id), "OFF")
+
+    col_reset, col_kontroll = st.columns(2)
+    if col_reset.button("🔄 RESET", help="Reset/Clear Status di ESP32", width='stretch'): mqtt_client.publish(topic("status", vault_id), "RESET")
+    if col_kontroll.button("OPEN", help="Memicu Open", width='stretch'): mqtt_client.publish(topic("status", vault_id), "OPEN")
+    
+    st.markdown("---")
+    slots["audio"] = st.empty()
+
+t1, t2, t3 = st.tabs(["Data Log Brankas (Raw)", "ML Logs (Wajah & Suara)", "Semua Brankas"])
+
+with t1: 
+    slots["raw_log"] = st.empty()
+
+with t2:
+    slots["ml_log"] = st.empty()
+
+with t3:
+    slots["summary"] = st.empty()
+
+# Render penuh (sesi baru, tombol, ganti brankas): semua panel digambar, lalu hanya yang berubah
+st.session_state.panel_versions = {}
+vault_watcher()
+summary_watcher()
@@ -0,0 +1,79 @@
+import numpy as np
+from model_registry import registry
+from batching import get_batcher
+from mfcc import get_extractor, load_audio
+from image_pipeline import IMG_SIZE, get_preprocessor
+from vad import trim_silence
+from config import FACE_DETECT_ENABLED
+
+# ====================================================================
+# FUNGSI MACHINE LEARNING DASHBOARD
+# ====================================================================
+# Dipisah dari dashboard.py supaya bisa dipakai/diukur tanpa Streamlit & MQTT.
+
+CLASS_NAMES_FACE = ['ANGGI_FACES', 'DEVI_FACES', 'FARIDA_FACES', 'ILHAM_FACES', 'OTHER_FACES']
+CLASS_NAMES_VOICE = ['MY_YES','ANOTHER_YES','NOT_YS','NOISE']
+SAMPLE_RATE = 16000
+N_MFCC = 40
+
+
+def process_and_predict_image(image_buffer, camera_id=None):
+    try:
+        model = registry.get('face')
+    except Exception:
+        return "Model Error", 0.0
+    try:
+        if FACE_DETECT_ENABLED:
+            from face_detect import face_region  # OpenCV hanya di-load jika deteksi wajah aktif
+            # Hanya area wajah yang diklasifikasi; frame tanpa wajah langsung OTHER_FACES
+            image_buffer = face_region(image_buffer, camera_id)
+            if image_buffer is None: return "OTHER_FACES", 1.0
+        
+        # Jalur preprocessing yang sama dengan predict_picture (RGB, draft decode, float32 /255)
+        img_array = get_preprocessor(IMG_SIZE).transform_one(image_buffer)
+        
+        # Scaling + predict_proba dijalankan per batch oleh MicroBatcher
+        pred_idx, proba = get_batcher('face').predict(img_array)
+        
+        try:
+            pred_label = CLASS_NAMES_FACE[model.svc.classes_.tolist().index(pred_idx)]
+        except:
+             pred_label = str(pred_idx)
+        
+        confidence = np.max(proba)
+        
+        return pred_label, confidence
+    except Exception as e:
+        return f"Error: {e}", 0.0
+
+
+def process_and_predict_audio(audio_path_or_file):
+    try:
+        model = registry.get('voice')
+    except Exception:
+        return "Model Error", 0.0
+    
+    try:
+        voice = load_audio(audio_path_or_file, SAMPLE_RATE)
+        if len(voice) == 0: return "No Audio Data", 0.0
+        
+        # VAD: buang hening di awal/akhir; tanpa ucapan -> NOISE tanpa inferensi
+        voice, _ = trim_silence(voice, SAMPLE_RATE)
+        if voice is None: return "NOISE", 1.0
+            
+        # Jumlah MFCC mengikuti scaler yang ter-load (model bawaan memakai 13 koefisien)
+        mfccs_processed = get_extractor(SAMPLE_RATE, model.n_features or N_MFCC).features(voice)
+        
+        # Scaling + predict_proba dijalankan per batch oleh MicroBatcher
+        pred_idx, proba = get_batcher('voice').predict(mfccs_processed)
+        
+        try:
+             pred_label = CLASS_NAMES_VOICE[model.svc.classes_.tolist().index(pred_idx)]
+        except:
+             pred_label = str(pred_idx)
+        
+        confidence = np.max(proba)
+        
+        return pred_label, confidence
+    except Exception as e:
+        return f"Error: {e}", 0.0
@@ -0,0 +1,285 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import DECISION_FACE_MIN_CONF, DECISION_VOICE_MIN_CONF, DECISION_MAX_ATTEMPTS
+
+# ====================================================================
+# MESIN KEPUTUSAN AKSES (FUSI SENSOR + WAJAH + SUARA)
+# ====================================================================
+# Setiap percobaan akses (attempt) mengumpulkan bacaan sensor, hasil
+# wajah dan hasil suara dengan ID sesi yang sama. Hasil ML tanpa sesi
+# tidak ditebak pasangannya (mis. dari waktu kedatangan): hasil itu tidak
+# ikut verdict, kecuali wajah + suara yang datang bersama (satu attempt
+# sendiri). Verdict dihitung dengan aturan vektor (numpy) hanya untuk
+# attempt yang baru/berubah, jadi bisa dipanggil dari web_server tanpa
+# dashboard terbuka.
+
+AUTHORIZED_FACES = ('ANGGI_FACES', 'DEVI_FACES', 'FARIDA_FACES', 'ILHAM_FACES')
+AUTHORIZED_VOICE = 'MY_YES'
+REJECTED_FACES = ('Unknown', 'OTHER_FACES')
+REJECTED_VOICES = ('ANOTHER_YES', 'NOT_YS', 'NOISE')
+ERROR_LABELS = ('Error', 'Model Error')
+SAFE_STATUSES = ('AMAN', 'STANDBY', 'TERKUNCI', 'Brangkas Aman')
+FORCED_STATUS = 'Dibuka Paksa'
+
+MODALITIES = ('face', 'voice')
+MODALITY_FOR_MEDIA = {"picture": "face", "voice": "voice"}
+
+VERDICT_FORCED = "🚨 DIBOBOL!"
+VERDICT_PENDING = "🔄 PENDING DATA"
+VERDICT_MOTION = "👀 MOTION DETECTED"
+VERDICT_NEAR = "⚠️ OBJECT NEAR"
+VERDICT_ML_ERROR = "❌ ML ERROR"
+VERDICT_REJECTED = "⚠️ REJECTED/SUSPICIOUS"
+VERDICT_LOW_CONF = "⚠️ LOW CONFIDENCE"
+VERDICT_ACCEPTED = "✅ ACCEPTED"
+VERDICT_STANDBY = "✅ STANDBY"
+
+
+def _member(values, options):
+    # Perbandingan elemen per elemen (aman untuk array object berisi None, tanpa sorting seperti np.isin)
+    return np.logical_or.reduce([values == option for option in options])
+
+
+def decide(status, distance, pir, face, face_conf, voice, voice_conf,
+           face_min_conf=DECISION_FACE_MIN_CONF, voice_min_conf=DECISION_VOICE_MIN_CONF):
+    """
+    Fungsi untuk menghitung verdict banyak attempt sekaligus.
+    Input: array sejajar (status/face/voice object, None = belum ada; distance/pir/conf float, NaN = belum ada)
+    Output: (verdict array object, skor fusi float = rata-rata geometris confidence wajah & suara,
+             NaN jika salah satu confidence tidak diketahui)
+    """
+    status = np.asarray(status, dtype=object)
+    face = np.asarray(face, dtype=object)
+    voice = np.asarray(voice, dtype=object)
+    distance = np.asarray(distance, dtype=float)
+    pir = np.asarray(pir, dtype=float)
+    face_conf = np.asarray(face_conf, dtype=float)
+    voice_conf = np.asarray(voice_conf, dtype=float)
+    # Skor hanya jika kedua confidence diketahui (NaN merambat -> None di to_dict)
+    score = np.sqrt(face_conf * voice_conf)
+    # Confidence tidak diketahui (hasil MQTT berupa label saja) lolos cek ambang seperti sebelumnya
+    fc = np.nan_to_num(face_conf, nan=1.0)
+    vc = np.nan_to_num(voice_conf, nan=1.0)
+
+    status_str = status.astype(str)
+    forced = np.char.find(status_str, FORCED_STATUS) >= 0
+    safe = _member(status_str, SAFE_STATUSES) | (status == None)  # noqa: E711 (perbandingan per elemen)
+    pending = np.isnan(distance) | np.isnan(pir) | (face == None) | (voice == None)  # noqa: E711
+    ml_error = _member(face, ERROR_LABELS) | _member(voice, ERROR_LABELS)
+    rejected = _member(face, REJECTED_FACES) | _member(voice, REJECTED_VOICES)
+    authorized = _member(face, AUTHORIZED_FACES) & (voice == AUTHORIZED_VOICE)
+    confident = (fc >= face_min_conf) & (vc >= voice_min_conf)
+
+    # Urutan dari prioritas terendah; aturan berikutnya menimpa yang sebelumnya
+    out = np.full(len(status), VERDICT_STANDBY, dtype=object)
+    out[authorized] = VERDICT_ACCEPTED
+    out[authorized & ~confident] = VERDICT_LOW_CONF
+    out[rejected] = VERDICT_REJECTED
+    out[distance < 5] = VERDICT_NEAR
+    out[pir == 1] = VERDICT_MOTION
+    out[pending & safe] = VERDICT_PENDING
+    out[pending & ~safe] = status[pending & ~safe]
+    # Hasil ML yang gagal tidak pernah menunggu data lain: attempt ini tidak bisa diterima
+    out[ml_error] = VERDICT_ML_ERROR
+    out[forced] = VERDICT_FORCED
+    return out, score
+
+
+class Attempt:
+    __slots__ = ("id", "vault_id", "session", "opened", "status", "distance", "pir",
+                 "face", "face_conf", "voice", "voice_conf", "verdict", "score")
+
+    def __init__(self, attempt_id, vault_id, session, opened):
+        self.id = attempt_id
+        self.vault_id = vault_id
+        self.session = session
+        self.opened = opened
+        self.status = None
+        self.distance = np.nan
+        self.pir = np.nan
+        self.face = None
+        self.face_conf = np.nan
+        self.voice = None
+        self.voice_conf = np.nan
+        self.verdict = None
+        self.score = np.nan
+
+    def to_dict(self):
+        def num(x):
+            return None if x is None or np.isnan(x) else float(x)
+        return {
+            "attempt": self.id, "vault_id": self.vault_id, "session": self.session, "opened": self.opened,
+            "status": self.status, "distance": num(self.distance), "pir": num(self.pir),
+            "face": self.face, "face_conf": num(self.face_conf),
+            "voice": self.voice, "voice_conf": num(self.voice_conf),
+            "verdict": self.verdict, "score": num(self.score),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+class DecisionEngine:
+    def __init__(self, face_min_conf=DECISION_FACE_MIN_CONF, voice_min_conf=DECISION_VOICE_MIN_CONF,
+                 max_attempts=DECISION_MAX_ATTEMPTS):
+        self.face_min_conf = face_min_conf
+        self.voice_min_conf = voice_min_conf
+        self.max_attempts = max(1, int(max_attempts))
+        self._attempts = OrderedDict()  # id -> Attempt (lama -> baru)
+        self._sessions = {}  # (vault_id, session) -> id
+        self._dirty = set()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------
+    def _open(self, vault_id, session, now):
+        attempt = Attempt(self._next_id, vault_id, session, now)
+        self._next_id += 1
+        self._attempts[attempt.id] = attempt
+        if session is not None:
+            self._sessions[(vault_id, session)] = attempt.id
+        while len(self._attempts) > self.max_attempts:
+            _, old = self._attempts.popitem(last=False)
+            self._sessions.pop((old.vault_id, old.session), None)
+            self._dirty.discard(old.id)
+        return attempt
+
+    def _by_session(self, vault_id, session):
+        attempt_id = self._sessions.get((vault_id, session))
+        return self._attempts.get(attempt_id) if attempt_id is not None else None
+
+    # ----------------------------------------------------------------
+    def add_sensor(self, vault_id, status, distance=np.nan, pir=np.nan, session=None, ts=None):
+        """Bacaan status/sensor dari ESP32. Tanpa sesi, setiap bacaan membuka attempt baru. Output: ID attempt."""
+        now = time.time() if ts is None else ts
+        with self._lock:
+            attempt = self._by_session(vault_id, session) if session is not None else None
+            if attempt is None:
+                attempt = self._open(vault_id, session, now)
+            attempt.status = status
+            attempt.distance = np.nan if distance is None else float(distance)
+            attempt.pir = np.nan if pir is None else float(pir)
+            self._dirty.add(attempt.id)
+            return attempt.id
+
+    def add_result(self, vault_id, modality, label, confidence=None, session=None, ts=None):
+        """
+        Hasil ML ('face' / 'voice') untuk satu brankas.
+        Output: ID attempt yang menerimanya, atau None jika tanpa sesi (tidak ikut verdict).
+        """
+        return self.add_results(vault_id, {modality: (label, confidence)}, session, ts)
+
+    def add_results(self, vault_id, results, session=None, ts=None):
+        """
+        Beberapa hasil ML dari percobaan akses yang sama, {modalitas: (label, confidence)}.
+        Semuanya masuk ke attempt sesi tersebut. Tanpa sesi, hanya hasil lengkap (wajah +
+        suara sekaligus) yang dicatat, sebagai attempt sendiri; hasil parsial tanpa sesi
+        tidak bisa dipasangkan dengan aman dan diabaikan.
+        Output: ID attempt yang menerimanya, atau None.
+        """
+        for modality in results:
+            if modality not in MODALITIES:
+                raise ValueError(f"Modalitas tidak dikenal: {modality}")
+        if session is None and set(results) != set(MODALITIES):
+            return None
+        now = time.time() if ts is None else ts
+        with self._lock:
+            attempt = self._by_session(vault_id, session) if session is not None else None
+            if attempt is None:
+                attempt = self._open(vault_id, session, now)
+            for modality, (label, confidence) in results.items():
+                setattr(attempt, modality, label)
+                setattr(attempt, f"{modality}_conf", np.nan if confidence is None else float(confidence))
+            self._dirty.add(attempt.id)
+            return attempt.id
+
+    def evaluate(self):
+        """Hitung verdict attempt yang baru/berubah. Output: list Attempt yang verdict-nya berubah."""
+        with self._lock:
+            attempts = [self._attempts[i] for i in self._dirty if i in self._attempts]
+            self._dirty.clear()
+            if not attempts:
+                return []
+            verdicts, scores = decide(
+                [a.status for a in attempts], [a.distance for a in attempts], [a.pir for a in attempts],
+                [a.face for a in attempts], [a.face_conf for a in attempts],
+                [a.voice for a in attempts], [a.voice_conf for a in attempts],
+                self.face_min_conf, self.voice_min_conf,
+            )
+            changed = []
+            for attempt, verdict, score in zip(attempts, verdicts, scores):
+                attempt.score = score
+                if verdict != attempt.verdict:
+                    attempt.verdict = verdict
+                    changed.append(attempt)
+            return changed
+
+    # ----------------------------------------------------------------
+    def get(self, attempt_id):
+        with self._lock:
+            attempt = self._attempts.get(attempt_id)
+            return attempt.to_dict() if attempt is not None else None
+
+    def session(self, vault_id, session):
+        with self._lock:
+            attempt = self._by_session(vault_id, session)
+            return attempt.to_dict() if attempt is not None else None
+
+    def recent(self, vault_id, n=20):
+        """n attempt terakhir satu brankas (terbaru lebih dulu)."""
+        with self._lock:
+            out = []
+            for attempt in reversed(self._attempts.values()):
+                if attempt.vault_id == vault_id:
+                    out.append(attempt.to_dict())
+                    if len(out) >= n:
+                        break
+            return out
+
+
+def sensor_reading(event):
+    """(status, jarak, pir, sesi) dari event status ingest (JSON ESP32 atau teks biasa)."""
+    data = event.get("data")
+    if isinstance(data, dict):
+        return (data.get("status_val", "Unknown"), data.get("jarak_val"), data.get("pir_val"),
+                data.get("session"))
+    return event.get("payload"), None, None, None
+
+
+def media_reading(event):
+    """(url, sesi) dari event URL media: teks URL biasa atau JSON {"url": ..., "session": ...}."""
+    data = event.get("data")
+    if isinstance(data, dict):
+        return str(data.get("url", "")), data.get("session")
+    return event.get("payload", ""), None
+
+
+def result_payload(label, confidence=None, session=None):
+    """Payload MQTT hasil ML: label + confidence + sesi, supaya penerima bisa memasangkannya ke attempt."""
+    return json.dumps({"label": label, "confidence": None if confidence is None else float(confidence),
+                       "session": session}, ensure_ascii=False)
+
+
+def result_reading(event):
+    """(label, confidence, sesi) dari event hasil ML (JSON result_payload, atau label teks dari klien lama)."""
+    data = event.get("data")
+    if isinstance(data, dict):
+        return data.get("label"), data.get("confidence"), data.get("session")
+    return event.get("payload"), None, None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_decision_engine():
+    """Satu DecisionEngine per proses."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DecisionEngine()
+    return _engine
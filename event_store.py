@@ -0,0 +1,130 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# ====================================================================
+# EVENT STORE KOLOM (RING BUFFER) UNTUK LOG DASHBOARD
+# ====================================================================
+# Pengganti pd.concat per pesan MQTT: append O(1) ke array yang sudah
+# dialokasikan. Jika diberi sink (mis. TelemetryStore.sensor_sink()),
+# setiap append/update langsung ditulis ke penyimpanan persisten; saat
+# buffer penuh baris tertua cukup dibuang dari memori. Label verdict
+# diisi dari luar lewat update() (lihat DecisionEngine di decision.py).
+
+FLOAT = "float"
+OBJECT = "object"
+
+
+class EventStore:
+    def __init__(self, columns, capacity=5000, evict_fraction=0.25, sink=None):
+        """
+        columns: dict nama kolom -> FLOAT / OBJECT (urutan dipertahankan)
+        sink: objek dengan append(row) -> key dan update(key, column, value) untuk write-through
+        """
+        self.columns = list(columns)
+        self.dtypes = dict(columns)
+        self.capacity = max(1, int(capacity))
+        self.evict_chunk = max(1, int(self.capacity * evict_fraction))
+        self.sink = sink
+        self._keys = np.full(self.capacity, None, dtype=object)
+
+        self._data = {
+            name: np.full(self.capacity, np.nan) if dtype == FLOAT else np.full(self.capacity, None, dtype=object)
+            for name, dtype in self.dtypes.items()
+        }
+        self._start = 0  # posisi baris tertua di buffer
+        self._count = 0
+        self._first_seq = 0  # nomor urut (seq) baris tertua yang masih di memori
+        self._lock = threading.RLock()
+        self.version = 0
+        self.evicted = 0
+
+    # ----------------------------------------------------------------
+    def __len__(self):
+        return self._count
+
+    @property
+    def empty(self):
+        return self._count == 0
+
+    def _pos(self, seq):
+        offset = seq - self._first_seq
+        if offset < 0 or offset >= self._count:
+            raise KeyError(f"Baris {seq} sudah tidak ada di buffer")
+        return (self._start + offset) % self.capacity
+
+    def last_seq(self):
+        if self._count == 0:
+            return None
+        return self._first_seq + self._count - 1
+
+    def append(self, row):
+        """Tambah satu baris (dict). Output: seq baris tersebut."""
+        key = self.sink.append(row) if self.sink is not None else None
+        return self._append(row, key)
+
+    def load(self, frame):
+        """Isi buffer dari DataFrame yang sudah tersimpan (index = key sink), tanpa menulis ulang."""
+        for key, row in zip(frame.index, frame.to_dict("records")):
+            self._append(row, key)
+
+    def _append(self, row, key):
+        with self._lock:
+            if self._count == self.capacity:
+                self._evict(self.evict_chunk)
+            pos = (self._start + self._count) % self.capacity
+            for name in self.columns:
+                value = row.get(name)
+                if self.dtypes[name] == FLOAT:
+                    self._data[name][pos] = np.nan if value is None else value
+                else:
+                    self._data[name][pos] = value
+            self._keys[pos] = key
+            seq = self._first_seq + self._count
+            self._count += 1
+            self.version += 1
+            return seq
+
+    def update(self, seq, column, value):
+        with self._lock:
+            pos = self._pos(seq)
+            self._data[column][pos] = value
+            if self.sink is not None:
+                self.sink.update(self._keys[pos], column, value)
+            self.version += 1
+
+    def row(self, seq):
+        pos = self._pos(seq)
+        return {name: self._data[name][pos] for name in self.columns}
+
+    # ----------------------------------------------------------------
+    def _ordered_positions(self, n=None):
+        count = self._count if n is None else min(n, self._count)
+        first = self._count - count
+        return (self._start + first + np.arange(count)) % self.capacity, self._first_seq + first
+
+    def tail(self, n):
+        """DataFrame n baris terakhir (urut lama -> baru, index = seq)."""
+        with self._lock:
+            positions, first_seq = self._ordered_positions(n)
+            frame = {name: self._data[name][positions] for name in self.columns}
+            index = pd.RangeIndex(first_seq, first_seq + len(positions))
+        return pd.DataFrame(frame, index=index, columns=self.columns)
+
+    def to_frame(self):
+        return self.tail(self._count)
+
+    # ----------------------------------------------------------------
+    def _evict(self, n):
+        """Buang n baris tertua dari buffer (sudah tersimpan di sink, jika ada)."""
+        n = min(n, self._count)
+        if n == 0:
+            return
+        positions = (self._start + np.arange(n)) % self.capacity
+        for name in self.columns:
+            self._data[name][positions] = np.nan if self.dtypes[name] == FLOAT else None
+        self._keys[positions] = None
+        self._start = (self._start + n) % self.capacity
+        self._count -= n
+        self._first_seq += n
+        self.evicted += n
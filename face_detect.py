@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from image_pipeline import decode_image
+from config import (
+    FACE_DETECT_DECODE_SIZE, FACE_DETECT_MIN_SIZE, FACE_CROP_TTL, FACE_MOTION_THRESHOLD,
+    FACE_CROP_MARGIN, FACE_CAMERA_CACHE,
+)
+
+# ====================================================================
+# DETEKSI WAJAH + CACHE AREA CROP PER KAMERA
+# ====================================================================
+# Haar cascade bawaan OpenCV (offline) mencari wajah terbesar, lalu hanya
+# area itu yang di-resize ke IMG_SIZE. Kamera ESP32 biasanya statis,
+# jadi kotak terakhir dipakai ulang selama frame tidak banyak berubah
+# (selisih thumbnail kecil) dan umurnya belum lewat FACE_CROP_TTL.
+
+CASCADE_FILE = "haarcascade_frontalface_default.xml"
+THUMB_SIZE = 32
+
+
+class CropEntry:
+    def __init__(self, box, thumb, created):
+        self.box = box  # (x, y, w, h) atau None jika tidak ada wajah
+        self.thumb = thumb
+        self.created = created
+
+
+class FaceLocator:
+    def __init__(self, cascade_path=None, min_size=FACE_DETECT_MIN_SIZE, ttl=FACE_CROP_TTL,
+                 motion_threshold=FACE_MOTION_THRESHOLD, margin=FACE_CROP_MARGIN, max_cameras=FACE_CAMERA_CACHE):
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + CASCADE_FILE
+        self.cascade_path = cascade_path
+        self.min_size = min_size
+        self.ttl = ttl
+        self.motion_threshold = motion_threshold
+        self.margin = margin
+        self.max_cameras = max(1, int(max_cameras))
+        self._local = threading.local()
+        self._crops = OrderedDict()  # camera_id -> CropEntry
+        self._lock = threading.Lock()
+        self.detections = 0
+        self.reused = 0
+
+    def _cascade(self):
+        # CascadeClassifier tidak thread-safe: satu instance per thread
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            if cascade.empty():
+                raise RuntimeError(f"Gagal memuat cascade {self.cascade_path}")
+            self._local.cascade = cascade
+        return cascade
+
+    def detect(self, gray):
+        """Kotak wajah terbesar (x, y, w, h) pada gambar grayscale, atau None."""
+        self.detections += 1
+        faces = self._cascade().detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(self.min_size, self.min_size)
+        )
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return int(x), int(y), int(w), int(h)
+
+    def _expand(self, box, shape):
+        x, y, w, h = box
+        dx, dy = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(0, x - dx), max(0, y - dy)
+        x1, y1 = min(shape[1], x + w + dx), min(shape[0], y + h + dy)
+        return x0, y0, x1, y1
+
+    def locate(self, pixels, camera_id=None):
+        """
+        Input: array RGB uint8, camera_id (mis. host ESP32) untuk cache kotak
+        Output: (crop RGB atau None jika tidak ada wajah, True jika kotak dari cache)
+        """
+        gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+        thumb = cv2.resize(gray, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+        now = time.monotonic()
+        entry = None
+        if camera_id is not None:
+            with self._lock:
+                entry = self._crops.get(camera_id)
+
+        reused = (
+            entry is not None
+            and now - entry.created < self.ttl
+            and entry.thumb.shape == thumb.shape
+            and float(np.mean(np.abs(thumb - entry.thumb))) < self.motion_threshold
+        )
+        if reused:
+            box = entry.box
+            self.reused += 1
+        else:
+            box = self.detect(gray)
+            if camera_id is not None:
+                with self._lock:
+                    self._crops[camera_id] = CropEntry(box, thumb, now)
+                    self._crops.move_to_end(camera_id)
+                    while len(self._crops) > self.max_cameras:
+                        self._crops.popitem(last=False)
+
+        if box is None:
+            return None, reused
+        x0, y0, x1, y1 = self._expand(box, pixels.shape)
+        return pixels[y0:y1, x0:x1], reused
+
+    def stats(self):
+        with self._lock:
+            return {"cameras": len(self._crops), "detections": self.detections, "reused": self.reused}
+
+
+_locator = None
+_locator_lock = threading.Lock()
+
+
+def get_face_locator():
+    """Satu FaceLocator per proses."""
+    global _locator
+    if _locator is None:
+        with _locator_lock:
+            if _locator is None:
+                _locator = FaceLocator()
+    return _locator
+
+
+def face_region(image, camera_id=None):
+    """
+    Fungsi untuk mengambil area wajah dari gambar (path, file-like, PIL Image, atau array RGB).
+    JPEG di-decode pada skala kecil (>= FACE_DETECT_DECODE_SIZE) sebelum deteksi.
+    Output: array RGB crop wajah, atau None jika tidak ada wajah.
+    """
+    pixels = image if isinstance(image, np.ndarray) else decode_image(image, FACE_DETECT_DECODE_SIZE)
+    crop, _ = get_face_locator().locate(pixels, camera_id)
+    return crop
@@ -0,0 +1,227 @@
+"""
+Model wajah terkompresi PCA (opsional, BRANKAS_FACE_PCA=1).
+
+Fitur mentah 96x96x3 (27.648 dimensi, [0, 1]) diproyeksikan ke beberapa
+ratus komponen dengan satu perkalian matriks float32. StandardScaler,
+proyeksi PCA (randomized SVD) dan whitening dilipat menjadi satu pasangan
+weight/bias, lalu SVC dilatih dan dijalankan di ruang tereduksi. Folder
+data berisi subfolder per kelas (ANGGI_FACES, ..., OTHER_FACES).
+
+Contoh:
+    python face_pca.py fit data/enroll --components 128
+    python face_pca.py compare data/holdout --iterations 20 --output pca_report.json
+
+Pakai folder yang berbeda untuk compare supaya akurasi tidak bias oleh data fit.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import numpy as np
+
+PCA_MODEL_PATH = "image_pca_model.pkl"
+PCA_PROJECTION_PATH = "image_pca_projection.pkl"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FaceProjection:
+    """Pengganti scaler untuk model PCA: transform(X) = X @ weight + bias (float32)."""
+
+    is_projection = True
+
+    def __init__(self, weight, bias, explained_variance_ratio=None):
+        self.weight = np.ascontiguousarray(weight, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.explained_variance_ratio = explained_variance_ratio
+        self.n_features_in_ = self.weight.shape[0]
+        self.n_components = self.weight.shape[1]
+
+    def transform(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        out = X @ self.weight
+        out += self.bias
+        return out
+
+    @property
+    def nbytes(self):
+        return self.weight.nbytes + self.bias.nbytes
+
+
+def fit_projection(X, n_components, random_state=0):
+    """
+    Fungsi untuk mem-fit StandardScaler + PCA (whitening) pada fitur mentah X.
+    Output: FaceProjection dengan scaler dan proyeksi dilipat ke satu weight/bias.
+    """
+    from sklearn.utils.extmath import randomized_svd
+
+    X = np.asarray(X, dtype=np.float64)
+    n = X.shape[0]
+    n_components = max(1, min(n_components, n - 1, X.shape[1]))
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0.0] = 1.0
+    Xs = (X - mean) / scale
+
+    _, S, Vt = randomized_svd(Xs, n_components, n_iter=5, random_state=random_state)
+    std = S / np.sqrt(max(n - 1, 1))
+    std[std == 0.0] = 1.0
+    # z = ((x - mean) / scale) @ Vt.T / std  =  x @ weight + bias
+    weight = (Vt / scale).T / std
+    bias = -(mean / scale) @ Vt.T / std
+    total_var = np.sum(Xs * Xs) / max(n - 1, 1)
+    ratio = (S * S / max(n - 1, 1)) / total_var if total_var > 0 else None
+    return FaceProjection(weight, bias, ratio.tolist() if ratio is not None else None)
+
+
+def load_labeled_folder(folder, class_names):
+    """Path gambar + indeks kelas dari subfolder bernama kelas."""
+    paths, labels = [], []
+    for name in sorted(os.listdir(folder)):
+        class_dir = os.path.join(folder, name)
+        if not os.path.isdir(class_dir):
+            continue
+        if name not in class_names:
+            raise ValueError(f"Subfolder {name} bukan nama kelas ({', '.join(class_names)})")
+        for file_name in sorted(os.listdir(class_dir)):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, file_name))
+                labels.append(class_names.index(name))
+    if not paths:
+        raise ValueError(f"Tidak ada gambar di {folder}")
+    return paths, np.asarray(labels)
+
+
+def raw_features(paths, batch=64):
+    from predict_picture import images_to_features
+
+    return np.vstack([images_to_features(paths[i:i + batch]) for i in range(0, len(paths), batch)])
+
+
+def fit(folder, n_components, model_path=PCA_MODEL_PATH, projection_path=PCA_PROJECTION_PATH, C=10.0):
+    from sklearn.svm import SVC
+    from predict_picture import class_names
+
+    paths, y = load_labeled_folder(folder, class_names)
+    t0 = time.perf_counter()
+    X = raw_features(paths)
+    projection = fit_projection(X, n_components)
+    Z = projection.transform(X)
+    svc = SVC(kernel="rbf", C=C, gamma="scale", probability=True, random_state=0).fit(Z, y)
+    elapsed = time.perf_counter() - t0
+
+    with open(model_path, "wb") as f:
+        pickle.dump(svc, f)
+    with open(projection_path, "wb") as f:
+        pickle.dump(projection, f)
+    explained = sum(projection.explained_variance_ratio or [])
+    return {
+        "images": len(paths),
+        "components": projection.n_components,
+        "explained_variance": float(explained),
+        "support_vectors": int(len(svc.support_)),
+        "fit_seconds": elapsed,
+        "model_path": model_path,
+        "projection_path": projection_path,
+    }
+
+
+# ====================================================================
+# PERBANDINGAN FULL vs PCA (AKURASI / LATENSI / MEMORI)
+# ====================================================================
+
+def _model_report(name, bundle, X, y, iterations):
+    projection = bundle.projection
+    compiled = bundle.compiled
+
+    def predict(rows):
+        if projection is not None:
+            rows = projection.transform(rows)
+        if compiled is not None:
+            return compiled.predict_with_proba(rows)
+        proba = bundle.svc.predict_proba(rows if projection is not None else bundle.scaler.transform(rows))
+        return bundle.svc.classes_[np.argmax(proba, axis=1)], proba
+
+    labels, _ = predict(X)
+    single = []
+    for i in range(iterations):
+        row = X[i % len(X)][None, :]
+        t0 = time.perf_counter()
+        predict(row)
+        single.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    predict(X)
+    batch_seconds = time.perf_counter() - t0
+
+    model_bytes = sum(getattr(compiled, a).nbytes for a in ("sv_T", "sv_norm", "x_weight", "x_bias", "dual_coef")) \
+        if compiled is not None else bundle.svc.support_vectors_.nbytes
+    input_bytes = projection.nbytes if projection is not None else 2 * X.shape[1] * 8
+    single_ms = np.asarray(single) * 1000.0
+    return {
+        "model": name,
+        "engine": "compiled" if compiled is not None else "sklearn",
+        "input_dim": int(compiled.n_features if compiled is not None else bundle.svc.support_vectors_.shape[1]),
+        "support_vectors": int(bundle.svc.support_vectors_.shape[0]),
+        "accuracy": float(np.mean(np.asarray(labels) == y)),
+        "latency_p50_ms": float(np.percentile(single_ms, 50)),
+        "latency_p95_ms": float(np.percentile(single_ms, 95)),
+        "batch_per_item_ms": batch_seconds * 1000.0 / len(X),
+        "model_mb": model_bytes / 1e6,
+        "scaler_or_projection_mb": input_bytes / 1e6,
+        "files_mb": sum(os.path.getsize(p) for p in bundle.paths) / 1e6,
+    }
+
+
+def compare(folder, iterations=20, models=("face_full", "face_pca")):
+    from model_registry import registry
+    from predict_picture import class_names
+
+    paths, y = load_labeled_folder(folder, class_names)
+    t0 = time.perf_counter()
+    X = raw_features(paths)
+    preprocess_ms = (time.perf_counter() - t0) * 1000.0 / len(paths)
+    reports = []
+    for name in models:
+        try:
+            bundle = registry.get(name)
+        except FileNotFoundError as e:
+            print(f"Lewati {name}: {e}")
+            continue
+        report = _model_report(name, bundle, X, y, iterations)
+        report["preprocess_per_image_ms"] = preprocess_ms
+        reports.append(report)
+    return {"images": len(paths), "results": reports}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Model wajah terkompresi PCA")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_fit = sub.add_parser("fit", help="Fit proyeksi PCA + SVC dari folder gambar berlabel")
+    p_fit.add_argument("folder")
+    p_fit.add_argument("--components", type=int, default=128)
+    p_fit.add_argument("--C", type=float, default=10.0)
+    p_fit.add_argument("--model", default=PCA_MODEL_PATH)
+    p_fit.add_argument("--projection", default=PCA_PROJECTION_PATH)
+    p_cmp = sub.add_parser("compare", help="Bandingkan model full-resolution dan PCA")
+    p_cmp.add_argument("folder")
+    p_cmp.add_argument("--iterations", type=int, default=20)
+    p_cmp.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "fit":
+        result = fit(args.folder, args.components, args.model, args.projection, args.C)
+    else:
+        result = compare(args.folder, args.iterations)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if getattr(args, "output", None):
+        with open(args.output, "w") as f:
+            f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    # Lewat modul face_pca (bukan __main__) supaya FaceProjection ter-pickle dengan nama modul yang benar
+    from face_pca import main as _main
+    sys.exit(_main(sys.argv[1:]))
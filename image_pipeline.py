@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+from PIL import Image
+
+# ====================================================================
+# PREPROCESSING GAMBAR WAJAH (BATCH, FLOAT32)
+# ====================================================================
+# Satu jalur untuk predict_picture dan dashboard: decode JPEG dengan
+# draft mode (DCT scaling) kalau sumbernya jauh lebih besar dari
+# IMG_SIZE, resize langsung ke tensor batch float32 yang sudah
+# dialokasikan, lalu /255 (dan mean/std scaler bila diminta) dijalankan
+# sebagai satu multiply-add in-place.
+
+IMG_SIZE = 96
+CHANNELS = 3
+
+
+def decode_image(source, img_size=IMG_SIZE):
+    """
+    Fungsi untuk membuka gambar (path, file-like, atau PIL Image) sebagai array RGB uint8.
+    JPEG besar di-decode pada skala 1/2, 1/4 atau 1/8 yang masih >= img_size.
+    """
+    image = source if isinstance(source, Image.Image) else Image.open(source)
+    if image.format == "JPEG" and min(image.size) > img_size:
+        image.draft("RGB", (img_size, img_size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+class ImagePreprocessor:
+    def __init__(self, img_size=IMG_SIZE, scaler=None):
+        """scaler: StandardScaler opsional; jika diisi, output sudah ter-scale (tanpa scaler.transform)."""
+        self.img_size = img_size
+        self.n_features = img_size * img_size * CHANNELS
+        # x_scaled = (x / 255 - mean) / scale = x * mul + add
+        if getattr(scaler, "is_projection", False):
+            # FaceProjection bukan scaler per fitur: hasilnya harus diproyeksikan (lihat predict_picture)
+            raise ValueError("Scaler berupa proyeksi PCA, tidak bisa dilipat ke preprocessing per piksel")
+        mul = np.full(self.n_features, 1.0 / 255.0)
+        add = np.zeros(self.n_features)
+        if scaler is not None:
+            mean = getattr(scaler, "mean_", None)
+            scale = getattr(scaler, "scale_", None)
+            if getattr(scaler, "with_std", True) and scale is not None:
+                mul /= scale
+            if getattr(scaler, "with_mean", True) and mean is not None:
+                add = -mean * (mul * 255.0)
+        self.mul = mul.astype(np.float32)
+        self.add = add.astype(np.float32)
+        self.scaled = scaler is not None
+
+    def _resize_into(self, pixels, out):
+        size = self.img_size
+        target = out.reshape(size, size, CHANNELS)
+        if pixels.shape[:2] == (size, size):
+            target[...] = pixels
+        else:
+            import cv2  # impor berat ditunda sampai resize pertama (cold start web_server)
+            target[...] = cv2.resize(pixels, (size, size))
+
+    def transform(self, images, out=None):
+        """
+        Input: list gambar (path, file-like, PIL Image, atau array RGB uint8)
+        Output: array float32 (n, img_size*img_size*3), satu baris per gambar
+        """
+        n = len(images)
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float32)
+        for i, image in enumerate(images):
+            pixels = image if isinstance(image, np.ndarray) else decode_image(image, self.img_size)
+            self._resize_into(pixels, out[i])
+        out *= self.mul
+        if self.scaled:
+            out += self.add
+        return out
+
+    def transform_one(self, image):
+        return self.transform([image])
+
+
+_preprocessors = {}
+_preprocessors_lock = threading.Lock()
+
+
+def get_preprocessor(img_size=IMG_SIZE, scaler=None):
+    """Preprocessor di-cache per (ukuran, objek scaler); scaler baru setelah reload -> entri baru."""
+    key = (img_size, id(scaler) if scaler is not None else None)
+    pre = _preprocessors.get(key)
+    if pre is None:
+        with _preprocessors_lock:
+            pre = _preprocessors.get(key)
+            if pre is None:
+                if scaler is not None:
+                    # Hanya simpan satu versi scaler per ukuran
+                    for old in [k for k in _preprocessors if k[0] == img_size and k[1] is not None]:
+                        del _preprocessors[old]
+                pre = ImagePreprocessor(img_size, scaler)
+                _preprocessors[key] = pre
+    return pre
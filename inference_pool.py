@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import time
+import wave
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from model_registry import registry
+from media_io import fetch_media, stream_media
+from config import INFERENCE_PROCESSES, INFERENCE_WORKERS
+
+# ====================================================================
+# WORKER POOL INFERENSI (THREAD ATAU PROSES PRE-FORK)
+# ====================================================================
+# Dengan INFERENCE_PROCESSES > 0, inferensi berjalan di proses terpisah
+# (forkserver) supaya throughput naik sesuai jumlah core. Model SVC yang
+# sudah dikompilasi disimpan sekali ke folder .svc dan dibuka dengan mmap
+# oleh setiap worker, jadi support vector hanya ada satu salinan di RAM.
+# Modul prediksi (PIL, OpenCV, soundfile) baru di-import saat inferensi
+# pertama atau saat warmup(), supaya import web_server tetap ringan.
+
+MODEL_NAMES = ('face', 'voice')
+
+
+def run_inference(buffer, media_type, camera_id=None):
+    """Jalankan model ML sesuai tipe media (dipanggil di inference_executor)."""
+    if media_type == "picture":
+        from PIL import Image
+        from predict_picture import predict_image
+        image = Image.open(buffer)
+        return predict_image(image, camera_id)
+    elif media_type == "voice":
+        from predict_voice import predict_audio
+        return predict_audio(buffer)
+    return "N/A", 0.0
+
+
+def fetch_and_infer(url, media_type, camera_id=None):
+    """Download + inferensi dalam satu job (dipakai worker MQTT)."""
+    return run_inference(fetch_media(url), media_type, camera_id)
+
+
+def stream_and_infer(url):
+    """
+    Verifikasi suara streaming (MFCC dihitung selagi WAV diunduh) dalam satu job,
+    supaya model suara hanya di-load di worker inferensi.
+    Output: (label, confidence, early)
+    """
+    from predict_voice import predict_audio_stream
+    return stream_media(url, predict_audio_stream)
+
+
+def ensure_compiled(names=MODEL_NAMES):
+    """
+    Pastikan folder .svc cocok dengan versi .pkl saat ini (ditulis ulang secara atomik
+    jika belum ada atau basi, lihat ModelBundle.compiled) supaya worker bisa membukanya dengan mmap.
+    """
+    for name in names:
+        try:
+            registry.get(name).compiled
+        except FileNotFoundError as e:
+            print(f"Model {name} belum tersedia: {e}")
+
+
+def _warm_worker():
+    # Buka model (mmap .svc) sekali saat worker start, bukan di request pertama
+    for name in MODEL_NAMES:
+        try:
+            registry.get(name).compiled
+        except Exception as e:
+            print(f"Worker {os.getpid()}: gagal memuat model {name}: {e}")
+
+
+def synthetic_media(sample_rate=16000):
+    """Byte JPEG (noise 320x240) dan WAV (nada 220 Hz, 1 detik) untuk warmup pipeline."""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    image = BytesIO()
+    Image.fromarray(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)).save(image, format="JPEG")
+
+    tone = 0.3 * np.sin(2 * np.pi * 220 * np.arange(sample_rate) / sample_rate)
+    audio = BytesIO()
+    with wave.open(audio, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((tone * 32767).astype("<i2").tobytes())
+    return {"picture": image.getvalue(), "voice": audio.getvalue()}
+
+
+def warmup(executor=None, jobs=1):
+    """
+    Jalankan media sintetis lewat pipeline penuh (decode, VAD, MFCC, batcher, SVC).
+    jobs > 1 untuk process pool supaya lebih banyak worker ikut ter-warmup.
+    Output: dict tipe media -> durasi (detik)
+    """
+    timings = {}
+    for media_type, data in synthetic_media().items():
+        t0 = time.perf_counter()
+        try:
+            if executor is None:
+                run_inference(BytesIO(data), media_type)
+            else:
+                for future in [executor.submit(run_inference, BytesIO(data), media_type) for _ in range(max(1, jobs))]:
+                    future.result()
+        except Exception as e:
+            # Model yang belum tersedia tidak menghalangi warmup media lain
+            print(f"Warmup {media_type} gagal: {e}")
+            continue
+        timings[media_type] = time.perf_counter() - t0
+    return timings
+
+
+def create_inference_executor(processes=INFERENCE_PROCESSES, threads=INFERENCE_WORKERS):
+    """ProcessPoolExecutor pre-fork jika processes > 0, selain itu ThreadPoolExecutor."""
+    if processes <= 0:
+        return ThreadPoolExecutor(max_workers=threads, thread_name_prefix="inference")
+    ensure_compiled()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_warm_worker)
+    # Pre-fork: jalankan semua worker sekarang supaya request pertama tidak menunggu start proses
+    for future in [executor.submit(os.getpid) for _ in range(processes)]:
+        future.result()
+    return executor
@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+import paho.mqtt.client as mqtt
+from config import INGEST_BUS_CAPACITY, INGEST_QUEUE_CAPACITY
+
+# ====================================================================
+# INGESTI MQTT BERSAMA + PUB/SUB DI MEMORI
+# ====================================================================
+# Satu subscriber MQTT per proses server. Payload di-decode dan
+# dinormalisasi sekali, lalu disebar ke semua sesi dashboard lewat
+# EventBus; tiap sesi punya cursor sendiri, jadi biaya ingesti tetap
+# sama berapa pun jumlah operator yang membuka dashboard.
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class EventBus:
+    def __init__(self, capacity=INGEST_BUS_CAPACITY):
+        self._events = deque(maxlen=max(1, int(capacity)))
+        self._next_seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def head(self):
+        """Seq untuk event berikutnya (cursor subscriber baru)."""
+        return self._next_seq
+
+    def publish(self, event):
+        with self._cond:
+            event["seq"] = self._next_seq
+            self._events.append(event)
+            self._next_seq += 1
+            self._cond.notify_all()
+            return event["seq"]
+
+    def read(self, cursor, timeout=None):
+        """
+        Ambil event dengan seq >= cursor. timeout: tunggu maksimal sekian detik
+        jika belum ada event baru (None = tidak menunggu).
+        Output: (events, cursor_baru, jumlah_event_yang_terlewat)
+        """
+        with self._cond:
+            if timeout is not None and cursor >= self._next_seq:
+                self._cond.wait_for(lambda: cursor < self._next_seq, timeout)
+            if not self._events:
+                return [], max(cursor, self._next_seq), 0
+            oldest = self._events[0]["seq"]
+            dropped = max(0, oldest - cursor)
+            start = max(cursor, oldest) - oldest
+            events = [self._events[i] for i in range(start, len(self._events))]
+            return events, self._next_seq, dropped
+
+    def subscribe(self):
+        return Subscription(self)
+
+
+class Subscription:
+    """Cursor per sesi; event lama yang sudah terlewat buffer dihitung di `dropped`."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.cursor = bus.head
+        self.dropped = 0
+
+    def poll(self, timeout=None):
+        events, self.cursor, dropped = self.bus.read(self.cursor, timeout)
+        self.dropped += dropped
+        return events
+
+
+def normalize_message(topic, payload, timestamp=None):
+    """Ubah pesan MQTT mentah menjadi event dict. Payload JSON di-parse ke `data`."""
+    event = {
+        "topic": topic,
+        "payload": payload,
+        "time": timestamp or datetime.now().strftime(TIME_FORMAT),
+        "data": None,
+    }
+    if payload[:1] in ("{", "["):
+        try:
+            event["data"] = json.loads(payload)
+        except json.JSONDecodeError:
+            pass
+    return event
+
+
+class IngestService:
+    def __init__(self, broker, port, topics, bus=None, client_prefix="BrankasIngest"):
+        self.broker = broker
+        self.port = port
+        self.topics = list(topics)
+        self.bus = bus or EventBus()
+        self.client_prefix = client_prefix
+        self._handlers = []
+        self.client = None
+        self.received = 0
+
+    def add_handler(self, handler):
+        """handler(event) dipanggil sekali per event (di thread MQTT) sebelum disebar ke bus."""
+        self._handlers.append(handler)
+
+    def start(self):
+        client_id = f"{self.client_prefix}-{int(time.time())}"
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=True)
+        client.on_connect = self._on_connect
+        client.on_message = self._on_message
+        client.connect(self.broker, self.port, 60)
+        client.loop_start()
+        self.client = client
+        return self
+
+    def publish(self, topic, payload):
+        if self.client is not None:
+            self.client.publish(topic, payload)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            client.subscribe([(topic, 0) for topic in self.topics])
+            print("✅ MQTT Ingest Connected")
+
+    def _on_message(self, client, userdata, msg):
+        try:
+            payload = msg.payload.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            return
+        self.received += 1
+        event = normalize_message(msg.topic, payload)
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Error handler ingest ({msg.topic}): {e}")
+        self.bus.publish(event)
+
+
+# ====================================================================
+# ANTREAN JOB TERBATAS (PRIORITAS, COALESCING, LOAD SHEDDING)
+# ====================================================================
+# Pesan MQTT dan job media tidak diproses langsung di thread paho, tapi
+# masuk ke antrean berkapasitas tetap dengan kelas prioritas (alarm
+# didahulukan dari bacaan rutin). Job dengan key yang sama (mis. URL foto
+# per brankas) menimpa job lama yang belum jalan. Saat penuh, job tertua
+# dari kelas prioritas terendah dibuang; job baru baru ditolak jika semua
+# isi antrean lebih penting darinya.
+
+PRIORITY_ALARM = 0
+PRIORITY_EVENT = 1
+PRIORITY_MEDIA = 2
+PRIORITY_NAMES = {PRIORITY_ALARM: "alarm", PRIORITY_EVENT: "event", PRIORITY_MEDIA: "media"}
+
+
+class JobQueue:
+    def __init__(self, capacity=INGEST_QUEUE_CAPACITY, name="jobs"):
+        self.capacity = max(1, int(capacity))
+        self.name = name
+        # Satu OrderedDict per prioritas: key -> (job, waktu masuk); urutan = FIFO
+        self._levels = {p: OrderedDict() for p in sorted(PRIORITY_NAMES)}
+        self._cond = threading.Condition()
+        self._size = 0
+        self._next_id = 0
+        self.max_depth = 0
+        self.coalesced = 0
+        self.enqueued = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.dropped = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.wait_max = dict.fromkeys(PRIORITY_NAMES, 0.0)
+
+    def __len__(self):
+        return self._size
+
+    def put(self, job, priority=PRIORITY_EVENT, key=None):
+        """
+        Masukkan job. key: job lain dengan key & prioritas sama yang belum jalan diganti job ini.
+        Output: True jika masuk antrean (atau menimpa job lama), False jika ditolak karena penuh.
+        """
+        with self._cond:
+            level = self._levels[priority]
+            self.enqueued[priority] += 1
+            if key is not None and key in level:
+                # Posisi & waktu masuk job lama dipertahankan supaya tidak terdorong ke belakang terus
+                level[key] = (job, level[key][1])
+                self.coalesced += 1
+                return True
+            if self._size >= self.capacity and not self._shed(priority):
+                self.dropped[priority] += 1
+                return False
+            if key is None:
+                key = ("_job", self._next_id)
+                self._next_id += 1
+            level[key] = (job, time.monotonic())
+            self._size += 1
+            self.max_depth = max(self.max_depth, self._size)
+            self._cond.notify()
+            return True
+
+    def _shed(self, priority):
+        # Buang job tertua dari kelas terendah, asal tidak lebih penting dari job yang masuk
+        for p in sorted(self._levels, reverse=True):
+            if p < priority:
+                return False
+            if self._levels[p]:
+                self._levels[p].popitem(last=False)
+                self._size -= 1
+                self.dropped[p] += 1
+                return True
+        return False
+
+    def get(self, timeout=None):
+        """Job berikutnya (prioritas tertinggi, lalu yang paling lama menunggu). None jika timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0, timeout):
+                return None
+            for p, level in self._levels.items():
+                if level:
+                    _, (job, queued_at) = level.popitem(last=False)
+                    self._size -= 1
+                    self.wait_max[p] = max(self.wait_max[p], time.monotonic() - queued_at)
+                    return job
+
+    def stats(self):
+        with self._cond:
+            out = {"depth": self._size, "capacity": self.capacity, "max_depth": self.max_depth, "coalesced": self.coalesced}
+            for p, name in PRIORITY_NAMES.items():
+                out[f"depth_{name}"] = len(self._levels[p])
+                out[f"enqueued_{name}"] = self.enqueued[p]
+                out[f"dropped_{name}"] = self.dropped[p]
+                out[f"wait_max_ms_{name}"] = self.wait_max[p] * 1000.0
+            return out
+
+
+def start_workers(jobs, handler, count=1, name=None):
+    """Thread daemon yang terus mengambil job dari JobQueue dan memanggil handler(job)."""
+    def run():
+        while True:
+            job = jobs.get()
+            try:
+                handler(job)
+            except Exception as e:
+                print(f"Error job {jobs.name}: {e}")
+
+    threads = [threading.Thread(target=run, name=f"{name or jobs.name}-{i}", daemon=True) for i in range(max(1, count))]
+    for t in threads:
+        t.start()
+    return threads
@@ -0,0 +1,481 @@
+"""
+Load test end-to-end offline: broker lokal + armada ESP32 palsu + web_server.
+
+Satu "trigger" meniru satu percobaan akses di satu brankas: status sensor
+dipublish ke topik status brankas, lalu foto dan audio dikirim ke /process
+(dengan vault_id + session) dan diunduh server dari server HTTP lokal yang
+meniru kamera/mikrofon ESP32. Latensi end-to-end dihitung dari trigger
+sampai verdict lengkap (sensor + wajah + suara) muncul di topik verdict.
+
+Trigger dijadwalkan open-loop pada beberapa laju (--rates, trigger/detik),
+dibagi rata ke --vaults brankas. Titik jenuh = laju pertama yang
+completion-nya < 95% atau p95 end-to-end > --slo-ms; kapasitas brankas
+dihitung dari laju terakhir yang masih lolos dan --vault-triggers-per-min.
+
+Secara default web_server dijalankan sebagai subprocess uvicorn di folder
+sementara (file .pkl repo di-symlink; image_model.pkl diganti SVC sintetis
+jika belum ada), terhubung ke broker lokal lewat BRANKAS_MQTT_BROKER.
+
+Contoh:
+    python loadtest.py --vaults 20 --rates 1,2,4,8 --duration 30
+    python loadtest.py --vaults 20 --rates 1,2,4,8 --combined
+    python loadtest.py --server http://127.0.0.1:8000 --broker 127.0.0.1:1883 --rates 5
+"""
+import os
+
+# Harus sebelum import topics/config: topik per brankas dipakai di sisi load test juga
+os.environ.setdefault("BRANKAS_VAULT_TOPICS", "1")
+
+import argparse
+import json
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+import paho.mqtt.client as mqtt
+
+from local_broker import LocalBroker
+from topics import topic, subscriptions, parse_topic
+from decision import VERDICT_PENDING
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPLETION_TARGET = 0.95
+
+
+# ====================================================================
+# ARMADA ESP32 PALSU (HTTP)
+# ====================================================================
+
+def _stamp_jpeg(data, n):
+    # Segmen komentar (COM) setelah SOI: gambar sama, tapi sha256 berbeda (cache prediksi miss)
+    comment = f"capture-{n}".encode()
+    return data[:2] + b"\xff\xfe" + (len(comment) + 2).to_bytes(2, "big") + comment + data[2:]
+
+
+def _stamp_wav(data, n):
+    # Ganti 4 sampel terakhir (PCM 16-bit) dengan nomor capture
+    return data[:-8] + n.to_bytes(8, "little", signed=False)
+
+
+class FakeFleet:
+    """Server HTTP yang meniru kamera (/cam/<device>/<n>.jpg) dan mikrofon (/mic/<device>/<n>.wav) ESP32."""
+
+    PATH_RE = re.compile(r"^/(cam|mic)/([\w-]+)/(\d+)\.(jpg|wav)$")
+
+    def __init__(self, variants=4, unique=True, seed=0, host="127.0.0.1"):
+        from benchmark import make_jpeg, make_wav
+
+        rng = np.random.default_rng(seed)
+        self.jpegs = [make_jpeg(rng) for _ in range(max(1, variants))]
+        self.wavs = [make_wav(rng) for _ in range(max(1, variants))]
+        self.unique = unique
+        self.served = 0
+        self._lock = threading.Lock()
+        fleet = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                match = fleet.PATH_RE.match(self.path)
+                if match is None:
+                    self.send_error(404)
+                    return
+                kind, _, n, _ = match.groups()
+                body = fleet.capture(kind, int(n))
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg" if kind == "cam" else "audio/wav")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def capture(self, kind, n):
+        with self._lock:
+            self.served += 1
+        if kind == "cam":
+            data = self.jpegs[n % len(self.jpegs)]
+            return _stamp_jpeg(data, n) if self.unique else data
+        data = self.wavs[n % len(self.wavs)]
+        return _stamp_wav(data, n) if self.unique else data
+
+    def url(self, kind, device, n):
+        ext = "jpg" if kind == "cam" else "wav"
+        return f"{self.base_url}/{kind}/{device}/{n}.{ext}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-fleet", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ====================================================================
+# WEB SERVER YANG DIUJI
+# ====================================================================
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_workdir(standin_face=True):
+    """Folder kerja sementara berisi symlink .pkl repo (+ model wajah sintetis jika belum ada)."""
+    workdir = tempfile.mkdtemp(prefix="brankas-loadtest-")
+    for name in os.listdir(REPO_DIR):
+        if name.endswith(".pkl"):
+            os.symlink(os.path.join(REPO_DIR, name), os.path.join(workdir, name))
+    if standin_face and not os.path.exists(os.path.join(workdir, "image_model.pkl")):
+        import pickle
+        from benchmark import make_standin_face_model
+
+        svc = make_standin_face_model(np.random.default_rng(0), scaler_path=os.path.join(REPO_DIR, "image_scaler.pkl"))
+        with open(os.path.join(workdir, "image_model.pkl"), "wb") as f:
+            pickle.dump(svc, f)
+    return workdir
+
+
+def start_web_server(broker_host, broker_port, workdir, extra_env=None):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "BRANKAS_MQTT_BROKER": broker_host,
+        "BRANKAS_MQTT_PORT": str(broker_port),
+        "BRANKAS_VAULT_TOPICS": "1",
+        "PYTHONPATH": REPO_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+    # Warmup sebelum /health ready, supaya langkah pertama tidak mengukur cold start
+    env.setdefault("BRANKAS_WARMUP", "1")
+    env.update(extra_env or {})
+    cmd = [sys.executable, "-m", "uvicorn", "web_server:app", "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def wait_healthy(server_url, timeout=120.0, proc=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"web_server berhenti (exit {proc.returncode})")
+        try:
+            if requests.get(f"{server_url}/health", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{server_url}/health tidak ready dalam {timeout:.0f} detik")
+
+
+# ====================================================================
+# PENGGERAK TRIGGER + PENDENGAR VERDICT
+# ====================================================================
+
+class VerdictListener:
+    """Catat waktu verdict lengkap pertama per (vault_id, session) dari topik verdict."""
+
+    def __init__(self, broker_host, broker_port):
+        self._lock = threading.Lock()
+        self._pending = {}  # (vault_id, session) -> waktu trigger
+        self.latencies = {}  # (vault_id, session) -> detik
+        self.verdicts = {}
+        self._subscribed = threading.Event()
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"BrankasLoadTest-{os.getpid()}")
+        client.on_connect = lambda c, *a: c.subscribe([(f, 0) for f in subscriptions(["verdict"])])
+        client.on_subscribe = lambda *a: self._subscribed.set()
+        client.on_message = self._on_message
+        client.connect(broker_host, broker_port, 60)
+        client.loop_start()
+        self.client = client
+
+    def wait_ready(self, timeout=10.0):
+        if not self._subscribed.wait(timeout):
+            raise TimeoutError("Subscribe topik verdict tidak dikonfirmasi broker")
+
+    def expect(self, vault_id, session, started):
+        with self._lock:
+            self._pending[(vault_id, session)] = started
+
+    def _on_message(self, client, userdata, msg):
+        now = time.perf_counter()
+        try:
+            verdict = json.loads(msg.payload)
+        except ValueError:
+            return
+        if verdict.get("status") is None or verdict.get("face") is None or verdict.get("voice") is None \
+                or verdict.get("verdict") == VERDICT_PENDING:
+            return
+        key = (verdict.get("vault_id") or parse_topic(msg.topic)[0], verdict.get("session"))
+        with self._lock:
+            started = self._pending.pop(key, None)
+            if started is not None:
+                self.latencies[key] = now - started
+                self.verdicts[key] = verdict.get("verdict")
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class LoadDriver:
+    def __init__(self, server_url, fleet, listener, vaults, concurrency=64, http_timeout=30.0, combined=False):
+        self.server_url = server_url.rstrip("/")
+        self.fleet = fleet
+        self.listener = listener
+        self.vaults = [f"v{i:03d}" for i in range(vaults)]
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="trigger")
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.http.mount("http://", adapter)
+        self.http_timeout = http_timeout
+        # combined: satu GET /verify (wajah + suara paralel) per trigger, bukan dua /process
+        self.combined = combined
+        self.publisher = listener.client
+        self._seq = 0
+
+    def _call(self, name, path, params):
+        t0 = time.perf_counter()
+        try:
+            response = self.http.get(f"{self.server_url}{path}", timeout=self.http_timeout, params=params)
+            ok = response.status_code == 200 and response.json().get("status") == "success"
+        except (requests.exceptions.RequestException, ValueError):
+            ok = False
+        return name, time.perf_counter() - t0, ok
+
+    def _process(self, url, media_type, vault_id, session):
+        return self._call(media_type, "/process", {"url": url, "media_type": media_type, "vault_id": vault_id, "session": session})
+
+    def trigger(self, vault_id, n):
+        """Satu percobaan akses: status sensor lalu foto + audio ke /process (atau /verify). Output: list (nama, detik, ok)."""
+        session = f"lt-{n}"
+        self.listener.expect(vault_id, session, time.perf_counter())
+        reading = {"status_val": "AMAN", "jarak_val": 30, "pir_val": 1, "session": session}
+        self.publisher.publish(topic("status", vault_id), json.dumps(reading))
+        device = f"esp32-{vault_id}"
+        if self.combined:
+            params = {"face_url": self.fleet.url("cam", device, n), "voice_url": self.fleet.url("mic", device, n),
+                      "vault_id": vault_id, "session": session}
+            return [self._call("verify", "/verify", params)]
+        return [
+            self._process(self.fleet.url("cam", device, n), "picture", vault_id, session),
+            self._process(self.fleet.url("mic", device, n), "voice", vault_id, session),
+        ]
+
+    def _sensor_chatter(self, rate, stop):
+        # Telemetri sensor tanpa sesi dari semua brankas (beban MQTT di luar percobaan akses)
+        interval = 1.0 / rate
+        i = 0
+        while not stop.wait(interval):
+            vault_id = self.vaults[i % len(self.vaults)]
+            self.publisher.publish(topic("status", vault_id), json.dumps({"status_val": "STANDBY", "jarak_val": 120, "pir_val": 0}))
+            i += 1
+
+    def run_step(self, rate, duration, drain, sensor_rate=0.0):
+        """Jalankan trigger open-loop pada `rate` trigger/detik selama `duration` detik."""
+        stop = threading.Event()
+        if sensor_rate > 0:
+            threading.Thread(target=self._sensor_chatter, args=(sensor_rate, stop), daemon=True).start()
+        futures, keys = [], []
+        interval = 1.0 / rate
+        start = time.perf_counter()
+        count = int(rate * duration)
+        for i in range(count):
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            vault_id = self.vaults[self._seq % len(self.vaults)]
+            keys.append((vault_id, f"lt-{self._seq}"))
+            futures.append(self.pool.submit(self.trigger, vault_id, self._seq))
+            self._seq += 1
+        send_seconds = time.perf_counter() - start
+        stop.set()
+
+        http = {}
+        errors = 0
+        for f in futures:
+            for name, seconds, ok in f.result():
+                http.setdefault(name, []).append(seconds)
+                errors += not ok
+        # Tunggu verdict yang masih di jalan (MQTT) sebelum menghitung
+        deadline = time.monotonic() + drain
+        while time.monotonic() < deadline and not all(k in self.listener.latencies for k in keys):
+            time.sleep(0.05)
+        e2e = [self.listener.latencies[k] for k in keys if k in self.listener.latencies]
+        wall = time.perf_counter() - start
+
+        return {
+            "rate_per_s": rate,
+            "triggers": count,
+            "completed": len(e2e),
+            "completion": len(e2e) / count if count else 0.0,
+            "http_errors": errors,
+            "offered_rate_per_s": count / send_seconds if send_seconds > 0 else 0.0,
+            "achieved_rate_per_s": len(e2e) / wall if wall > 0 else 0.0,
+            "e2e": latency_summary(e2e),
+            "http": {m: latency_summary(v) for m, v in http.items()},
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.http.close()
+
+
+# ====================================================================
+# LAPORAN
+# ====================================================================
+
+def latency_summary(durations):
+    if not durations:
+        return {"n": 0}
+    d = np.asarray(durations) * 1000.0
+    return {
+        "n": int(d.size),
+        "mean_ms": float(d.mean()),
+        "p50_ms": float(np.percentile(d, 50)),
+        "p95_ms": float(np.percentile(d, 95)),
+        "p99_ms": float(np.percentile(d, 99)),
+        "max_ms": float(d.max()),
+    }
+
+
+def saturation(steps, slo_ms, vault_triggers_per_min):
+    """Laju terakhir yang lolos (completion >= 95% dan p95 <= SLO), laju jenuh pertama, dan kapasitas brankas."""
+    sustainable, saturated = None, None
+    for step in steps:
+        p95 = step["e2e"].get("p95_ms")
+        if step["completion"] >= COMPLETION_TARGET and p95 is not None and p95 <= slo_ms:
+            sustainable = step["rate_per_s"]
+        else:
+            saturated = step["rate_per_s"]
+            break
+    return {
+        "sustainable_rate_per_s": sustainable,
+        "saturation_rate_per_s": saturated,
+        "slo_p95_ms": slo_ms,
+        "vault_triggers_per_min": vault_triggers_per_min,
+        "max_vaults": int(sustainable * 60.0 / vault_triggers_per_min) if sustainable else 0,
+    }
+
+
+def print_step(step):
+    e2e = step["e2e"]
+    http = "  ".join(f"{name} p95 {s.get('p95_ms', 0):.0f} ms" for name, s in step["http"].items())
+    print(f"{step['rate_per_s']:>7.2f}/s  selesai {step['completed']}/{step['triggers']} ({step['completion']:.0%})"
+          f"  e2e p50/p95/p99 {e2e.get('p50_ms', 0):.0f}/{e2e.get('p95_ms', 0):.0f}/{e2e.get('p99_ms', 0):.0f} ms"
+          f"  {http}  error {step['http_errors']}")
+
+
+def parse_rates(value):
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test end-to-end offline (broker lokal + ESP32 palsu)")
+    parser.add_argument("--vaults", type=int, default=10)
+    parser.add_argument("--rates", type=parse_rates, default=[1, 2, 4, 8], help="Trigger/detik per langkah, dipisah koma")
+    parser.add_argument("--duration", type=float, default=20.0, help="Detik per langkah")
+    parser.add_argument("--drain", type=float, default=10.0, help="Batas tunggu verdict setelah langkah selesai (detik)")
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="Batas p95 trigger -> verdict")
+    parser.add_argument("--vault-triggers-per-min", type=float, default=1.0, help="Perkiraan percobaan akses per brankas per menit")
+    parser.add_argument("--sensor-rate", type=float, default=0.0, help="Pesan status tambahan (tanpa sesi) per detik")
+    parser.add_argument("--concurrency", type=int, default=64, help="Trigger yang boleh berjalan bersamaan")
+    parser.add_argument("--variants", type=int, default=4, help="Jumlah foto/audio sintetis berbeda")
+    parser.add_argument("--combined", action="store_true", help="Pakai /verify (wajah + suara paralel) per trigger")
+    parser.add_argument("--reuse-media", action="store_true", help="Jangan buat isi unik per capture (cache prediksi boleh hit)")
+    parser.add_argument("--server", default=None, help="URL web_server yang sudah berjalan (default: jalankan subprocess)")
+    parser.add_argument("--broker", default=None, help="host:port broker yang dipakai server (default: broker lokal)")
+    parser.add_argument("--no-standin-face", action="store_true", help="Jangan buat image_model.pkl sintetis")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    broker = None
+    if args.broker:
+        broker_host, _, port = args.broker.partition(":")
+        broker_port = int(port or 1883)
+    else:
+        broker = LocalBroker().start()
+        broker_host, broker_port = broker.host, broker.port
+        print(f"Broker lokal di {broker_host}:{broker_port}")
+
+    fleet = FakeFleet(args.variants, unique=not args.reuse_media).start()
+    print(f"Armada ESP32 palsu di {fleet.base_url} ({args.vaults} brankas)")
+
+    proc, workdir = None, None
+    server_url = args.server
+    listener = driver = None
+    try:
+        if server_url is None:
+            workdir = prepare_workdir(standin_face=not args.no_standin_face)
+            proc, server_url = start_web_server(broker_host, broker_port, workdir)
+            print(f"web_server (pid {proc.pid}) di {server_url}, folder kerja {workdir}")
+        wait_healthy(server_url, proc=proc)
+
+        listener = VerdictListener(broker_host, broker_port)
+        listener.wait_ready()
+        driver = LoadDriver(server_url, fleet, listener, args.vaults, args.concurrency, combined=args.combined)
+
+        steps = []
+        for rate in args.rates:
+            step = driver.run_step(rate, args.duration, args.drain, args.sensor_rate)
+            steps.append(step)
+            print_step(step)
+            if step["completion"] < COMPLETION_TARGET / 2:
+                print("Completion di bawah 50%, langkah berikutnya dilewati")
+                break
+
+        report = {
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "vaults": args.vaults,
+            "duration_s": args.duration,
+            "unique_media": not args.reuse_media,
+            "combined": args.combined,
+            "steps": steps,
+            "saturation": saturation(steps, args.slo_ms, args.vault_triggers_per_min),
+            "broker": broker.stats() if broker is not None else None,
+            "media_served": fleet.served,
+        }
+        sat = report["saturation"]
+        print(f"Laju aman: {sat['sustainable_rate_per_s']} trigger/s, jenuh: {sat['saturation_rate_per_s']} trigger/s"
+              f" -> kira-kira {sat['max_vaults']} brankas @ {args.vault_triggers_per_min:g} percobaan/menit")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Laporan ditulis ke {args.output}")
+    finally:
+        if driver is not None:
+            driver.close()
+        if listener is not None:
+            listener.stop()
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+        fleet.stop()
+        if broker is not None:
+            broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Broker MQTT lokal minimal (in-process) untuk load test dan pengembangan offline.
+
+Mendukung MQTT 3.1.1 dan 5 sejauh yang dipakai komponen brankas: CONNECT,
+PUBLISH (QoS 0/1 masuk, dikirim ulang sebagai QoS 0), SUBSCRIBE/UNSUBSCRIBE
+dengan wildcard + / #, shared subscription $share/<grup>/<filter> (round
+robin), PINGREQ dan DISCONNECT. Tanpa retained message, sesi persisten,
+QoS 2, maupun autentikasi.
+
+Contoh:
+    python local_broker.py --port 1883
+    BRANKAS_MQTT_BROKER=127.0.0.1 uvicorn web_server:app
+"""
+import argparse
+import asyncio
+import itertools
+import threading
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+MQTT_V5 = 5
+
+
+def topic_matches(topic_filter, topic):
+    """Cocokkan topik dengan filter MQTT (+ satu level, # sisa level)."""
+    f_parts = topic_filter.split("/")
+    t_parts = topic.split("/")
+    for i, part in enumerate(f_parts):
+        if part == "#":
+            return True
+        if i >= len(t_parts):
+            return False
+        if part != "+" and part != t_parts[i]:
+            return False
+    return len(f_parts) == len(t_parts)
+
+
+def _encode_length(n):
+    out = bytearray()
+    while True:
+        byte = n % 128
+        n //= 128
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _encode_str(s):
+    data = s.encode("utf-8")
+    return len(data).to_bytes(2, "big") + data
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def u8(self):
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def u16(self):
+        self.pos += 2
+        return int.from_bytes(self.data[self.pos - 2:self.pos], "big")
+
+    def varint(self):
+        value, shift = 0, 0
+        while True:
+            byte = self.u8()
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def string(self):
+        n = self.u16()
+        self.pos += n
+        return self.data[self.pos - n:self.pos].decode("utf-8")
+
+    def skip_properties(self):
+        n = self.varint()
+        self.pos += n
+
+    def rest(self):
+        return self.data[self.pos:]
+
+    @property
+    def remaining(self):
+        return len(self.data) - self.pos
+
+
+class _Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.version = 4
+        self.client_id = ""
+        self.subscriptions = {}  # filter asli -> (grup atau None, filter topik)
+
+
+class LocalBroker:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self._sessions = set()
+        self._round_robin = {}  # (grup, filter) -> iterator
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.messages_in = 0
+        self.messages_out = 0
+
+    # ----------------------------------------------------------------
+    def start(self):
+        """Jalankan broker di thread sendiri (event loop asyncio). Output: self (port terisi)."""
+        self._thread = threading.Thread(target=self._run, name="local-broker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        return {"clients": len(self._sessions), "messages_in": self.messages_in, "messages_out": self.messages_out}
+
+    # ----------------------------------------------------------------
+    async def _read_packet(self, reader):
+        header = await reader.readexactly(1)
+        length, shift = 0, 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                break
+            shift += 7
+        body = await reader.readexactly(length) if length else b""
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    @staticmethod
+    def _send(session, packet_type, flags, body):
+        session.writer.write(bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body)
+
+    async def _handle(self, reader, writer):
+        session = _Session(writer)
+        self._sessions.add(session)
+        try:
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == DISCONNECT:
+                    break
+                self._dispatch(session, packet_type, flags, body)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._sessions.discard(session)
+            writer.close()
+
+    def _dispatch(self, session, packet_type, flags, body):
+        r = _Reader(body)
+        v5 = session.version == MQTT_V5
+        if packet_type == CONNECT:
+            r.string()  # "MQTT"
+            session.version = r.u8()
+            r.u8()  # connect flags
+            r.u16()  # keepalive
+            if session.version == MQTT_V5:
+                r.skip_properties()
+            session.client_id = r.string()
+            ack = b"\x00\x00\x00" if session.version == MQTT_V5 else b"\x00\x00"
+            self._send(session, CONNACK, 0, ack)
+        elif packet_type == PUBLISH:
+            qos = (flags >> 1) & 0x03
+            topic = r.string()
+            packet_id = r.u16() if qos else None
+            if v5:
+                r.skip_properties()
+            self.messages_in += 1
+            self._route(topic, r.rest())
+            if qos == 1:
+                self._send(session, PUBACK, 0, packet_id.to_bytes(2, "big"))
+        elif packet_type == SUBSCRIBE:
+            packet_id = r.u16()
+            if v5:
+                r.skip_properties()
+            codes = bytearray()
+            while r.remaining:
+                topic_filter = r.string()
+                r.u8()  # opsi / QoS yang diminta; selalu diberi QoS 0
+                session.subscriptions[topic_filter] = self._parse_filter(topic_filter)
+                codes.append(0)
+            props = b"\x00" if v5 else b""
+            self._send(session, SUBACK, 0, packet_id.to_bytes(2, "big") + props + bytes(codes))
+        elif packet_type == UNSUBSCRIBE:
+            packet_id = r.u16()
+            if v5:
+                r.skip_properties()
+            codes = bytearray()
+            while r.remaining:
+                session.subscriptions.pop(r.string(), None)
+                codes.append(0)
+            tail = b"\x00" + bytes(codes) if v5 else b""
+            self._send(session, UNSUBACK, 0, packet_id.to_bytes(2, "big") + tail)
+        elif packet_type == PINGREQ:
+            self._send(session, PINGRESP, 0, b"")
+
+    @staticmethod
+    def _parse_filter(topic_filter):
+        if topic_filter.startswith("$share/"):
+            _, group, rest = topic_filter.split("/", 2)
+            return group, rest
+        return None, topic_filter
+
+    def _route(self, topic, payload):
+        direct = []
+        groups = {}
+        for session in list(self._sessions):
+            for group, topic_filter in session.subscriptions.values():
+                if not topic_matches(topic_filter, topic):
+                    continue
+                if group is None:
+                    direct.append(session)
+                else:
+                    groups.setdefault((group, topic_filter), []).append(session)
+        targets = set(direct)
+        for key, members in groups.items():
+            # Satu anggota grup per pesan, bergiliran
+            cycle = self._round_robin.get(key)
+            if cycle is None or cycle[0] != len(members):
+                cycle = (len(members), itertools.count())
+                self._round_robin[key] = cycle
+            targets.add(members[next(cycle[1]) % len(members)])
+        for session in targets:
+            props = b"\x00" if session.version == MQTT_V5 else b""
+            self._send(session, PUBLISH, 0, _encode_str(topic) + props + payload)
+            self.messages_out += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker MQTT lokal minimal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+    broker = LocalBroker(args.host, args.port).start()
+    print(f"Broker lokal berjalan di {broker.host}:{broker.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import threading
+from io import BytesIO
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    MAX_MEDIA_BYTES, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE,
+)
+
+# ====================================================================
+# BUFFER MEDIA DI MEMORI (TANPA FILE SEMENTARA)
+# ====================================================================
+
+CHUNK_SIZE = 8192
+
+
+class MediaTooLargeError(ValueError):
+    """Media dari ESP32 melebihi MAX_MEDIA_BYTES."""
+
+
+def iter_response_chunks(response, max_bytes=MAX_MEDIA_BYTES, chunk_size=CHUNK_SIZE):
+    """
+    Generator chunk body response (requests, stream=True) dengan batas ukuran.
+    Download dihentikan begitu ukurannya melewati max_bytes.
+    """
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        response.close()
+        raise MediaTooLargeError(f"Ukuran media {content_length} byte melebihi batas {max_bytes} byte")
+
+    total = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if not chunk:
+            continue
+        total += len(chunk)
+        if total > max_bytes:
+            response.close()
+            raise MediaTooLargeError(f"Ukuran media melebihi batas {max_bytes} byte")
+        yield chunk
+
+
+def read_response_to_buffer(response, max_bytes=MAX_MEDIA_BYTES, chunk_size=CHUNK_SIZE):
+    """
+    Fungsi untuk membaca body response (requests, stream=True) ke BytesIO.
+    Download dihentikan begitu ukurannya melewati max_bytes.
+    """
+    buffer = BytesIO()
+    for chunk in iter_response_chunks(response, max_bytes, chunk_size):
+        buffer.write(chunk)
+
+    buffer.seek(0)
+    return buffer
+
+
+# ====================================================================
+# SESSION HTTP BERSAMA (KEEP-ALIVE PER HOST ESP32)
+# ====================================================================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Session requests bersama; urllib3 menyimpan satu pool keep-alive per host ESP32."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def fetch_media(url, max_bytes=MAX_MEDIA_BYTES, timeout=None):
+    """
+    Fungsi untuk mengunduh media dari ESP32 ke buffer memori (blocking).
+    Dipanggil dari thread pool supaya event loop FastAPI tidak tertahan.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    with get_http_session().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status() # Raise exception jika 4xx atau 5xx error
+        return read_response_to_buffer(response, max_bytes=max_bytes)
+
+
+def fetch_media_conditional(url, etag=None, last_modified=None, max_bytes=MAX_MEDIA_BYTES, timeout=None):
+    """
+    Seperti fetch_media, tapi mengirim If-None-Match / If-Modified-Since.
+    Output: (buffer, etag, last_modified); buffer None jika server menjawab 304.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    with get_http_session().get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code == 304 and headers:
+            return None, etag, last_modified
+        response.raise_for_status()
+        buffer = read_response_to_buffer(response, max_bytes=max_bytes)
+        return buffer, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def stream_media(url, consume, max_bytes=MAX_MEDIA_BYTES, timeout=None):
+    """
+    Fungsi untuk mengunduh media sambil memprosesnya per chunk.
+    consume(iterator_chunk) dipanggil selama koneksi masih terbuka; jika consume
+    berhenti lebih awal, sisa body tidak diunduh. Output: nilai balik consume.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    with get_http_session().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        return consume(iter_response_chunks(response, max_bytes=max_bytes))
@@ -0,0 +1,222 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from config import PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_INTERVAL_MS
+
+# ====================================================================
+# METRIK LATENSI PER TAHAP (FORMAT TEKS PROMETHEUS)
+# ====================================================================
+# Histogram + counter sederhana tanpa dependensi tambahan. Tahap dicatat
+# dengan `with stage_timer("download", media_type="picture"):` dan semua
+# metrik dirender oleh render() untuk endpoint /metrics.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [counts per bucket, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if idx < len(self.buckets):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for key, counts, total, count in sorted(items):
+            cumulative = 0
+            for le, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', repr(le)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {total}")
+            lines.append(f"{self.name}_count{_label_str(key)} {count}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_label_str(key)} {value}" for key, value in items)
+        return lines
+
+
+STAGE_SECONDS = Histogram("brankas_stage_seconds", "Durasi tiap tahap pipeline inferensi (detik)")
+REQUEST_SECONDS = Histogram("brankas_request_seconds", "Durasi total /process (detik)")
+ERRORS = CounterMetric("brankas_errors_total", "Jumlah error per kategori")
+
+# Sumber metrik tambahan (mis. cache prediksi): fungsi tanpa argumen -> dict nama -> angka
+_collectors = {}
+
+
+def register_collector(prefix, fn):
+    _collectors[prefix] = fn
+
+
+@contextmanager
+def stage_timer(stage, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage, **labels)
+
+
+def render():
+    """Semua metrik dalam format teks Prometheus (exposition format 0.0.4)."""
+    lines = []
+    for metric in (STAGE_SECONDS, REQUEST_SECONDS, ERRORS):
+        lines.extend(metric.render())
+    for prefix, fn in sorted(_collectors.items()):
+        try:
+            values = fn()
+        except Exception:
+            continue
+        for name, value in sorted(values.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE brankas_{prefix}_{name} gauge")
+                lines.append(f"brankas_{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ====================================================================
+# SAMPLING PROFILER UNTUK REQUEST LAMBAT (OPSIONAL)
+# ====================================================================
+# Aktif jika BRANKAS_PROFILE_SLOW_MS > 0. Selama request berjalan, stack
+# semua thread diambil tiap PROFILE_INTERVAL_MS; jika request lebih lama
+# dari ambang, stack ditulis dalam format "collapsed" (flamegraph.pl /
+# speedscope) ke PROFILE_DIR.
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_if_slow(name, slow_ms=PROFILE_SLOW_MS, directory=PROFILE_DIR):
+    """Profiling request; file collapsed-stack ditulis hanya jika durasinya > slow_ms."""
+    if slow_ms <= 0:
+        yield
+        return
+    profiler = SamplingProfiler().start()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        if elapsed_ms > slow_ms and profiler.samples:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            profiler.dump(os.path.join(directory, f"{stamp}-{name}-{int(elapsed_ms)}ms.collapsed"))
+
+
+# ====================================================================
+# WAKTU STARTUP PER FASE
+# ====================================================================
+# Dipakai web_server: durasi import, koneksi MQTT, pool inferensi dan
+# warmup dicatat per fase, dicetak sekali saat siap, dan diekspor ke
+# /metrics sebagai gauge brankas_startup_<fase>_seconds.
+
+
+class StartupPhases:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+        self.ready = False
+        self.ready_after = None
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - t0
+
+    def record(self, name, seconds):
+        self.phases[name] = seconds
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started
+        breakdown = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        print(f"Startup selesai dalam {self.ready_after:.2f}s ({breakdown})")
+
+    def snapshot(self):
+        values = {f"{name}_seconds": seconds for name, seconds in self.phases.items()}
+        values["ready"] = int(self.ready)
+        if self.ready_after is not None:
+            values["total_seconds"] = self.ready_after
+        return values
@@ -0,0 +1,169 @@
+import threading
+import numpy as np
+
+# ====================================================================
+# EKSTRAKSI MFCC CEPAT (NUMPY, TANPA IMPORT LIBROSA)
+# ====================================================================
+# Hasilnya setara dengan:
+#   y, sr = librosa.load(path, sr=16000, res_type='kaiser_fast')
+#   np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n).T, axis=0)
+# (default librosa: n_fft=2048, hop=512, hann, center + zero padding,
+#  128 mel slaney, power_to_db top_db=80, DCT-II ortho)
+# Filterbank mel dan matriks DCT dihitung sekali lalu di-cache.
+
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+TOP_DB = 80.0
+AMIN = 1e-10
+# FFT diproses per blok frame kecil supaya tetap muat di cache CPU
+FRAME_BLOCK = 32
+
+
+def _hz_to_mel(freqs):
+    # Skala mel Slaney (default librosa, htk=False)
+    freqs = np.asarray(freqs, dtype=np.float64)
+    f_sp = 200.0 / 3
+    mels = freqs / f_sp
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = freqs >= min_log_hz
+    mels = np.where(log_t, min_log_mel + np.log(np.maximum(freqs, 1e-12) / min_log_hz) / logstep, mels)
+    return mels
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    f_sp = 200.0 / 3
+    freqs = f_sp * mels
+    min_log_hz = 1000.0
+    min_log_mel = min_log_hz / f_sp
+    logstep = np.log(6.4) / 27.0
+    log_t = mels >= min_log_mel
+    freqs = np.where(log_t, min_log_hz * np.exp(logstep * (mels - min_log_mel)), freqs)
+    return freqs
+
+
+def mel_filterbank(sample_rate, n_fft=N_FFT, n_mels=N_MELS, fmin=0.0, fmax=None):
+    """Filterbank mel (n_mels, 1 + n_fft//2), sama dengan librosa.filters.mel(norm='slaney')."""
+    if fmax is None:
+        fmax = sample_rate / 2.0
+    fftfreqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fftfreqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    enorm = 2.0 / (mel_f[2:n_mels + 2] - mel_f[:n_mels])
+    weights *= enorm[:, None]
+    return weights.astype(np.float32)
+
+
+def dct_matrix(n_mfcc, n_mels=N_MELS):
+    """Matriks DCT-II ortho (n_mels, n_mfcc) sehingga mfcc = log_mel @ D."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)
+    D = np.cos(np.pi / n_mels * (n[:, None] + 0.5) * k[None, :]) * np.sqrt(2.0 / n_mels)
+    D[:, 0] *= np.sqrt(0.5)
+    return D
+
+
+class MfccExtractor:
+    def __init__(self, sample_rate=16000, n_mfcc=40, n_fft=N_FFT, hop_length=HOP_LENGTH,
+                 n_mels=N_MELS, top_db=TOP_DB):
+        self.sample_rate = sample_rate
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.top_db = top_db
+        # Hann periodik (sama dengan scipy.signal.get_window('hann', n_fft))
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+        self.mel_basis_T = np.ascontiguousarray(mel_filterbank(sample_rate, n_fft, n_mels).T)
+        self.dct = dct_matrix(n_mfcc, n_mels)
+
+    def frames(self, y):
+        """Frame STFT (center=True, zero padding) sebagai view tanpa salinan data."""
+        pad = self.n_fft // 2
+        y_pad = np.pad(np.asarray(y, dtype=np.float32), (pad, pad))
+        return np.lib.stride_tricks.sliding_window_view(y_pad, self.n_fft)[::self.hop_length]
+
+    def mel_power(self, frames):
+        """Spektrum mel (n_frames, n_mels) dari frame mentah."""
+        spectrum = np.fft.rfft(frames * self.window, axis=-1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return power.astype(np.float32, copy=False) @ self.mel_basis_T
+
+    def log_mel_mean(self, mel, offsets):
+        """Rata-rata log-mel per klip (setelah clipping top_db per klip)."""
+        log_mel = 10.0 * np.log10(np.maximum(AMIN, mel))
+        counts = np.diff(np.append(offsets, len(log_mel)))
+        floor = np.maximum.reduceat(log_mel.max(axis=1), offsets) - self.top_db
+        np.maximum(log_mel, np.repeat(floor, counts)[:, None], out=log_mel)
+        return np.add.reduceat(log_mel, offsets, axis=0) / counts[:, None]
+
+    def features_batch(self, clips):
+        """
+        Fungsi untuk menghitung vektor mean-MFCC dari banyak klip sekaligus.
+        Input: list array audio mono (sudah di sample_rate)
+        Output: array (n_klip, n_mfcc)
+        """
+        if len(clips) == 0:
+            return np.empty((0, self.n_mfcc))
+        frame_sets = [self.frames(y) for y in clips]
+        counts = [len(f) for f in frame_sets]
+        offsets = np.cumsum([0] + counts[:-1])
+        mel = np.empty((sum(counts), self.n_mels), dtype=np.float32)
+        pos = 0
+        for frames in frame_sets:
+            for start in range(0, len(frames), FRAME_BLOCK):
+                block = frames[start:start + FRAME_BLOCK]
+                mel[pos:pos + len(block)] = self.mel_power(block)
+                pos += len(block)
+        # DCT linear: mean(DCT(log_mel)) == DCT(mean(log_mel)), jadi cukup satu matmul per klip
+        return self.log_mel_mean(mel, offsets) @ self.dct
+
+    def features(self, y):
+        return self.features_batch([y])[0]
+
+
+_extractors = {}
+_extractors_lock = threading.Lock()
+
+
+def get_extractor(sample_rate=16000, n_mfcc=40):
+    """MfccExtractor yang di-cache per (sample_rate, n_mfcc)."""
+    key = (sample_rate, n_mfcc)
+    extractor = _extractors.get(key)
+    if extractor is None:
+        with _extractors_lock:
+            extractor = _extractors.get(key)
+            if extractor is None:
+                extractor = MfccExtractor(sample_rate, n_mfcc)
+                _extractors[key] = extractor
+    return extractor
+
+
+def load_audio(path_or_file, sample_rate=16000):
+    """
+    Fungsi untuk membaca audio (path atau file-like) menjadi mono float32.
+    Resampling dilewati kalau ESP32 sudah mengirim sample_rate yang sama.
+    """
+    import soundfile as sf  # ditunda supaya import modul ini ringan
+    try:
+        data, sr = sf.read(path_or_file, dtype='float32', always_2d=True)
+    except Exception:
+        # Format yang tidak didukung soundfile: kembali ke librosa (lebih lambat)
+        if hasattr(path_or_file, 'seek'):
+            path_or_file.seek(0)
+        import librosa
+        voice, _ = librosa.load(path_or_file, sr=sample_rate, res_type='kaiser_fast')
+        return voice
+
+    voice = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    if sr != sample_rate:
+        import librosa
+        voice = librosa.resample(voice, orig_sr=sr, target_sr=sample_rate, res_type='kaiser_fast')
+    return voice
@@ -0,0 +1,202 @@
+import os
+import pickle
+import threading
+import time
+from config import FACE_PCA_ENABLED
+
+# ====================================================================
+# REGISTRY MODEL BERSAMA (WAJAH & SUARA)
+# ====================================================================
+# Model di-load saat pertama kali dipakai, disimpan per proses, dan
+# di-reload otomatis kalau mtime file .pkl berubah (tanpa restart uvicorn).
+
+FACE_MODEL_PATHS = ('image_model.pkl', 'image_svc_model.pkl')
+FACE_SCALER_PATH = 'image_scaler.pkl'
+# Mode PCA (face_pca.py): SVC di ruang tereduksi + FaceProjection sebagai pengganti scaler
+FACE_PCA_MODEL_PATHS = ('image_pca_model.pkl',)
+FACE_PCA_PROJECTION_PATH = 'image_pca_projection.pkl'
+VOICE_MODEL_PATHS = ('audio_model.pkl',)
+VOICE_SCALER_PATH = 'audio_scaler.pkl'
+
+# Jeda minimal antar pengecekan mtime supaya tidak os.stat di setiap request
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+class ModelBundle:
+    """Pasangan SVC + scaler dari satu versi file yang sama."""
+
+    def __init__(self, name, svc, scaler, version, paths):
+        self.name = name
+        self.svc = svc
+        self.scaler = scaler
+        self.version = version
+        self.paths = paths
+        self.loaded_at = time.time()
+        self._compiled = None
+        self._compiled_ready = False
+        self._compile_lock = threading.Lock()
+
+    @property
+    def n_features(self):
+        return getattr(self.scaler, 'n_features_in_', None)
+
+    @property
+    def projection(self):
+        """FaceProjection jika model ini model PCA (fitur mentah harus diproyeksikan dulu), selain itu None."""
+        return self.scaler if getattr(self.scaler, 'is_projection', False) else None
+
+    @property
+    def compiled_path(self):
+        return os.path.splitext(self.paths[0])[0] + '.svc'
+
+    @property
+    def compiled(self):
+        """
+        CompiledSVC (svc_engine) untuk versi ini. Folder <model>.svc dipakai (mmap)
+        kalau dibuat dari versi .pkl yang sama; kalau tidak (belum ada atau basi setelah
+        rollout), model dikompilasi lalu folder .svc ditulis ulang supaya proses lain
+        kembali berbagi mmap. None jika model tidak bisa dikompilasi.
+        """
+        if not self._compiled_ready:
+            with self._compile_lock:
+                if not self._compiled_ready:
+                    self._compiled = self._load_compiled()
+                    self._compiled_ready = True
+        return self._compiled
+
+    def _load_compiled(self):
+        from svc_engine import CompiledSVC, compile_svc
+
+        source_version = [list(v) for v in self.version]
+        if os.path.isdir(self.compiled_path):
+            try:
+                compiled = CompiledSVC.load(self.compiled_path)
+                if compiled.meta.get('source_version') == source_version:
+                    return compiled
+            except Exception as e:
+                print(f"Gagal membuka {self.compiled_path}: {e}")
+        try:
+            # Model PCA: proyeksi dijalankan terpisah, SVC dikompilasi di ruang tereduksi
+            scaler = None if self.projection is not None else self.scaler
+            compiled = compile_svc(self.svc, scaler, source_version=source_version)
+        except Exception as e:
+            print(f"Model {self.name} tidak bisa dikompilasi, pakai sklearn: {e}")
+            return None
+        try:
+            compiled.save(self.compiled_path)
+            print(f"CompiledSVC {self.name} disimpan di {self.compiled_path}")
+            shared = CompiledSVC.load(self.compiled_path)
+            if shared.meta.get('source_version') == source_version:
+                return shared
+        except Exception as e:
+            print(f"Gagal menyimpan {self.compiled_path}, pakai salinan di memori: {e}")
+        return compiled
+
+
+class ModelRegistry:
+    def __init__(self, check_interval=RELOAD_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._specs = {}
+        self._bundles = {}
+        self._last_check = {}
+        self._file_versions = {}  # name -> (waktu cek, versi file)
+        self._lock = threading.Lock()
+
+    def register(self, name, model_paths, scaler_path):
+        """Daftarkan model. model_paths boleh berisi beberapa kandidat nama file."""
+        with self._lock:
+            self._specs[name] = (tuple(model_paths), scaler_path)
+            self._bundles.pop(name, None)
+            self._last_check.pop(name, None)
+            self._file_versions.pop(name, None)
+
+    def _resolve(self, name):
+        model_paths, scaler_path = self._specs[name]
+        model_path = next((p for p in model_paths if os.path.exists(p)), None)
+        if model_path is None or not os.path.exists(scaler_path):
+            raise FileNotFoundError(
+                f"Model files not found. Please ensure '{model_paths[0]}' and '{scaler_path}' are in the same directory."
+            )
+        return model_path, scaler_path
+
+    @staticmethod
+    def _file_version(paths):
+        stats = [os.stat(p) for p in paths]
+        return tuple((st.st_mtime_ns, st.st_size) for st in stats)
+
+    def _load(self, name, paths, version):
+        with open(paths[0], 'rb') as f:
+            svc = pickle.load(f)
+        with open(paths[1], 'rb') as f:
+            scaler = pickle.load(f)
+        return ModelBundle(name, svc, scaler, version, paths)
+
+    def get(self, name):
+        """Ambil bundle model terbaru. Reload jika file .pkl berubah."""
+        bundle = self._bundles.get(name)
+        now = time.monotonic()
+        if bundle is not None and now - self._last_check.get(name, 0.0) < self.check_interval:
+            return bundle
+
+        with self._lock:
+            bundle = self._bundles.get(name)
+            self._last_check[name] = now
+            try:
+                paths = self._resolve(name)
+                version = self._file_version(paths)
+            except FileNotFoundError:
+                if bundle is not None:
+                    return bundle
+                raise
+
+            if bundle is not None and bundle.version == version and bundle.paths == paths:
+                return bundle
+
+            try:
+                new_bundle = self._load(name, paths, version)
+            except Exception as e:
+                # File mungkin sedang ditulis saat rollout: pakai versi lama dulu
+                if bundle is not None:
+                    print(f"Gagal reload model {name}, tetap pakai versi lama: {e}")
+                    return bundle
+                raise
+
+            # Swap atomik: pemanggil lama tetap memegang pasangan svc/scaler yang konsisten
+            self._bundles[name] = new_bundle
+            return new_bundle
+
+    def is_loaded(self, name):
+        return name in self._bundles
+
+    def version(self, name):
+        return self.get(name).version
+
+    def file_version(self, name):
+        """
+        Versi (mtime_ns, size) file model di disk, sama dengan ModelBundle.version, tanpa
+        meng-unpickle model. Dicek paling sering sekali per check_interval.
+        """
+        now = time.monotonic()
+        cached = self._file_versions.get(name)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[1]
+        version = self._file_version(self._resolve(name))
+        self._file_versions[name] = (now, version)
+        return version
+
+
+registry = ModelRegistry()
+registry.register('face', FACE_PCA_MODEL_PATHS if FACE_PCA_ENABLED else FACE_MODEL_PATHS,
+                  FACE_PCA_PROJECTION_PATH if FACE_PCA_ENABLED else FACE_SCALER_PATH)
+# Nama eksplisit untuk perbandingan (face_pca.py compare), apa pun mode yang aktif
+registry.register('face_full', FACE_MODEL_PATHS, FACE_SCALER_PATH)
+registry.register('face_pca', FACE_PCA_MODEL_PATHS, FACE_PCA_PROJECTION_PATH)
+registry.register('voice', VOICE_MODEL_PATHS, VOICE_SCALER_PATH)
+
+
+def get_face_model():
+    return registry.get('face')
+
+
+def get_voice_model():
+    return registry.get('voice')
@@ -0,0 +1,118 @@
+"""
+Worker inferensi MQTT untuk banyak brankas.
+
+Subscribe URL foto/audio dari semua brankas lewat shared subscription
+($share/<WORKER_GROUP>/...), jadi broker membagi job ke semua instance
+worker yang berjalan (di mesin mana pun). Di tiap instance, job masuk ke
+antrean lokal terbatas dan dikerjakan oleh proses pre-fork dari
+inference_pool; hasilnya dipublish ke topik hasil brankas yang
+bersangkutan. Thread jaringan paho tidak pernah menunggu: jika antrean
+penuh, job dibuang (dihitung di metrik) supaya keepalive tetap jalan.
+
+Contoh:
+    BRANKAS_VAULT_TOPICS=1 python mqtt_worker.py --processes 4
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+import paho.mqtt.client as mqtt
+from inference_pool import create_inference_executor, fetch_and_infer
+import metrics
+from metrics import ERRORS
+from ingest import normalize_message
+from decision import media_reading, result_payload
+from topics import MEDIA_KINDS, RESULT_KINDS, parse_topic, shared_subscriptions, topic
+from config import INFERENCE_PROCESSES, WORKER_GROUP, MQTT_BROKER as MQTT_BROKER_OVERRIDE, MQTT_PORT
+
+MQTT_BROKER = MQTT_BROKER_OVERRIDE or "test.mosquitto.org"
+
+
+class MediaWorker:
+    def __init__(self, broker, port, processes, group=WORKER_GROUP, max_pending=None):
+        self.broker = broker
+        self.port = port
+        self.group = group
+        self.executor = create_inference_executor(processes=max(1, processes))
+        # Job yang menunggu di antrean lokal (diisi thread paho, tanpa blocking) dan
+        # job yang sedang dikerjakan pool (dibatasi dispatcher)
+        self._jobs = queue.Queue(maxsize=max_pending or max(1, processes) * 4)
+        self._slots = threading.BoundedSemaphore(max(1, processes) * 2)
+        self.client = None
+        self.done = 0
+        self.failed = 0
+        self.shed = 0
+        metrics.register_collector("worker", self.stats)
+
+    def start(self):
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"BrankasWorker-{os.getpid()}-{int(time.time())}",
+                             protocol=mqtt.MQTTv5)
+        client.on_connect = self._on_connect
+        client.on_message = self._on_message
+        client.connect(self.broker, self.port, 60)
+        self.client = client
+        threading.Thread(target=self._dispatch, name="worker-dispatch", daemon=True).start()
+        return self
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            client.subscribe([(f, 1) for f in shared_subscriptions(MEDIA_KINDS, self.group)])
+            print(f"✅ Worker terhubung, grup {self.group}")
+
+    def _on_message(self, client, userdata, msg):
+        vault_id, kind = parse_topic(msg.topic)
+        media_type = MEDIA_KINDS.get(kind)
+        if media_type is None:
+            return
+        # URL teks biasa atau JSON {"url", "session"}; sesi diteruskan ke pesan hasil
+        url, session = media_reading(normalize_message(msg.topic, msg.payload.decode("utf-8", errors="replace").strip()))
+        if not url.startswith("http"):
+            return
+        try:
+            self._jobs.put_nowait((url, vault_id, media_type, session))
+        except queue.Full:
+            # Jangan blok thread jaringan paho (PINGRESP/keepalive); job dibuang dan dihitung
+            self.shed += 1
+            ERRORS.inc(category="shed", media_type=media_type)
+            print(f"Antrean penuh, job {media_type} brankas {vault_id} dibuang")
+
+    def _dispatch(self):
+        while True:
+            url, vault_id, media_type, session = self._jobs.get()
+            self._slots.acquire()
+            future = self.executor.submit(fetch_and_infer, url, media_type, urlparse(url).netloc)
+            future.add_done_callback(lambda f, v=vault_id, m=media_type, s=session: self._publish(f, v, m, s))
+
+    def _publish(self, future, vault_id, media_type, session):
+        self._slots.release()
+        try:
+            result, confidence = future.result()
+            self.done += 1
+        except Exception as e:
+            print(f"Job {media_type} brankas {vault_id} gagal: {e}")
+            result, confidence = "Error", 0.0
+            self.failed += 1
+        self.client.publish(topic(RESULT_KINDS[media_type], vault_id), result_payload(result, confidence, session))
+
+    def stats(self):
+        return {"queued": self._jobs.qsize(), "queue_capacity": self._jobs.maxsize,
+                "done": self.done, "failed": self.failed, "shed": self.shed}
+
+    def run_forever(self):
+        self.client.loop_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker inferensi MQTT (shared subscription)")
+    parser.add_argument("--broker", default=MQTT_BROKER)
+    parser.add_argument("--port", type=int, default=MQTT_PORT)
+    parser.add_argument("--processes", type=int, default=INFERENCE_PROCESSES or (os.cpu_count() or 1))
+    parser.add_argument("--group", default=WORKER_GROUP)
+    args = parser.parse_args()
+    MediaWorker(args.broker, args.port, args.processes, args.group).start().run_forever()
+
+
+if __name__ == "__main__":
+    main()
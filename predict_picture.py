@@ -1,41 +1,71 @@
-import pickle
-import cv2
-import gdown
 import numpy as np
-from PIL import Image
+from model_registry import get_face_model
+from batching import get_batcher
+from image_pipeline import IMG_SIZE, get_preprocessor
+from config import FACE_DETECT_ENABLED
+from metrics import stage_timer
 
-IMG_SIZE = 96
 class_names = ['ANGGI_FACES', 'DEVI_FACES', 'FARIDA_FACES', 'ILHAM_FACES', 'OTHER_FACES']
 file_id = "1OsMc-fey6Z2vwuZ815QwI7JVtinynOIJ"
 Path_gdrive = f"gdown {file_id}"
-# Load model dan scaler
-try:
-    with open('image_svc_model.pkl', 'rb') as file:
-        svc_model = pickle.load(Path)
-    with open('image_scaler.pkl', 'rb') as file:
-        scaler = pickle.load(file)
-except FileNotFoundError:
-    raise FileNotFoundError("Model files not found. Please ensure 'image_svc_model.pkl' and 'image_scaler.pkl' are in the same directory.")
-
-def preprocess_image(image, img_size=IMG_SIZE, scaler=scaler):
-    img_np = np.array(image.convert('RGB'))
-    img_resized = cv2.resize(img_np, (img_size, img_size))
-    img_normalized = img_resized / 255.0
-    img_flattened = img_normalized.reshape(1, -1)
-    img_scaled = scaler.transform(img_flattened)
+# Model dan scaler di-load lewat model_registry saat pertama kali dipakai
+
+def image_to_features(image, img_size=IMG_SIZE):
+    # Fitur mentah [0, 1] float32 (1, img_size*img_size*3); scaler diterapkan di MicroBatcher
+    return get_preprocessor(img_size).transform_one(image)
+
+def images_to_features(images, img_size=IMG_SIZE):
+    return get_preprocessor(img_size).transform(images)
+
+def preprocess_image(image, img_size=IMG_SIZE, scaler=None):
+    if scaler is None:
+        scaler = get_face_model().scaler
+    if getattr(scaler, 'is_projection', False):
+        # Model PCA: scaler + proyeksi sudah dilipat di FaceProjection (fitur mentah -> ruang tereduksi)
+        return scaler.transform(image_to_features(image, img_size))
+    # /255 dan StandardScaler digabung jadi satu multiply-add in-place
+    img_scaled = get_preprocessor(img_size, scaler).transform_one(image)
     return img_scaled
 
-def predict_image(image):
+def preprocess_images(images, img_size=IMG_SIZE, scaler=None):
+    if scaler is None:
+        scaler = get_face_model().scaler
+    if getattr(scaler, 'is_projection', False):
+        return scaler.transform(images_to_features(images, img_size))
+    return get_preprocessor(img_size, scaler).transform(images)
+
+# Label untuk frame tanpa wajah (inferensi dilewati)
+NO_FACE_CLASS = 'OTHER_FACES'
+
+def predict_image(image, camera_id=None):
     """
     Fungsi untuk memprediksi gambar.
-    Input: PIL Image
+    Input: PIL Image, camera_id opsional (mis. host ESP32) untuk cache area wajah
     Output: predicted_class_name (str), confidence (float)
     """
-    processed_image_data = preprocess_image(image)
-    prediction_index = svc_model.predict(processed_image_data)[0]
-    prediction_proba = svc_model.predict_proba(processed_image_data)[0]
+    if FACE_DETECT_ENABLED:
+        # Hanya area wajah yang diklasifikasi; frame tanpa wajah tidak masuk SVC
+        from face_detect import face_region  # OpenCV hanya di-load jika deteksi wajah aktif
+        with stage_timer("face_detect", media_type="picture"):
+            image = face_region(image, camera_id)
+        if image is None:
+            return NO_FACE_CLASS, 1.0
+    with stage_timer("preprocess", media_type="picture"):
+        features = image_to_features(image)
+    # Scaling + predict_proba dijalankan per batch oleh MicroBatcher
+    with stage_timer("predict", media_type="picture"):
+        prediction_index, prediction_proba = get_batcher('face').predict(features)
 
     predicted_class_name = class_names[prediction_index]
     confidence = np.max(prediction_proba)
 
-    return predicted_class_name, confidence
\ No newline at end of file
+    return predicted_class_name, confidence
+
+def predict_images(images):
+    """
+    Fungsi untuk memprediksi beberapa gambar sekaligus (mis. burst capture kamera).
+    Input: list PIL Image / path / file-like
+    Output: list (predicted_class_name, confidence)
+    """
+    results = get_batcher('face').predict_many(images_to_features(images))
+    return [(class_names[idx], np.max(proba)) for idx, proba in results]
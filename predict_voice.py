@@ -1,37 +1,80 @@
-import pickle
-import librosa
 import numpy as np
+from mfcc import get_extractor, load_audio
+from model_registry import get_voice_model
+from batching import get_batcher
+from voice_stream import stream_features
+from vad import trim_silence
+from metrics import stage_timer
 
 SAMPLE_RATE = 16000
 N_MFCC = 40
 class_names = ['MY_YES','ANOTHER_YES','NOT_YS','NOISE']
 
-try:
-    with open('audio_model.pkl', 'rb') as file:
-        svc_model = pickle.load(file)
-    with open('audio_scaler.pkl', 'rb') as file:
-        scaler = pickle.load(file)
-except FileNotFoundError:
-    raise FileNotFoundError("Model files not found. Please ensure 'audio_model.pkl' and 'audio_scaler.pkl' are in the same directory.")
+# Model dan scaler di-load lewat model_registry saat pertama kali dipakai
+
+# Label untuk klip yang menurut VAD tidak berisi ucapan (inferensi dilewati)
+NO_SPEECH_CLASS = 'NOISE'
 
 def extract_features(path, sample_rate=SAMPLE_RATE, n_mfcc=N_MFCC):
-    voice, sr = librosa.load(path, sr=sample_rate, res_type='kaiser_fast')
-    mfccs = librosa.feature.mfcc(y=voice, sr=sr, n_mfcc=n_mfcc)
-    mfccs_processed = np.mean(mfccs.T, axis=0)
+    # Setara dengan librosa.load + mean(librosa.feature.mfcc), tapi dengan NumPy.
+    # Hening di awal/akhir dibuang dulu oleh VAD (klip tanpa ucapan dipakai utuh).
+    voice = load_audio(path, sample_rate)
+    trimmed, _ = trim_silence(voice, sample_rate)
+    mfccs_processed = get_extractor(sample_rate, n_mfcc).features(voice if trimmed is None else trimmed)
     return mfccs_processed
 
+def extract_features_batch(paths, sample_rate=SAMPLE_RATE, n_mfcc=N_MFCC):
+    voices = []
+    for path in paths:
+        voice = load_audio(path, sample_rate)
+        trimmed, _ = trim_silence(voice, sample_rate)
+        voices.append(voice if trimmed is None else trimmed)
+    return get_extractor(sample_rate, n_mfcc).features_batch(voices)
+
 def predict_audio(path):
     """
-    Fungsi untuk memprediksi suara dari file path.
-    Input: path (str)
+    Fungsi untuk memprediksi suara dari file path atau buffer memori.
+    Input: path (str) atau file-like (BytesIO)
     Output: predicted_class_name (str), confidence (float)
     """
-    features = extract_features(path)
-    features_scaled = scaler.transform([features])
-    pred_idx = svc_model.predict(features_scaled)[0]
-    proba = svc_model.predict_proba(features_scaled)[0]
+    with stage_timer("decode", media_type="voice"):
+        voice = load_audio(path, SAMPLE_RATE)
+    with stage_timer("vad", media_type="voice"):
+        voice, _ = trim_silence(voice, SAMPLE_RATE)
+    if voice is None:
+        return NO_SPEECH_CLASS, 1.0
+    # Jumlah MFCC mengikuti scaler yang ter-load (model bawaan memakai 13 koefisien)
+    with stage_timer("mfcc", media_type="voice"):
+        features = get_extractor(SAMPLE_RATE, get_voice_model().n_features or N_MFCC).features(voice)
+    # Scaling + predict_proba dijalankan per batch oleh MicroBatcher
+    with stage_timer("predict", media_type="voice"):
+        pred_idx, proba = get_batcher('voice').predict(features)
 
     predicted_class_name = class_names[pred_idx]
     confidence = np.max(proba)
 
-    return predicted_class_name, confidence
\ No newline at end of file
+    return predicted_class_name, confidence
+
+# Kelas yang boleh diputuskan lebih awal saat streaming
+EARLY_CLASSES = ('MY_YES', 'NOISE')
+
+def predict_audio_stream(chunks, early=True):
+    """
+    Fungsi untuk memprediksi suara dari iterator chunk byte WAV (mis. body HTTP yang masih diunduh).
+    Output: predicted_class_name (str), confidence (float), early (bool: diputuskan sebelum file habis)
+    """
+    batcher = get_batcher('voice')
+
+    def classify(features):
+        pred_idx, proba = batcher.predict(features)
+        return class_names[pred_idx], np.max(proba)
+
+    n_mfcc = get_voice_model().n_features or N_MFCC
+    features, early_result = stream_features(chunks, SAMPLE_RATE, n_mfcc, classify=classify,
+                                             early_labels=EARLY_CLASSES if early else ())
+    if early_result is not None:
+        return early_result[0], early_result[1], True
+    if features is None:
+        return NO_SPEECH_CLASS, 1.0, False
+    predicted_class_name, confidence = classify(features)
+    return predicted_class_name, confidence, False
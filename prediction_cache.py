@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from model_registry import registry
+from media_io import fetch_media_conditional
+from config import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, URL_CACHE_SIZE
+
+# ====================================================================
+# CACHE PREDIKSI BERBASIS ISI MEDIA
+# ====================================================================
+# ESP32 sering mengirim ulang URL foto/audio yang sama. Hasil prediksi
+# disimpan dengan key (model, versi model, sha256 isi file), jadi file
+# yang identik tidak diinferensi ulang. Untuk URL yang pernah dilihat,
+# request berikutnya memakai ETag/Last-Modified; jawaban 304 berarti
+# body tidak diunduh sama sekali. Reload model (versi .pkl berubah)
+# otomatis mengosongkan entri model tersebut.
+
+# media_type di endpoint/MQTT -> nama model di model_registry
+MODEL_FOR_MEDIA = {"picture": "face", "voice": "voice"}
+
+
+class CacheLookup:
+    """Hasil cache.fetch(): key untuk store(), buffer (None jika tidak diunduh), result jika hit."""
+
+    def __init__(self, key, buffer, result):
+        self.key = key
+        self.buffer = buffer
+        self.result = result
+
+    @property
+    def hit(self):
+        return self.result is not None
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, url_entries=URL_CACHE_SIZE):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.url_entries = max(1, int(url_entries))
+        self._results = OrderedDict()  # key -> (expires_at, result)
+        self._urls = OrderedDict()  # url -> (etag, last_modified, digest)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.not_modified = 0
+
+    # ----------------------------------------------------------------
+    def _check_version(self, model_name):
+        try:
+            # Hanya stat file: model tidak di-load di proses web (inferensi ada di worker pre-fork)
+            version = registry.file_version(model_name)
+        except FileNotFoundError:
+            # Model belum ada: inferensi akan gagal dan hasilnya tidak perlu di-cache
+            version = None
+        if self._versions.get(model_name) != version:
+            with self._lock:
+                if self._versions.get(model_name) not in (None, version):
+                    stale = [key for key in self._results if key[0] == model_name]
+                    for key in stale:
+                        del self._results[key]
+                    self.invalidations += len(stale)
+                self._versions[model_name] = version
+        return version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._results[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def store(self, key, result):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def _remember_url(self, url, etag, last_modified, digest):
+        if not etag and not last_modified:
+            # Tanpa validator URL yang sama bisa berisi capture baru: jangan disimpan
+            return
+        with self._lock:
+            self._urls[url] = (etag, last_modified, digest)
+            self._urls.move_to_end(url)
+            while len(self._urls) > self.url_entries:
+                self._urls.popitem(last=False)
+
+    # ----------------------------------------------------------------
+    def key_for_bytes(self, model_name, data):
+        version = self._check_version(model_name)
+        return (model_name, version, hashlib.sha256(data).hexdigest())
+
+    def fetch(self, url, model_name):
+        """
+        Unduh media (kondisional jika URL sudah dikenal) dan cek cache.
+        Output: CacheLookup; jika .hit, .result bisa langsung dipakai tanpa inferensi.
+        """
+        version = self._check_version(model_name)
+        with self._lock:
+            validators = self._urls.get(url)
+        if validators is not None:
+            etag, last_modified, digest = validators
+            buffer, etag, last_modified = fetch_media_conditional(url, etag, last_modified)
+            if buffer is None:
+                key = (model_name, version, digest)
+                result = self.get(key)
+                if result is not None:
+                    self.not_modified += 1
+                    return CacheLookup(key, None, result)
+                # Hasil sudah dibuang dari cache: unduh ulang tanpa validator
+                buffer, etag, last_modified = fetch_media_conditional(url)
+        else:
+            buffer, etag, last_modified = fetch_media_conditional(url)
+
+        digest = hashlib.sha256(buffer.getbuffer()).hexdigest()
+        self._remember_url(url, etag, last_modified, digest)
+        key = (model_name, version, digest)
+        return CacheLookup(key, buffer, self.get(key))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._results),
+                "urls": len(self._urls),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "not_modified": self.not_modified,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._urls.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Satu PredictionCache per proses."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
@@ -0,0 +1,309 @@
+"""
+Mesin inferensi SVC ringkas (tanpa overhead scikit-learn per request).
+
+SVC + StandardScaler yang sudah di-fit dikompilasi menjadi beberapa array:
+scaler dilipat ke input kernel, support vector disimpan float32 contiguous,
+lalu kernel, voting one-vs-one dan probabilitas Platt dihitung sekali jalan.
+Hasil kompilasi bisa disimpan ke folder .npy yang dibuka dengan mmap, jadi
+banyak worker berbagi satu salinan support vector.
+
+Contoh:
+    python svc_engine.py compile audio_model.pkl audio_scaler.pkl audio_model.svc
+    python svc_engine.py verify audio_model.pkl audio_scaler.pkl
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+ARRAY_NAMES = ("sv_T", "sv_norm", "x_weight", "x_bias", "dual_coef", "rho", "prob_a", "prob_b", "classes")
+MIN_PROB = 1e-7
+
+
+class CompiledSVC:
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kernel = meta["kernel"]
+        self.gamma = meta["gamma"]
+        self.coef0 = meta["coef0"]
+        self.degree = meta["degree"]
+        self.n_features = meta["n_features"]
+        self.n_support = np.asarray(meta["n_support"])
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.n_classes = len(self.classes)
+        self._starts = np.concatenate([[0], np.cumsum(self.n_support)])
+
+    # ----------------------------------------------------------------
+    # KERNEL (scaler sudah terlipat di sv_T / x_weight / x_bias)
+    # ----------------------------------------------------------------
+    def kernel_matrix(self, X):
+        """Nilai kernel (n_sampel, n_sv) langsung dari fitur mentah (belum di-scale)."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but model is expecting {self.n_features} features as input.")
+        if self.kernel == "rbf":
+            # ||z - sv||^2 = sum(w x^2) - 2 x.(w c) + sum(w c^2),  w = 1/scale^2, c = mean + scale*sv
+            x64 = X.astype(np.float64)
+            x_norm = (x64 * x64) @ self.x_weight
+            dist = (X @ self.sv_T).astype(np.float64)
+            dist *= -2.0
+            dist += x_norm[:, None]
+            dist += self.sv_norm[None, :]
+            np.maximum(dist, 0.0, out=dist)
+            dist *= -self.gamma
+            return np.exp(dist, out=dist)
+
+        # Kernel berbasis dot product: z.sv = x.(sv/scale) - (mean/scale).sv
+        dot = (X @ self.sv_T).astype(np.float64) + self.x_bias[None, :]
+        if self.kernel == "linear":
+            return dot
+        if self.kernel == "poly":
+            return (self.gamma * dot + self.coef0) ** self.degree
+        if self.kernel == "sigmoid":
+            return np.tanh(self.gamma * dot + self.coef0)
+        raise ValueError(f"Kernel tidak didukung: {self.kernel}")
+
+    def decision_ovo(self, X, K=None):
+        """Nilai keputusan one-vs-one libsvm (n_sampel, n_pasangan)."""
+        if K is None:
+            K = self.kernel_matrix(X)
+        k = self.n_classes
+        s = self._starts
+        dec = np.empty((K.shape[0], k * (k - 1) // 2))
+        p = 0
+        for i in range(k):
+            for j in range(i + 1, k):
+                dec[:, p] = (K[:, s[i]:s[i + 1]] @ self.dual_coef[j - 1, s[i]:s[i + 1]]
+                             + K[:, s[j]:s[j + 1]] @ self.dual_coef[i, s[j]:s[j + 1]]
+                             - self.rho[p])
+                p += 1
+        return dec
+
+    def _votes(self, dec):
+        k = self.n_classes
+        votes = np.zeros((dec.shape[0], k), dtype=np.int64)
+        p = 0
+        for i in range(k):
+            for j in range(i + 1, k):
+                positive = dec[:, p] > 0
+                votes[:, i] += positive
+                votes[:, j] += ~positive
+                p += 1
+        return votes
+
+    def predict(self, X):
+        """Label hasil voting one-vs-one (sama dengan SVC.predict)."""
+        votes = self._votes(self.decision_ovo(X))
+        return self.classes[np.argmax(votes, axis=1)]
+
+    def predict_proba(self, X, dec=None):
+        """Probabilitas Platt + coupling pairwise (sama dengan SVC.predict_proba)."""
+        if self.prob_a.size == 0:
+            raise ValueError("Model tidak dilatih dengan probability=True")
+        if dec is None:
+            dec = self.decision_ovo(X)
+        k = self.n_classes
+        f = dec * self.prob_a + self.prob_b
+        pair = np.where(f >= 0, np.exp(-np.abs(f)) / (1.0 + np.exp(-np.abs(f))), 1.0 / (1.0 + np.exp(-np.abs(f))))
+        pair = np.clip(pair, MIN_PROB, 1 - MIN_PROB)
+
+        n = dec.shape[0]
+        r = np.zeros((n, k, k))
+        p = 0
+        for i in range(k):
+            for j in range(i + 1, k):
+                r[:, i, j] = pair[:, p]
+                r[:, j, i] = 1.0 - pair[:, p]
+                p += 1
+        # libsvm versi sklearn selalu memakai coupling iteratif, termasuk untuk 2 kelas
+        return _multiclass_probability(r)
+
+    def predict_with_proba(self, X):
+        """(label argmax proba, proba) dalam satu evaluasi kernel."""
+        proba = self.predict_proba(X)
+        return self.classes[np.argmax(proba, axis=1)], proba
+
+    # ----------------------------------------------------------------
+    # SERIALISASI (folder .npy, dibuka dengan mmap)
+    # ----------------------------------------------------------------
+    def save(self, path):
+        """
+        Tulis ke folder sementara di sebelah `path`, lalu rename. Pembaca tidak pernah
+        melihat folder setengah jadi; proses yang sudah mmap versi lama tetap aman
+        (file lama baru benar-benar hilang setelah tidak dipakai).
+        """
+        path = os.path.abspath(path)
+        parent, base = os.path.split(path)
+        tmp = tempfile.mkdtemp(prefix=f".{base}.tmp-", suffix=".svc", dir=parent)
+        try:
+            for name in ARRAY_NAMES:
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+            with open(os.path.join(tmp, META_FILE), "w") as f:
+                json.dump(self.meta, f, indent=2)
+            old = None
+            if os.path.isdir(path):
+                old = os.path.join(parent, f".{base}.old-{os.getpid()}-{id(tmp)}.svc")
+                try:
+                    os.rename(path, old)
+                except FileNotFoundError:
+                    old = None  # sudah diganti proses lain
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                # Proses lain baru saja menulis folder yang sama: pakai punya mereka
+                shutil.rmtree(tmp, ignore_errors=True)
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Versi format {path} tidak dikenal")
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAY_NAMES}
+        return cls(meta, arrays)
+
+
+def _multiclass_probability(r, max_iter=None):
+    """Metode 2 Wu, Lin & Weng (sama dengan multiclass_probability di libsvm), per sampel."""
+    n, k, _ = r.shape
+    if max_iter is None:
+        max_iter = max(100, k)
+    eps = 0.005 / k
+    Q = -r.transpose(0, 2, 1) * r
+    diag = np.einsum("nij,nij->nj", r, r) - np.einsum("njj->nj", r * r)
+    idx = np.arange(k)
+    Q[:, idx, idx] = diag
+    P = np.full((n, k), 1.0 / k)
+    active = np.ones(n, dtype=bool)
+    for _ in range(max_iter):
+        Qp = np.einsum("nij,nj->ni", Q, P)
+        pQp = np.einsum("ni,ni->n", P, Qp)
+        max_error = np.max(np.abs(Qp - pQp[:, None]), axis=1)
+        active &= max_error >= eps
+        if not active.any():
+            break
+        a = np.flatnonzero(active)
+        Pa, Qpa, pQpa, Qa = P[a], Qp[a], pQp[a], Q[a]
+        for t in range(k):
+            diff = (-Qpa[:, t] + pQpa) / Qa[:, t, t]
+            Pa[:, t] += diff
+            pQpa = (pQpa + diff * (diff * Qa[:, t, t] + 2 * Qpa[:, t])) / (1 + diff) / (1 + diff)
+            Qpa = (Qpa + diff[:, None] * Qa[:, t, :]) / (1 + diff[:, None])
+            Pa /= (1 + diff[:, None])
+        P[a] = Pa
+    return P
+
+
+def compile_svc(svc, scaler=None, source_version=None):
+    """
+    Fungsi untuk mengompilasi SVC sklearn (+ StandardScaler opsional) menjadi CompiledSVC.
+    """
+    sv = np.asarray(svc.support_vectors_, dtype=np.float64)
+    n_features = sv.shape[1]
+    mean = np.zeros(n_features)
+    scale = np.ones(n_features)
+    if scaler is not None:
+        if getattr(scaler, "with_mean", True) and getattr(scaler, "mean_", None) is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+        if getattr(scaler, "with_std", True) and getattr(scaler, "scale_", None) is not None:
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    kernel = svc.kernel
+    if kernel not in ("rbf", "linear", "poly", "sigmoid"):
+        raise ValueError(f"Kernel tidak didukung: {kernel}")
+
+    if kernel == "rbf":
+        weight = 1.0 / (scale * scale)
+        centers = mean + scale * sv
+        sv_T = (centers * weight).T
+        sv_norm = (centers * centers) @ weight
+        x_bias = np.zeros(len(sv))
+    else:
+        weight = np.zeros(n_features)
+        sv_T = (sv / scale).T
+        sv_norm = np.zeros(len(sv))
+        x_bias = -(mean / scale) @ sv.T
+
+    # sklearn membalik tanda dual_coef_/intercept_ untuk kasus biner; _dual_coef_/_intercept_ tetap asli libsvm
+    dual_coef = np.asarray(getattr(svc, "_dual_coef_", svc.dual_coef_), dtype=np.float64)
+    intercept = np.asarray(getattr(svc, "_intercept_", svc.intercept_), dtype=np.float64)
+
+    arrays = {
+        "sv_T": np.ascontiguousarray(sv_T, dtype=np.float32),
+        "sv_norm": sv_norm.astype(np.float64),
+        "x_weight": weight.astype(np.float64),
+        "x_bias": x_bias.astype(np.float64),
+        "dual_coef": np.ascontiguousarray(dual_coef),
+        "rho": -intercept,
+        "prob_a": np.asarray(getattr(svc, "probA_", np.empty(0)), dtype=np.float64),
+        "prob_b": np.asarray(getattr(svc, "probB_", np.empty(0)), dtype=np.float64),
+        "classes": np.asarray(svc.classes_),
+    }
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "kernel": kernel,
+        "gamma": float(getattr(svc, "_gamma", 0.0)),
+        "coef0": float(svc.coef0),
+        "degree": int(svc.degree),
+        "n_features": int(n_features),
+        "n_support": [int(v) for v in svc.n_support_],
+        "source_version": source_version,
+    }
+    return CompiledSVC(meta, arrays)
+
+
+def verify(svc, scaler, compiled, X):
+    """Bandingkan CompiledSVC dengan sklearn. Output: dict selisih maksimum."""
+    X_scaled = scaler.transform(X) if scaler is not None else X
+    proba_ref = svc.predict_proba(X_scaled)
+    proba = compiled.predict_proba(X)
+    return {
+        "n_samples": int(len(X)),
+        "max_abs_proba_diff": float(np.max(np.abs(proba - proba_ref))),
+        "predict_agreement": float(np.mean(compiled.predict(X) == svc.predict(X_scaled))),
+        "argmax_agreement": float(np.mean(np.argmax(proba, 1) == np.argmax(proba_ref, 1))),
+    }
+
+
+def _load_pickles(model_path, scaler_path):
+    import pickle
+
+    with open(model_path, "rb") as f:
+        svc = pickle.load(f)
+    with open(scaler_path, "rb") as f:
+        scaler = pickle.load(f)
+    return svc, scaler
+
+
+def main(argv):
+    if len(argv) < 3 or argv[0] not in ("compile", "verify"):
+        print(__doc__)
+        return 1
+    svc, scaler = _load_pickles(argv[1], argv[2])
+    compiled = compile_svc(svc, scaler)
+    if argv[0] == "compile":
+        out = argv[3] if len(argv) > 3 else os.path.splitext(argv[1])[0] + ".svc"
+        compiled.save(out)
+        print(f"Tersimpan di {out}")
+        compiled = CompiledSVC.load(out)
+
+    # Sampel uji di sekitar distribusi data training (mean +- 2 std)
+    rng = np.random.default_rng(0)
+    X = scaler.mean_ + scaler.scale_ * rng.normal(scale=2.0, size=(500, compiled.n_features))
+    print(json.dumps(verify(svc, scaler, compiled, X), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,189 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+from config import TELEMETRY_DB_PATH, DEFAULT_VAULT_ID
+
+# ====================================================================
+# LOG TELEMETRI PERSISTEN (SQLITE WAL)
+# ====================================================================
+# Append-only untuk data TOPIC_BRANKAS dan hasil ML wajah/suara.
+# Setiap tabel diindeks (vault_id, ts), jadi query jendela waktu per
+# brankas (mis. 50 baris terakhir untuk grafik) tidak perlu memuat semuanya.
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sensor_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vault_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    status TEXT,
+    jarak REAL,
+    pir REAL,
+    face TEXT,
+    voice TEXT,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sensor_vault_ts ON sensor_readings (vault_id, ts);
+
+CREATE TABLE IF NOT EXISTS ml_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vault_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ts REAL NOT NULL,
+    result TEXT,
+    confidence REAL,
+    status TEXT,
+    keterangan TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ml_vault_kind_ts ON ml_results (vault_id, kind, ts);
+"""
+
+# Nama kolom dashboard -> kolom tabel
+SENSOR_COLUMNS = {
+    "Timestamp": "ts",
+    "Status Brankas": "status",
+    "Jarak (cm)": "jarak",
+    "PIR": "pir",
+    "Prediksi Wajah": "face",
+    "Prediksi Suara": "voice",
+    "Label Prediksi": "label",
+}
+ML_COLUMNS = {
+    "Timestamp": "ts",
+    "Hasil Prediksi": "result",
+    "Confidence": "confidence",
+    "Status": "status",
+    "Keterangan": "keterangan",
+}
+
+
+def to_epoch(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.strptime(value, TIME_FORMAT).timestamp()
+
+
+def format_ts(epoch):
+    return datetime.fromtimestamp(epoch).strftime(TIME_FORMAT)
+
+
+class TelemetryStore:
+    def __init__(self, path=TELEMETRY_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        # Satu koneksi per thread (sqlite3 tidak boleh dipakai lintas thread)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _insert(self, table, values):
+        columns = ", ".join(values)
+        marks = ", ".join("?" for _ in values)
+        with self._write_lock:
+            cur = self._conn().execute(f"INSERT INTO {table} ({columns}) VALUES ({marks})", list(values.values()))
+        return cur.lastrowid
+
+    def _update(self, table, row_id, values):
+        assignments = ", ".join(f"{col} = ?" for col in values)
+        with self._write_lock:
+            self._conn().execute(f"UPDATE {table} SET {assignments} WHERE id = ?", list(values.values()) + [row_id])
+
+    # ----------------------------------------------------------------
+    # TULIS
+    # ----------------------------------------------------------------
+    def add_sensor(self, row, vault_id=DEFAULT_VAULT_ID):
+        """Simpan satu baris TOPIC_BRANKAS (dict dengan nama kolom dashboard). Output: id baris."""
+        values = {"vault_id": vault_id}
+        for name, col in SENSOR_COLUMNS.items():
+            if name in row:
+                values[col] = _clean(row[name])
+        values["ts"] = to_epoch(row.get("Timestamp"))
+        return self._insert("sensor_readings", values)
+
+    def update_sensor(self, row_id, column, value):
+        self._update("sensor_readings", row_id, {SENSOR_COLUMNS[column]: _clean(value)})
+
+    def add_ml_result(self, kind, row, vault_id=DEFAULT_VAULT_ID):
+        """Simpan hasil ML (kind = 'face' / 'voice'). Output: id baris."""
+        values = {"vault_id": vault_id, "kind": kind}
+        for name, col in ML_COLUMNS.items():
+            if name in row:
+                values[col] = _clean(row[name])
+        values["ts"] = to_epoch(row.get("Timestamp"))
+        return self._insert("ml_results", values)
+
+    # ----------------------------------------------------------------
+    # BACA (JENDELA WAKTU)
+    # ----------------------------------------------------------------
+    def _window(self, table, columns, where, params, since, until, limit):
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(to_epoch(since))
+        if until is not None:
+            where.append("ts <= ?")
+            params.append(to_epoch(until))
+        sql = f"SELECT id, {', '.join(columns.values())} FROM {table} WHERE {' AND '.join(where)} ORDER BY ts DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._conn().execute(sql, params).fetchall()[::-1]
+        frame = pd.DataFrame(rows, columns=["id"] + list(columns))
+        frame["Timestamp"] = [format_ts(ts) for ts in frame["Timestamp"]]
+        return frame.set_index("id")
+
+    def sensor_window(self, vault_id=DEFAULT_VAULT_ID, since=None, until=None, limit=None):
+        """Data sensor satu brankas, urut lama -> baru. limit = n baris terakhir."""
+        return self._window("sensor_readings", SENSOR_COLUMNS, ["vault_id = ?"], [vault_id], since, until, limit)
+
+    def ml_window(self, kind, vault_id=DEFAULT_VAULT_ID, since=None, until=None, limit=None):
+        return self._window("ml_results", ML_COLUMNS, ["vault_id = ?", "kind = ?"], [vault_id, kind], since, until, limit)
+
+    def vaults(self):
+        rows = self._conn().execute("SELECT DISTINCT vault_id FROM sensor_readings ORDER BY vault_id").fetchall()
+        return [r[0] for r in rows]
+
+    # ----------------------------------------------------------------
+    # ADAPTER UNTUK EventStore (write-through)
+    # ----------------------------------------------------------------
+    def sensor_sink(self, vault_id=DEFAULT_VAULT_ID):
+        return _Sink(lambda row: self.add_sensor(row, vault_id), self.update_sensor)
+
+    def ml_sink(self, kind, vault_id=DEFAULT_VAULT_ID):
+        return _Sink(lambda row: self.add_ml_result(kind, row, vault_id), None)
+
+
+class _Sink:
+    def __init__(self, append, update):
+        self.append = append
+        self._update = update
+
+    def update(self, key, column, value):
+        if self._update is not None:
+            self._update(key, column, value)
+
+
+def _clean(value):
+    # NaN -> NULL, tipe numpy -> tipe Python
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
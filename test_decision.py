@@ -0,0 +1,42 @@
+import numpy as np
+from decision import DecisionEngine, decide, VERDICT_ACCEPTED, VERDICT_ML_ERROR, VERDICT_PENDING
+
+
+def test_score_missing_confidence_is_none():
+    engine = DecisionEngine()
+    attempt_id = engine.add_sensor("v1", "AMAN", 30, 0, session="s1")
+    engine.add_result("v1", "face", "ILHAM_FACES", 0.9, session="s1")
+    engine.add_result("v1", "voice", "MY_YES", None, session="s1")
+    engine.evaluate()
+    attempt = engine.get(attempt_id)
+    # Label tanpa confidence tetap lolos ambang, tapi tidak boleh memberi skor fusi tertinggi
+    assert attempt["verdict"] == VERDICT_ACCEPTED
+    assert attempt["voice_conf"] is None
+    assert attempt["score"] is None
+
+
+def test_score_both_confidences():
+    verdicts, score = decide(["AMAN"], [30.0], [0.0], ["ILHAM_FACES"], [0.81], ["MY_YES"], [0.64])
+    assert verdicts[0] == VERDICT_ACCEPTED
+    assert np.isclose(score[0], 0.72)
+
+
+def test_ml_error_overrides_pending():
+    engine = DecisionEngine()
+    attempt_id = engine.add_results("v1", {"face": ("Error", 0.0), "voice": ("MY_YES", 0.9)})
+    engine.evaluate()
+    attempt = engine.get(attempt_id)
+    assert attempt["verdict"] == VERDICT_ML_ERROR
+    assert attempt["score"] == 0.0
+
+
+def test_result_without_session_not_attached():
+    engine = DecisionEngine()
+    attempt_id = engine.add_sensor("v1", "AMAN", 30, 0)
+    # Tanpa sesi, hasil satu modalitas tidak ditebak pasangannya dari waktu kedatangan
+    assert engine.add_result("v1", "face", "ILHAM_FACES", 0.9) is None
+    assert engine.add_result("v1", "voice", "MY_YES", 0.9) is None
+    engine.evaluate()
+    attempt = engine.get(attempt_id)
+    assert attempt["face"] is None and attempt["voice"] is None
+    assert attempt["verdict"] == VERDICT_PENDING
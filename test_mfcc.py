@@ -0,0 +1,50 @@
+import io
+import wave
+import numpy as np
+import pytest
+from mfcc import get_extractor, load_audio
+from predict_voice import extract_features
+from vad import trim_silence
+
+librosa = pytest.importorskip("librosa")
+
+SAMPLE_RATE = 16000
+
+
+def fixed_clip(seconds=1.5):
+    # Nada + harmonik + noise (seed tetap), diapit hening supaya jalur VAD ikut teruji
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.sin(2 * np.pi * 660 * t)
+    tone += 0.02 * rng.standard_normal(len(t))
+    silence = np.zeros(SAMPLE_RATE // 4)
+    y = np.concatenate([silence, tone, silence]).astype(np.float32)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((y * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def librosa_mean_mfcc(y, n_mfcc):
+    return np.mean(librosa.feature.mfcc(y=y, sr=SAMPLE_RATE, n_mfcc=n_mfcc).T, axis=0)
+
+
+@pytest.mark.parametrize("n_mfcc", [13, 40])
+def test_extract_features_matches_librosa(n_mfcc):
+    data = fixed_clip()
+    voice = load_audio(io.BytesIO(data), SAMPLE_RATE)
+    trimmed, _ = trim_silence(voice, SAMPLE_RATE)
+    expected = librosa_mean_mfcc(trimmed, n_mfcc)
+    features = extract_features(io.BytesIO(data), SAMPLE_RATE, n_mfcc)
+    np.testing.assert_allclose(features, expected, rtol=1e-3, atol=1e-2)
+
+
+def test_batched_features_match_librosa():
+    voice = load_audio(io.BytesIO(fixed_clip()), SAMPLE_RATE)
+    clips = [voice, voice[:SAMPLE_RATE // 2], voice[SAMPLE_RATE // 3:]]
+    expected = np.vstack([librosa_mean_mfcc(y, 40) for y in clips])
+    np.testing.assert_allclose(get_extractor(SAMPLE_RATE, 40).features_batch(clips), expected,
+                               rtol=1e-3, atol=1e-2)
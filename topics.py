@@ -0,0 +1,67 @@
+from config import DEFAULT_VAULT_ID, VAULT_TOPICS, WORKER_GROUP
+
+# ====================================================================
+# TOPIK MQTT PER BRANKAS
+# ====================================================================
+# Topik lama (satu brankas) tetap jadi nama dasar. Dengan VAULT_TOPICS=1
+# setiap brankas memakai "vault/<id>/<topik lama>", sehingga banyak
+# brankas bisa berbagi broker dan worker. Pesan di topik lama selalu
+# dianggap milik DEFAULT_VAULT_ID.
+
+VAULT_PREFIX = "vault"
+
+# jenis topik -> topik lama
+LEGACY_TOPICS = {
+    "status": "data/status/kontrol",
+    "face_result": "ai/face/result",
+    "voice_result": "ai/voice/result",
+    "cam_url": "iot/camera/photo",
+    "audio_link": "data/audio/link",
+    "alarm": "data/Allert/kontrol",
+    "cam_trigger": "data/cam/capture",
+    "rec_trigger": "data/mic/trigger",
+    "verdict": "ai/access/verdict",
+    "cam_view": "ai/face/photo",
+    "audio_view": "ai/voice/audio",
+}
+_KIND_BY_LEGACY = {v: k for k, v in LEGACY_TOPICS.items()}
+
+# Media dari ESP32 dan topik hasil ML-nya
+MEDIA_KINDS = {"cam_url": "picture", "audio_link": "voice"}
+RESULT_KINDS = {"picture": "face_result", "voice": "voice_result"}
+# Media yang sudah diinferensi server (/process, /verify): hanya untuk ditampilkan,
+# tidak di-subscribe worker dan tidak diinferensi ulang oleh dashboard
+VIEW_KINDS = {"picture": "cam_view", "voice": "audio_view"}
+
+
+def topic(kind, vault_id=DEFAULT_VAULT_ID):
+    """Topik untuk publish ke satu brankas."""
+    if not VAULT_TOPICS:
+        return LEGACY_TOPICS[kind]
+    return f"{VAULT_PREFIX}/{vault_id}/{LEGACY_TOPICS[kind]}"
+
+
+def subscriptions(kinds):
+    """Filter subscribe untuk jenis topik tertentu (topik lama + wildcard per brankas)."""
+    filters = [LEGACY_TOPICS[k] for k in kinds]
+    if VAULT_TOPICS:
+        filters += [f"{VAULT_PREFIX}/+/{LEGACY_TOPICS[k]}" for k in kinds]
+    return filters
+
+
+def shared_subscriptions(kinds, group=WORKER_GROUP):
+    """Shared subscription ($share/<grup>/...): broker membagi pesan ke salah satu worker di grup."""
+    return [f"$share/{group}/{f}" for f in subscriptions(kinds)]
+
+
+def parse_topic(name):
+    """Output: (vault_id, jenis topik), atau (None, None) jika topik tidak dikenal."""
+    kind = _KIND_BY_LEGACY.get(name)
+    if kind is not None:
+        return DEFAULT_VAULT_ID, kind
+    parts = name.split("/", 2)
+    if len(parts) == 3 and parts[0] == VAULT_PREFIX:
+        kind = _KIND_BY_LEGACY.get(parts[2])
+        if kind is not None:
+            return parts[1], kind
+    return None, None
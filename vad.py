@@ -0,0 +1,195 @@
+import threading
+import numpy as np
+from config import VAD_ENABLED, VAD_FLOOR_DB, VAD_TOP_DB, VAD_NOISE_ZCR, VAD_PAD_MS
+
+# ====================================================================
+# VOICE ACTIVITY DETECTION (ENERGI + ZERO-CROSSING)
+# ====================================================================
+# Dijalankan sebelum MFCC: hening di awal/akhir klip dibuang supaya
+# mean-MFCC tidak tercampur dead air, dan klip tanpa ucapan sama sekali
+# langsung dianggap NOISE tanpa inferensi SVC.
+
+VAD_FRAME = 512  # 32 ms pada 16 kHz, frame tidak overlap
+AMIN = 1e-10
+
+
+class VadResult:
+    def __init__(self, start, end, speech, n_samples):
+        self.start = start
+        self.end = end
+        self.speech = speech
+        self.n_samples = n_samples
+
+    @property
+    def dropped(self):
+        """Jumlah sampel yang tidak perlu diproses MFCC."""
+        return self.n_samples - (self.end - self.start) if self.speech else self.n_samples
+
+
+def frame_stats(y, frame=VAD_FRAME):
+    """Energi (dBFS) dan zero-crossing rate per frame. Output: (energy_db, zcr)."""
+    n = len(y) // frame
+    if n == 0:
+        frames = np.pad(y, (0, frame - len(y)))[None, :]
+    else:
+        frames = y[:n * frame].reshape(n, frame)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame
+    energy_db = 10.0 * np.log10(np.maximum(energy, AMIN))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame - 1)
+    return energy_db, zcr
+
+
+def detect_speech(y, sample_rate, floor_db=VAD_FLOOR_DB, top_db=VAD_TOP_DB,
+                  noise_zcr=VAD_NOISE_ZCR, pad_ms=VAD_PAD_MS, frame=VAD_FRAME):
+    """
+    Fungsi untuk mencari rentang ucapan dalam klip.
+    Frame dianggap aktif jika energinya di atas floor_db dan tidak lebih dari top_db
+    di bawah frame terkeras. Klip yang frame aktifnya didominasi ZCR tinggi
+    (hiss / white noise) dianggap tanpa ucapan.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    n_samples = len(y)
+    if n_samples == 0:
+        return VadResult(0, 0, False, 0)
+    energy_db, zcr = frame_stats(y, frame)
+    return speech_range(energy_db, zcr, n_samples, sample_rate, floor_db, top_db, noise_zcr, pad_ms, frame)
+
+
+def speech_range(energy_db, zcr, n_samples, sample_rate, floor_db=VAD_FLOOR_DB, top_db=VAD_TOP_DB,
+                 noise_zcr=VAD_NOISE_ZCR, pad_ms=VAD_PAD_MS, frame=VAD_FRAME):
+    """Rentang ucapan dari statistik per frame (frame_stats) klip sepanjang n_samples."""
+    threshold = max(floor_db, energy_db.max() - top_db)
+    active = np.flatnonzero(energy_db > threshold)
+    if len(active) == 0 or np.median(zcr[active]) > noise_zcr:
+        return VadResult(0, 0, False, n_samples)
+
+    pad = int(pad_ms * sample_rate / 1000)
+    start = max(0, active[0] * frame - pad)
+    end = min(n_samples, (active[-1] + 1) * frame + pad)
+    return VadResult(start, end, True, n_samples)
+
+
+class VadStats:
+    """Counter global: berapa klip/sampel yang dibuang VAD (untuk melihat compute yang dihemat)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.no_speech = 0
+        self.samples_in = 0
+        self.samples_dropped = 0
+
+    def record(self, result):
+        with self._lock:
+            self.clips += 1
+            self.no_speech += not result.speech
+            self.samples_in += result.n_samples
+            self.samples_dropped += result.dropped
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "clips": self.clips,
+                "no_speech": self.no_speech,
+                "samples_in": self.samples_in,
+                "samples_dropped": self.samples_dropped,
+                "dropped_ratio": self.samples_dropped / self.samples_in if self.samples_in else 0.0,
+            }
+
+
+stats = VadStats()
+
+
+def trim_silence(y, sample_rate):
+    """
+    Fungsi untuk memotong hening di awal/akhir klip.
+    Output: (klip_terpotong atau None jika tidak ada ucapan, VadResult)
+    """
+    if not VAD_ENABLED:
+        return y, VadResult(0, len(y), len(y) > 0, len(y))
+    result = detect_speech(y, sample_rate)
+    stats.record(result)
+    if not result.speech:
+        return None, result
+    return y[result.start:result.end], result
+
+
+class SpeechGate:
+    """
+    VAD inkremental untuk jalur streaming. Energi/ZCR setiap frame dicatat selagi
+    sampel mengalir (audio tidak disimpan). Sampel ditahan sampai frame pertama yang
+    aktif (ambang yang sama dengan detect_speech, memakai frame terkeras sejauh ini),
+    lalu diteruskan mulai dari `start` (awal ucapan dikurangi VAD_PAD_MS).
+    finish() memberi VadResult yang sama dengan detect_speech() pada klip utuh.
+    """
+
+    def __init__(self, sample_rate, floor_db=VAD_FLOOR_DB, top_db=VAD_TOP_DB, noise_zcr=VAD_NOISE_ZCR,
+                 pad_ms=VAD_PAD_MS, frame=VAD_FRAME):
+        self.sample_rate = sample_rate
+        self.floor_db = floor_db
+        self.top_db = top_db
+        self.noise_zcr = noise_zcr
+        self.pad_ms = pad_ms
+        self.frame = frame
+        self.open = not VAD_ENABLED
+        self.start = 0 if self.open else None  # sampel pertama yang diteruskan (posisi di klip)
+        self.n_samples = 0
+        self._held = np.empty(0, dtype=np.float32)
+        self._tail = np.empty(0, dtype=np.float32)  # sisa sampel < satu frame
+        self._energy = []
+        self._zcr = []
+        self._max_db = -np.inf
+
+    def _measure(self, samples):
+        # Statistik frame utuh yang baru lengkap; output: energi (dBFS) frame-frame itu
+        buf = np.concatenate([self._tail, samples])
+        n = len(buf) // self.frame
+        self._tail = buf[n * self.frame:].copy()
+        if n == 0:
+            return np.empty(0)
+        energy_db, zcr = frame_stats(buf[:n * self.frame], self.frame)
+        self._energy.append(energy_db)
+        self._zcr.append(zcr)
+        return energy_db
+
+    def feed(self, samples):
+        """Output: sampel yang boleh masuk MFCC streaming (kosong selama masih hening)."""
+        if not VAD_ENABLED:
+            self.n_samples += len(samples)
+            return samples
+        first = self.n_samples // self.frame  # indeks frame utuh pertama yang belum dinilai
+        self.n_samples += len(samples)
+        energy_db = self._measure(samples)
+        if self.open:
+            return samples
+        self._held = np.concatenate([self._held, samples])
+        if len(energy_db) == 0:
+            return np.empty(0, dtype=np.float32)
+        self._max_db = max(self._max_db, float(energy_db.max()))
+        active = np.flatnonzero(energy_db > max(self.floor_db, self._max_db - self.top_db))
+        if len(active) == 0:
+            return np.empty(0, dtype=np.float32)
+        pad = int(self.pad_ms * self.sample_rate / 1000)
+        self.start = max(0, (first + active[0]) * self.frame - pad)
+        self.open = True
+        out = self._held[self.start:]
+        self._held = None
+        return out
+
+    def finish(self):
+        """VadResult klip utuh (dicatat di stats seperti trim_silence)."""
+        n = self.n_samples
+        if not VAD_ENABLED:
+            return VadResult(0, n, n > 0, n)
+        if n == 0:
+            result = VadResult(0, 0, False, 0)
+        else:
+            if self._energy:
+                energy_db, zcr = np.concatenate(self._energy), np.concatenate(self._zcr)
+            else:
+                energy_db, zcr = frame_stats(self._tail, self.frame)  # klip < 1 frame (dipad)
+            result = speech_range(energy_db, zcr, n, self.sample_rate, self.floor_db, self.top_db,
+                                  self.noise_zcr, self.pad_ms, self.frame)
+        stats.record(result)
+        return result
@@ -0,0 +1,230 @@
+import struct
+from io import BytesIO
+import numpy as np
+from mfcc import get_extractor, load_audio, FRAME_BLOCK, AMIN
+from vad import SpeechGate, trim_silence
+from config import VOICE_EARLY_THRESHOLD, VOICE_EARLY_MIN_SECONDS, VOICE_EARLY_CHECK_SECONDS
+
+# ====================================================================
+# VERIFIKASI SUARA STREAMING (SELAGI ESP32 MASIH MENGUNGGAH)
+# ====================================================================
+# Byte WAV di-decode per chunk, frame MFCC dihitung begitu sampelnya
+# lengkap, dan rata-rata koefisien diperbarui terus. Jika confidence
+# MY_YES / NOISE sudah melewati ambang, keputusan bisa diambil sebelum
+# file selesai diunduh. Hening di awal ditahan (SpeechGate) supaya estimasi
+# awal tidak tercampur dead air. Kalau dibaca sampai habis, rentang ucapan
+# klip utuh (VAD yang sama dengan predict_audio) dipakai untuk memilih
+# frame log-mel yang sudah dihitung, tanpa MFCC ulang dan tanpa menyimpan
+# audio.
+
+WAV_PCM = 1
+WAV_FLOAT = 3
+WAV_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedStreamError(ValueError):
+    """Audio tidak bisa di-decode per chunk (bukan WAV PCM/float, atau sample rate berbeda)."""
+
+
+class WavStreamDecoder:
+    """Parser WAV inkremental: feed(bytes) -> sampel mono float32 yang sudah lengkap."""
+
+    def __init__(self):
+        self._pending = bytearray()
+        self._in_data = False
+        self._data_left = None
+        self.sample_rate = None
+        self.channels = None
+        self._dtype = None
+        self._scale = 1.0
+        self._frame_bytes = None
+        self.raw = bytearray()  # byte sampai header terbaca, untuk fallback load_audio
+
+    def _parse_header(self):
+        buf = self._pending
+        if len(buf) < 12:
+            return False
+        if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+            raise UnsupportedStreamError("Bukan file WAV")
+        pos = 12
+        while len(buf) >= pos + 8:
+            chunk_id = bytes(buf[pos:pos + 4])
+            size = struct.unpack("<I", buf[pos + 4:pos + 8])[0]
+            if chunk_id == b"data":
+                if self._dtype is None:
+                    raise UnsupportedStreamError("Chunk data sebelum fmt")
+                del buf[:pos + 8]
+                self._in_data = True
+                # ESP32 kadang menulis ukuran 0/0xFFFFFFFF saat merekam langsung ke stream
+                self._data_left = size if 0 < size < 0xFFFFFFFF else None
+                return True
+            if len(buf) < pos + 8 + size:
+                return False
+            if chunk_id == b"fmt ":
+                self._parse_fmt(bytes(buf[pos + 8:pos + 8 + size]))
+            pos += 8 + size + (size & 1)
+        return False
+
+    def _parse_fmt(self, fmt):
+        tag, channels, rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == WAV_EXTENSIBLE and len(fmt) >= 26:
+            tag = struct.unpack("<H", fmt[24:26])[0]
+        if tag == WAV_PCM and bits == 16:
+            self._dtype, self._scale = np.dtype("<i2"), 1.0 / 32768.0
+        elif tag == WAV_PCM and bits == 32:
+            self._dtype, self._scale = np.dtype("<i4"), 1.0 / 2147483648.0
+        elif tag == WAV_PCM and bits == 8:
+            self._dtype, self._scale = np.dtype("u1"), 1.0 / 128.0
+        elif tag == WAV_FLOAT and bits == 32:
+            self._dtype, self._scale = np.dtype("<f4"), 1.0
+        else:
+            raise UnsupportedStreamError(f"Format WAV tidak didukung (tag={tag}, bits={bits})")
+        self.sample_rate = rate
+        self.channels = channels
+        self._frame_bytes = block_align
+
+    @property
+    def ready(self):
+        """True setelah header selesai dibaca dan sampel mulai mengalir."""
+        return self._in_data
+
+    def feed(self, chunk):
+        if not self._in_data:
+            self.raw += chunk
+        self._pending += chunk
+        if not self._in_data and not self._parse_header():
+            return np.empty(0, dtype=np.float32)
+        usable = len(self._pending)
+        if self._data_left is not None:
+            usable = min(usable, self._data_left)
+        usable -= usable % self._frame_bytes
+        if usable == 0:
+            return np.empty(0, dtype=np.float32)
+        data = np.frombuffer(bytes(self._pending[:usable]), dtype=self._dtype)
+        del self._pending[:usable]
+        if self._data_left is not None:
+            self._data_left -= usable
+        samples = data.astype(np.float32)
+        if self._dtype.kind == "u":
+            samples -= 128.0
+        samples *= self._scale
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples
+
+
+class StreamingMfcc:
+    """Frame STFT (center=True) dihitung inkremental; mean log-mel diperbarui setiap push()."""
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self._buffer = np.zeros(extractor.n_fft // 2, dtype=np.float32)  # zero padding awal
+        self._log_mel = []
+        self._max = -np.inf
+        self.n_frames = 0
+        self.n_samples = 0
+
+    def _emit(self):
+        ex = self.extractor
+        n = 0 if len(self._buffer) < ex.n_fft else 1 + (len(self._buffer) - ex.n_fft) // ex.hop_length
+        if n == 0:
+            return
+        frames = np.lib.stride_tricks.sliding_window_view(self._buffer, ex.n_fft)[::ex.hop_length][:n]
+        for start in range(0, n, FRAME_BLOCK):
+            log_mel = 10.0 * np.log10(np.maximum(AMIN, ex.mel_power(frames[start:start + FRAME_BLOCK])))
+            self._log_mel.append(log_mel)
+            self._max = max(self._max, float(log_mel.max()))
+        self.n_frames += n
+        self._buffer = self._buffer[n * ex.hop_length:].copy()
+
+    def push(self, samples):
+        if len(samples) == 0:
+            return
+        self.n_samples += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._emit()
+
+    def estimate(self):
+        """Mean-MFCC sementara (clipping top_db memakai puncak yang sudah terlihat)."""
+        if self.n_frames == 0:
+            return None
+        return self._mean_log_mel() @ self.extractor.dct
+
+    def _mean_log_mel(self):
+        log_mel = np.concatenate(self._log_mel)
+        np.maximum(log_mel, self._max - self.extractor.top_db, out=log_mel)
+        return log_mel.mean(axis=0)
+
+    def finish(self, start=0, end=None):
+        """
+        Tambah zero padding akhir lalu hitung mean-MFCC final dari frame yang sudah ada.
+        start/end (sampel, relatif ke sampel pertama yang di-push) membatasi rata-rata
+        ke frame yang pusatnya ada di rentang ucapan, seperti STFT klip yang sudah dipotong.
+        """
+        # Setelah padding, jumlah frame = 1 + n_samples // hop (sama dengan center=True)
+        pad = np.zeros(self.extractor.n_fft // 2, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, pad])
+        self._emit()
+        if self.n_frames == 0:
+            return None
+        log_mel = np.concatenate(self._log_mel)
+        centers = np.arange(len(log_mel)) * self.extractor.hop_length
+        keep = centers >= start
+        if end is not None:
+            keep &= centers <= end
+        if keep.any():
+            log_mel = log_mel[keep]
+        np.maximum(log_mel, log_mel.max() - self.extractor.top_db, out=log_mel)
+        return log_mel.mean(axis=0) @ self.extractor.dct
+
+
+def stream_features(chunks, sample_rate, n_mfcc, classify=None, early_labels=(),
+                    threshold=VOICE_EARLY_THRESHOLD, min_seconds=VOICE_EARLY_MIN_SECONDS,
+                    check_seconds=VOICE_EARLY_CHECK_SECONDS):
+    """
+    Fungsi untuk menghitung mean-MFCC dari iterator chunk byte WAV.
+    classify(features) -> (label, confidence) dipanggil setiap check_seconds audio ucapan;
+    jika label ada di early_labels dan confidence >= threshold, iterasi dihentikan.
+    Output: (features atau None jika VAD tidak menemukan ucapan, hasil_classify_awal atau None)
+    """
+    extractor = get_extractor(sample_rate, n_mfcc)
+    decoder = WavStreamDecoder()
+    gate = SpeechGate(sample_rate)
+    stream = StreamingMfcc(extractor)
+    check_every = max(1, int(check_seconds * sample_rate / extractor.hop_length))
+    min_frames = int(min_seconds * sample_rate / extractor.hop_length)
+    next_check = max(check_every, min_frames)
+
+    chunks = iter(chunks)
+    for chunk in chunks:
+        try:
+            samples = decoder.feed(chunk)
+            if decoder.sample_rate is not None and decoder.sample_rate != sample_rate:
+                raise UnsupportedStreamError("Sample rate berbeda, perlu resampling")
+        except UnsupportedStreamError:
+            # Baca sisa file lalu pakai jalur biasa (load_audio)
+            for rest in chunks:
+                decoder.raw += rest
+            return _fallback(decoder.raw, sample_rate, n_mfcc), None
+        stream.push(gate.feed(samples))
+        if classify is not None and early_labels and stream.n_frames >= next_check:
+            next_check = stream.n_frames + check_every
+            label, confidence = classify(stream.estimate())
+            if label in early_labels and confidence >= threshold:
+                return stream.estimate(), (label, confidence)
+
+    if not decoder.ready:
+        return _fallback(decoder.raw, sample_rate, n_mfcc), None
+    # Rentang ucapan klip utuh; None = tanpa ucapan (label NOISE, sama dengan predict_audio)
+    speech = gate.finish()
+    if not speech.speech or gate.start is None:
+        return None, None
+    return stream.finish(speech.start - gate.start, speech.end - gate.start), None
+
+
+def _fallback(raw, sample_rate, n_mfcc):
+    # Jalur biasa (load_audio + trim_silence + MFCC), sama dengan predict_audio
+    trimmed, _ = trim_silence(load_audio(BytesIO(bytes(raw)), sample_rate), sample_rate)
+    if trimmed is None:
+        return None
+    return get_extractor(sample_rate, n_mfcc).features(trimmed)
@@ -1,98 +1,350 @@
-# server.py (Setelah Direvisi)
-
-from fastapi import FastAPI
-from datetime import datetime
-import os
-import json
-import requests # <--- DITAMBAHKAN
-from predict_picture import predict_image
-from predict_voice import predict_audio
-from PIL import Image
-import soundfile as sf
-import paho.mqtt.client as mqtt # <--- DITAMBAHKAN untuk komunikasi ke Streamlit
-
-app = FastAPI()
-
-# --- MQTT SETUP ---
-MQTT_SERVER = "broker.hivemq.com"
-MQTT_PORT = 1883
-TOPIC_ML_FACE_RESULT = "ai/face/result"
-TOPIC_ML_VOICE_RESULT = "ai/voice/result"
-TOPIC_CAM_PHOTO_URL = "/iot/camera/photo" # Untuk URL foto di Streamlit
-TOPIC_AUDIO_LINK = "data/audio/link"       # Untuk URL audio di Streamlit
-
-mqtt_client = mqtt.Client()
-mqtt_client.connect(MQTT_SERVER, MQTT_PORT, 60)
-mqtt_client.loop_start() 
-# --- END MQTT SETUP ---
-
-# Hapus semua logika results.json (init_results_file dan save_result) 
-# karena kita akan menggunakan MQTT 100% untuk status real-time.
-
-# =================================================================
-# ENDPOINT BARU: Menerima URL dan Melakukan HTTP GET (PULL)
-# =================================================================
-
-@app.get("/process")
-async def process_media_from_url(url: str, media_type: str):
-    """
-    Endpoint ini menerima URL (alamat file di ESP32) dan tipe media.
-    Kemudian, ia melakukan HTTP GET untuk mengambil file tersebut, memprosesnya, 
-    dan mengirim hasilnya ke Streamlit via MQTT.
-    """
-    
-    if not url.startswith("http"):
-        return {"status": "error", "message": "URL tidak valid."}
-        
-    filepath = None
-    
-    try:
-        # 1. LAKUKAN HTTP GET KE URL ESP32
-        response = requests.get(url, stream=True)
-        response.raise_for_status() # Raise exception jika 4xx atau 5xx error
-        
-        # Tentukan ekstensi dan path
-        ext = ".jpg" if media_type == "picture" else ".wav"
-        filepath = f"temp_media_{datetime.now().timestamp()}{ext}"
-        
-        # Simpan file yang didownload
-        with open(filepath, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        hasil_prediksi = "N/A"
-        
-        # 2. PROSES DENGAN MODEL ML
-        if media_type == "picture":
-            image = Image.open(filepath)
-            hasil_prediksi, akurasi = predict_image(image)
-            # Kirim URL foto ke Streamlit untuk ditampilkan (jika perlu)
-            mqtt_client.publish(TOPIC_CAM_PHOTO_URL, url) 
-            # Kirim hasil ML
-            mqtt_client.publish(TOPIC_ML_FACE_RESULT, hasil_prediksi)
-            
-        elif media_type == "voice":
-            hasil_prediksi, akurasi = predict_audio(filepath)
-            # Kirim URL audio ke Streamlit untuk ditampilkan (jika perlu)
-            mqtt_client.publish(TOPIC_AUDIO_LINK, url)
-            # Kirim hasil ML
-            mqtt_client.publish(TOPIC_ML_VOICE_RESULT, hasil_prediksi)
-
-        # 3. KIRIM RESPON KE YANG MENGIRIM PERINTAH (ESP32)
-        os.remove(filepath)
-        return {"status": "success", "result": hasil_prediksi, "topic_sent": TOPIC_ML_FACE_RESULT if media_type == "picture" else TOPIC_ML_VOICE_RESULT}
-        
-    except requests.exceptions.RequestException as req_e:
-        # Jika gagal mengambil file dari ESP32
-        if filepath and os.path.exists(filepath): os.remove(filepath)
-        return {"status": "error", "message": f"Gagal mengambil file dari URL: {str(req_e)}"}
-        
-    except Exception as e:
-        # Jika gagal di proses ML
-        if filepath and os.path.exists(filepath): os.remove(filepath)
-        return {"status": "error", "message": f"Gagal proses ML: {str(e)}"}
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+# server.py (Setelah Direvisi)
+
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, JSONResponse
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+import requests # <--- DITAMBAHKAN
+from inference_pool import run_inference, stream_and_infer, create_inference_executor, warmup
+from topics import topic, subscriptions, parse_topic, VIEW_KINDS
+from decision import get_decision_engine, sensor_reading, result_payload, MODALITY_FOR_MEDIA
+from ingest import normalize_message
+from media_io import fetch_media, MediaTooLargeError
+from prediction_cache import get_prediction_cache, MODEL_FOR_MEDIA
+import vad
+import metrics
+from metrics import stage_timer, profile_if_slow, ERRORS, REQUEST_SECONDS, StartupPhases
+from config import (
+    FETCH_WORKERS, VOICE_STREAMING, DEFAULT_VAULT_ID, INFERENCE_PROCESSES, WARMUP_ENABLED,
+    MQTT_RECONNECT_MIN_S, MQTT_RECONNECT_MAX_S, MQTT_BROKER, MQTT_PORT,
+)
+import paho.mqtt.client as mqtt # <--- DITAMBAHKAN untuk komunikasi ke Streamlit
+
+# librosa, OpenCV, PIL dan soundfile tidak di-import di sini: modul prediksi baru
+# di-load saat inferensi pertama (atau saat warmup, lihat lifespan di bawah)
+startup = StartupPhases(started=_import_started)
+startup.record("import", time.perf_counter() - _import_started)
+
+# --- MQTT SETUP ---
+MQTT_SERVER = MQTT_BROKER or "broker.hivemq.com"
+# Topik per brankas ada di topics.py (hasil ML, URL foto/audio untuk Streamlit)
+
+# --- KEPUTUSAN AKSES SERVER-SIDE ---
+# Hasil wajah/suara dari /process dan status sensor dari MQTT digabung di sini
+# (lihat decision.py); verdict dipublish ke topik "verdict" brankas tersebut,
+# jadi keputusan buka kunci tidak bergantung pada dashboard yang terbuka.
+engine = get_decision_engine()
+
+
+def publish_verdicts():
+    for attempt in engine.evaluate():
+        mqtt_client.publish(topic("verdict", attempt.vault_id), attempt.to_json())
+
+
+def on_connect(client, userdata, flags, rc, properties=None):
+    if rc == 0:
+        client.subscribe([(f, 0) for f in subscriptions(["status"])])
+
+
+def on_message(client, userdata, msg):
+    vault_id, kind = parse_topic(msg.topic)
+    if kind != "status":
+        return
+    event = normalize_message(msg.topic, msg.payload.decode("utf-8", errors="replace").strip())
+    status, distance, pir, session = sensor_reading(event)
+    try:
+        engine.add_sensor(vault_id, status, distance, pir, session)
+    except (TypeError, ValueError) as e:
+        print(f"Status brankas {vault_id} tidak valid: {e}")
+        return
+    publish_verdicts()
+# --- END KEPUTUSAN AKSES ---
+
+mqtt_client = mqtt.Client()
+mqtt_client.on_connect = on_connect
+mqtt_client.on_message = on_message
+mqtt_client.reconnect_delay_set(MQTT_RECONNECT_MIN_S, MQTT_RECONNECT_MAX_S)
+# Koneksi dibuka di lifespan (bukan saat import); broker yang offline dicoba ulang di background
+# --- END MQTT SETUP ---
+
+# --- WORKER POOL ---
+# Download (I/O) dan inferensi (CPU) dijalankan di luar event loop supaya
+# request dari banyak brankas bisa berjalan bersamaan. Inferensi memakai
+# proses pre-fork jika BRANKAS_INFERENCE_PROCESSES > 0 (lihat inference_pool.py).
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+inference_executor = None  # dibuat di lifespan
+# --- END WORKER POOL ---
+
+metrics.register_collector("prediction_cache", lambda: get_prediction_cache().stats())
+metrics.register_collector("vad", vad.stats.snapshot)
+metrics.register_collector("startup", startup.snapshot)
+
+
+async def warm_up():
+    """Media sintetis lewat pipeline penuh sebelum /health melaporkan ready."""
+    loop = asyncio.get_running_loop()
+    try:
+        timings = await loop.run_in_executor(None, warmup, inference_executor, max(1, INFERENCE_PROCESSES))
+        for media_type, seconds in timings.items():
+            startup.record(f"warmup_{media_type}", seconds)
+    except Exception as e:
+        print(f"Warmup gagal (request pertama akan lebih lambat): {e}")
+    startup.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global inference_executor
+    loop = asyncio.get_running_loop()
+    with startup.phase("mqtt_connect"):
+        # connect_async + loop_start: tidak crash jika broker offline, paho mencoba ulang terus
+        mqtt_client.connect_async(MQTT_SERVER, MQTT_PORT, 60)
+        mqtt_client.loop_start()
+    with startup.phase("inference_pool"):
+        inference_executor = await loop.run_in_executor(None, create_inference_executor)
+    if WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        startup.mark_ready()
+    yield
+    if WARMUP_ENABLED:
+        warmup_task.cancel()
+    mqtt_client.loop_stop()
+    mqtt_client.disconnect()
+    # Job yang belum jalan dibatalkan, lalu tunggu worker selesai supaya proses pool
+    # (dan forkserver/resource_tracker) ikut berhenti, tidak tertinggal dengan ppid 1
+    await loop.run_in_executor(None, partial(inference_executor.shutdown, wait=True, cancel_futures=True))
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def infer_media(url, media_type, camera_id=None):
+    """
+    Download + inferensi satu media (streaming untuk suara, cache prediksi untuk model SVC).
+    Output: (label, confidence)
+    """
+    loop = asyncio.get_running_loop()
+    model_name = MODEL_FOR_MEDIA.get(media_type)
+    if media_type == "voice" and VOICE_STREAMING:
+        # MFCC dihitung selagi WAV diunduh; bisa selesai sebelum file habis (lihat voice_stream.py).
+        # Dijalankan di worker inferensi (bukan fetch_executor) supaya model tidak di-load di proses web.
+        with stage_timer("stream_inference", media_type=media_type):
+            hasil_prediksi, akurasi, _ = await loop.run_in_executor(inference_executor, stream_and_infer, url)
+    elif model_name is None:
+        with stage_timer("download", media_type=media_type):
+            buffer = await loop.run_in_executor(fetch_executor, fetch_media, url)
+        with stage_timer("inference", media_type=media_type):
+            hasil_prediksi, akurasi = await loop.run_in_executor(inference_executor, run_inference, buffer, media_type, camera_id)
+    else:
+        # 1. LAKUKAN HTTP GET KE URL ESP32 (pool keep-alive + timeout, langsung ke buffer memori)
+        #    URL yang sudah dikenal dicek dengan ETag/Last-Modified; isi yang sama -> hasil dari cache
+        cache = get_prediction_cache()
+        with stage_timer("download", media_type=media_type):
+            lookup = await loop.run_in_executor(fetch_executor, cache.fetch, url, model_name)
+        
+        # 2. PROSES DENGAN MODEL ML (di worker pool terbatas), hanya jika cache miss
+        if lookup.hit:
+            hasil_prediksi, akurasi = lookup.result
+        else:
+            with stage_timer("inference", media_type=media_type):
+                hasil_prediksi, akurasi = await loop.run_in_executor(inference_executor, run_inference, lookup.buffer, media_type, camera_id)
+            cache.store(lookup.key, (hasil_prediksi, akurasi))
+    return hasil_prediksi, akurasi
+
+
+# Hapus semua logika results.json (init_results_file dan save_result) 
+# karena kita akan menggunakan MQTT 100% untuk status real-time.
+
+# =================================================================
+# ENDPOINT BARU: Menerima URL dan Melakukan HTTP GET (PULL)
+# =================================================================
+
+@app.get("/process")
+async def process_media_from_url(url: str, media_type: str, vault_id: str = DEFAULT_VAULT_ID, session: str = None):
+    """
+    Endpoint ini menerima URL (alamat file di ESP32), tipe media, ID brankas, dan
+    (opsional) ID sesi percobaan akses supaya foto & suara yang sama dipasangkan.
+    Kemudian, ia melakukan HTTP GET untuk mengambil file tersebut, memprosesnya, 
+    dan mengirim hasil serta verdict akses ke Streamlit/ESP32 via MQTT.
+    """
+    
+    if not url.startswith("http"):
+        return {"status": "error", "message": "URL tidak valid."}
+        
+    camera_id = urlparse(url).netloc
+    t0 = time.perf_counter()
+    status = "success"
+    
+    try:
+        with profile_if_slow(f"process-{media_type}"):
+            hasil_prediksi, akurasi = await infer_media(url, media_type, camera_id)
+            
+            with stage_timer("mqtt_publish", media_type=media_type):
+                if media_type == "picture":
+                    # Kirim URL foto ke Streamlit untuk ditampilkan (topik tampilan: tidak diinferensi ulang)
+                    mqtt_client.publish(topic(VIEW_KINDS[media_type], vault_id), url) 
+                    # Kirim hasil ML (dengan sesi, supaya dashboard memasangkannya ke attempt yang benar)
+                    mqtt_client.publish(topic("face_result", vault_id), result_payload(hasil_prediksi, akurasi, session))
+                    
+                elif media_type == "voice":
+                    # Kirim URL audio ke Streamlit untuk ditampilkan (topik tampilan: tidak diinferensi ulang)
+                    mqtt_client.publish(topic(VIEW_KINDS[media_type], vault_id), url)
+                    # Kirim hasil ML (dengan sesi, supaya dashboard memasangkannya ke attempt yang benar)
+                    mqtt_client.publish(topic("voice_result", vault_id), result_payload(hasil_prediksi, akurasi, session))
+
+            attempt_id = None
+            if media_type in MODALITY_FOR_MEDIA:
+                # Tanpa sesi, hasil satu media tidak ikut verdict (attempt None)
+                attempt_id = engine.add_result(vault_id, MODALITY_FOR_MEDIA[media_type], hasil_prediksi, akurasi, session)
+                publish_verdicts()
+
+        # 3. KIRIM RESPON KE YANG MENGIRIM PERINTAH (ESP32)
+        attempt = engine.get(attempt_id) if attempt_id is not None else None
+        return {"status": "success", "result": hasil_prediksi, "topic_sent": topic("face_result" if media_type == "picture" else "voice_result", vault_id),
+                "attempt": attempt_id, "verdict": attempt["verdict"] if attempt else None}
+        
+    except MediaTooLargeError as size_e:
+        # Jika file dari ESP32 terlalu besar
+        status = "media_too_large"
+        return {"status": "error", "message": f"Media terlalu besar: {str(size_e)}"}
+        
+    except requests.exceptions.RequestException as req_e:
+        # Jika gagal mengambil file dari ESP32
+        status = "request"
+        return {"status": "error", "message": f"Gagal mengambil file dari URL: {str(req_e)}"}
+        
+    except Exception as e:
+        # Jika gagal di proses ML
+        status = "ml"
+        return {"status": "error", "message": f"Gagal proses ML: {str(e)}"}
+
+    finally:
+        if status != "success":
+            ERRORS.inc(category=status, media_type=media_type)
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, media_type=media_type, status=status)
+
+
+def error_category(e):
+    """Kategori counter ERRORS untuk exception dari infer_media."""
+    if isinstance(e, MediaTooLargeError):
+        return "media_too_large"
+    if isinstance(e, requests.exceptions.RequestException):
+        return "request"
+    return "ml"
+
+
+@app.get("/verify")
+async def verify_access(face_url: str, voice_url: str, vault_id: str = DEFAULT_VAULT_ID, session: str = None):
+    """
+    Verifikasi wajah + suara untuk satu percobaan akses. Foto dan audio diunduh dan
+    diinferensi bersamaan di worker terpisah, jadi latensi buka kunci = jalur terlama
+    (bukan jumlah keduanya). Kedua hasil masuk ke attempt yang sama dan satu verdict
+    gabungan (dengan kedua confidence) dipublish ke topik verdict brankas.
+    Media yang gagal diproses dicatat sebagai "Error" dengan confidence 0 (verdict ML ERROR,
+    kunci tidak dibuka). Tanpa sesi, server membuat ID sesi baru untuk percobaan ini.
+    """
+    if not (face_url.startswith("http") and voice_url.startswith("http")):
+        return {"status": "error", "message": "URL tidak valid."}
+    if session is None:
+        session = f"verify-{uuid.uuid4().hex}"
+
+    t0 = time.perf_counter()
+    status = "success"
+    try:
+        with profile_if_slow("verify"):
+            outcomes = await asyncio.gather(
+                infer_media(face_url, "picture", urlparse(face_url).netloc),
+                infer_media(voice_url, "voice", urlparse(voice_url).netloc),
+                return_exceptions=True,
+            )
+
+            results, errors = {}, {}
+            for media_type, outcome in zip(("picture", "voice"), outcomes):
+                modality = MODALITY_FOR_MEDIA[media_type]
+                if isinstance(outcome, Exception):
+                    ERRORS.inc(category=error_category(outcome), media_type=media_type)
+                    errors[modality] = str(outcome)
+                    # Confidence 0 (bukan "tidak diketahui") supaya tidak lolos ambang maupun menaikkan skor
+                    results[modality] = ("Error", 0.0)
+                else:
+                    results[modality] = outcome
+            if errors:
+                status = "partial"
+
+            with stage_timer("mqtt_publish", media_type="combined"):
+                # URL & label per modalitas tetap dikirim untuk tampilan/log dashboard
+                # (URL di topik tampilan, supaya tidak diinferensi ulang)
+                mqtt_client.publish(topic(VIEW_KINDS["picture"], vault_id), face_url)
+                mqtt_client.publish(topic("face_result", vault_id), result_payload(*results["face"], session))
+                mqtt_client.publish(topic(VIEW_KINDS["voice"], vault_id), voice_url)
+                mqtt_client.publish(topic("voice_result", vault_id), result_payload(*results["voice"], session))
+            attempt_id = engine.add_results(vault_id, results, session)
+            publish_verdicts()
+
+        attempt = engine.get(attempt_id)
+        body = {"status": "success" if not errors else "error", "attempt": attempt_id, "session": session,
+                "verdict": attempt["verdict"], "score": attempt["score"],
+                "face": attempt["face"], "face_conf": attempt["face_conf"],
+                "voice": attempt["voice"], "voice_conf": attempt["voice_conf"],
+                "topic_sent": topic("verdict", vault_id)}
+        if errors:
+            body["message"] = "; ".join(f"{modality}: {msg}" for modality, msg in errors.items())
+        return body
+
+    except Exception as e:
+        # Gagal publish / mencatat keputusan (error inferensi per media sudah ditangani di atas)
+        status = "decision"
+        ERRORS.inc(category=status, media_type="combined")
+        return {"status": "error", "message": f"Gagal memproses verifikasi: {str(e)}"}
+
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, media_type="combined", status=status)
+
+
+@app.get("/health")
+async def health():
+    """200 setelah startup (dan warmup, jika aktif) selesai; 503 selama masih starting."""
+    body = {"status": "ready" if startup.ready else "starting", "mqtt_connected": mqtt_client.is_connected(),
+            "startup": startup.snapshot()}
+    return JSONResponse(body, status_code=200 if startup.ready else 503)
+
+
+@app.get("/decision")
+async def access_decision(vault_id: str = DEFAULT_VAULT_ID, session: str = None, limit: int = 1):
+    """Verdict percobaan akses: per sesi jika diberikan, selain itu `limit` attempt terakhir brankas."""
+    if session is not None:
+        attempt = engine.session(vault_id, session)
+        return {"status": "success" if attempt else "not_found", "attempts": [attempt] if attempt else []}
+    return {"status": "success", "attempts": engine.recent(vault_id, max(1, limit))}
+
+
+@app.get("/cache/stats")
+async def prediction_cache_stats():
+    """Counter cache prediksi (hit/miss/eviction/304)."""
+    return get_prediction_cache().stats()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Histogram latensi per tahap, counter error, dan statistik cache/VAD (format Prometheus)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/vad/stats")
+async def vad_stats():
+    """Jumlah klip/sampel yang dibuang VAD sebelum MFCC."""
+    return vad.stats.snapshot()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)